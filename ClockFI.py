@@ -7,47 +7,25 @@ This script performs clock glitching attacks using ChipWhisperer against an FPGA
 Requirements:
 - ChipWhisperer library
 - glitch library
-- subprocess
-- csv
-- ast
-- time
-- importlib
-- tqdm
-- re
-- struct
 - progressbar
+- prettytable
 - argparse
+
+Heavy modules (chipwhisperer, progressbar, prettytable) are imported once the
+arguments are parsed, so `--help` and argument errors return immediately.
 """
 
 #### LIBRARY ####
 
-import chipwhisperer as cw
-import src.glitch as glitch
-import subprocess
-import csv
-import ast
 import time
-from importlib import reload
-from tqdm.notebook import tqdm
-import re
-import struct
-from progressbar import progressbar
-import progressbar
-import argparse, configparser, textwrap
-import configparser
-import serial
+T_START = time.perf_counter() # reference for the cold start measurement
+
+import argparse, textwrap
 import os
-from prettytable import PrettyTable
 
+import src.glitch as glitch
 import src.cw_toolkit as tk
-
-    
-# Widget for display progress bar
-widgets = [
-        progressbar.Percentage(),
-        ' [', progressbar.Timer(), '] ',
-        progressbar.GranularBar(), ' ',
-    ]
+from src.session import Session
 
 
 # Configuration scope
@@ -85,13 +63,142 @@ parser.add_argument('--max-offset',         type=int,   default = 49,     help =
 parser.add_argument('--min-ext-offset',     type=int,   default = 0,      help = 'Value minimum ext_offset')
 parser.add_argument('--max-ext-offset',     type=int,   default = 200,    help = 'Value maximum ext_offset')
 parser.add_argument('--repeat',             type=int,   default = 5,      help = 'Value repeat')
+parser.add_argument('--sampling',           type=str,   default='grid', choices=['grid', 'halton', 'lhs', 'sobol'],
+                                                                          help = 'grid: every value of the ranges in order (default)\nhalton, lhs, sobol: --budget points spread over the ranges')
+parser.add_argument('--budget',             type=int,   default=20000,  help = 'Number of injections of the halton, lhs and sobol sampling')
+parser.add_argument('--seed',               type=int,   default=0,      help = 'Seed of the halton, lhs and sobol sampling')
+parser.add_argument('--dedup',              type=str,   default='off', choices=['off', 'probe', 'model'],
+                                                                          help = 'Inject once per distinct hardware width/offset setting (grid sampling):\nprobe: write each value to the scope and read back the value it realises\nmodel: round the values to multiples of --quantum')
+parser.add_argument('--quantum',            type=float, default=None,   help = 'Hardware resolution of width and offset in percent (--dedup model)')
+parser.add_argument('--step',               type=float, default=1,      help = 'Step of width, offset and ext_offset')
+parser.add_argument('--timings',            type=str,   default=None,   help = 'timings.json of a previous campaign, for the time estimate')
+parser.add_argument('--cost',               type=str,   action='append', default=[], help = 'Cost of an outcome "<event>=<seconds>" for the time estimate, overrides --timings')
+parser.add_argument('--time-budget',        type=float, default=None,   help = 'Wall-time budget in hours: print settings of the sweep fitting in it')
+parser.add_argument('--plan',               action='store_true',          help = 'Print the time estimate (and --time-budget suggestions) and exit without hardware')
+parser.add_argument('--burst',              type=int,   default=1,      help = 'Number of target calls per reset/arm cycle, each with its own outcome,\nthe burst ends on the first reset (1: one call per injection)')
 parser.add_argument('--resume-progress',    type=int,   default = 0,      help = 'Value to resume progression')
 parser.add_argument('--size-data',          type=int,   default = 0,      help = 'Size of character to read by injection')
 parser.add_argument('--function-targeted',  type=str,   default='s',      help = 'Specify the letter for selected the function target:\n')
 parser.add_argument('--function-argument',  type=str,   default='',       help = 'If necessary specify argument for function target\n')
+parser.add_argument('--functions',          type=str,   nargs='+', default=None,
+                                                                          help = 'Sweep several functions in one campaign, each one "<letter>[:<argument>]",\nthe function becomes the innermost parameter and has its own log file\n(replaces --function-targeted and --function-argument)')
+parser.add_argument('--golden-runs',        type=int,   default=0,    help = 'Number of runs without glitch to record the expected output,\nvalid outputs differing from it are classified as corrupted (0: disabled)')
 parser.add_argument('--path-exp',                default = None,          help = 'Folder experimentation')
 parser.add_argument('--csv-log',                default = None,           help = 'Log file')
+parser.add_argument('--sqlite-db',          type=str,   default=None,   help = 'Also store the results in this SQLite database')
+parser.add_argument('--campaign-name',      type=str,   default=None,   help = 'Campaign name in the SQLite database (csv-log by default)')
+parser.add_argument('--metrics-file',       type=str,   default=None,   help = 'Metrics file (.prom) rewritten for the node exporter textfile collector')
+parser.add_argument('--metrics-interval',   type=float, default=5.0,    help = 'Seconds between two rewrites of the metrics file')
+parser.add_argument('--watchdog',           action='store_true',          help = 'Enforce deadlines on the phases of each injection, a stalled point is\nlogged as "stall" and recovered (flush, nRST, scope reconnect, bitstream reload)')
+parser.add_argument('--deadline',           type=str,   action='append', default=[], help = 'Deadline of a watchdog phase "<phase>=<seconds>", phases: reload, capture, read, recover')
+parser.add_argument('--checkpoint',         type=str,   default=None,   help = 'Checkpoint file of the campaign state, restored at start if it exists')
+parser.add_argument('--checkpoint-interval', type=float, default=30.0,  help = 'Seconds between two checkpoints')
+parser.add_argument('--traces',             type=str,   default=None,   help = 'Store the ADC traces in <path-exp>/<traces>.npy, indexed by <traces>_index.csv')
+parser.add_argument('--trace-mode',         type=str,   default='all', choices=['all', 'success', 'every'],
+                                                                          help = 'Traces stored: all, success only, or every --trace-every injection')
+parser.add_argument('--trace-every',        type=int,   default=100,    help = 'Store one trace every N injections (--trace-mode every)')
+parser.add_argument('--trace-decimate',     type=int,   default=1,      help = 'Average N consecutive samples of the stored traces')
+parser.add_argument('--trace-dtype',        type=str,   default='float16', choices=['float16', 'float32', 'int16'], help = 'Type of the stored samples')
+parser.add_argument('--trace-capacity',     type=int,   default=None,   help = 'Number of traces preallocated (number of injections by default)')
+parser.add_argument('--classifier',         type=str,   default='off', choices=['off', 'shadow', 'shortcut'],
+                                                                          help = 'Label the injections from their ADC trace compared to the golden traces:\nshadow: only report the agreement with the serial check\nshortcut: skip the serial reads of the points labelled normal or reset\n(needs --golden-runs 2 or more)')
+parser.add_argument('--classifier-margin',  type=float, default=3.0,    help = 'Normal distance: largest distance of a golden trace times this margin')
+parser.add_argument('--classifier-reset-distance', type=float, default=None, help = 'Distance from which a trace is labelled reset (never by default)')
+parser.add_argument('--classifier-audit',   type=int,   default=100,    help = 'In shortcut mode, check one labelled point every N with the serial reads')
+parser.add_argument('--shared-memory',      type=str,   default=None,   help = 'Publish the live counts in this shared memory block, read by ClockFIdashboard.py')
+parser.add_argument('--payload-dict',       action='store_true',          help = 'Log a payload ID per row, distinct payloads are written once in <csv-log>_payloads.csv')
 args = parser.parse_args()
+if args.burst < 1:
+    parser.error("--burst must be 1 or more")
+if args.burst > 1 and args.classifier != "off":
+    parser.error("--classifier labels one trace per arm, it needs --burst 1")
+if args.dedup != "off" and args.sampling != "grid":
+    parser.error("--dedup only applies to the grid, not to --sampling " + args.sampling)
+if args.dedup == "model" and args.quantum is None:
+    parser.error("--dedup model needs --quantum")
+if args.classifier != "off" and args.golden_runs < 2:
+    parser.error("--classifier needs --golden-runs 2 or more for its template")
+
+# (function, argument) pairs, arguments encoded once for the whole campaign
+if args.functions is not None:
+    try:
+        functions = [tk.parse_function(spec) for spec in args.functions]
+    except ValueError as e:
+        parser.error(str(e))
+else:
+    functions = [(args.function_targeted, args.function_argument)]
+encoded_arguments = [tk.encode_argument(argument) for _, argument in functions]
+multi_function = args.functions is not None
+
+# ## Results of fault injections
+parameters = ["width", "offset", "ext_offset"] + (["function"] if multi_function else [])
+gc = glitch.GlitchController(groups=["success", "corrupted", "reset", "normal"], parameters=parameters)
+
+### Faults injections in clock ###
+
+# Glitch a part between -49 and 49
+# These width/offset settings are for CW-Lite/Pro; width/offset
+
+# 3 settings for realized the glitch Clock
+gc.set_range("width", args.min_width, args.max_width)
+gc.set_range("offset", args.min_offset, args.max_offset)
+gc.set_range("ext_offset", args.min_ext_offset, args.max_ext_offset)
+if multi_function:
+    # innermost parameter: all the functions share each glitch setting
+    gc.set_range("function", 0, len(functions) - 1)
+
+gc.set_global_step(args.step)
+if multi_function:
+    gc.set_step("function", 1)
+
+# several requested percentages can give the same phase shift step
+if args.dedup == "model":
+    for p in ("width", "offset"):
+        gc.set_effective(p, lambda v: round(v / args.quantum))
+
+import progressbar
+from prettytable import PrettyTable
+
+# Time estimate and budget planner
+from src.planner import read_timings, seconds_per_injection, format_duration, suggest, EtaTracker
+cost_overrides = {}
+for spec in args.cost:
+    event, _, seconds = spec.partition("=")
+    try:
+        cost_overrides[event] = float(seconds)
+    except ValueError:
+        parser.error(f"invalid cost {spec!r}, expected <event>=<seconds>")
+costs, outcome_mix = read_timings(args.timings, cost_overrides)
+per_injection = seconds_per_injection(costs, outcome_mix)
+
+if args.plan or args.time_budget is not None:
+    # --dedup probe needs the scope, its estimate is the one of the whole grid
+    planned = args.budget if args.sampling != "grid" else gc.num_glitch_values(unique=args.dedup == "model")
+    if args.burst > 1:
+        print(f"Injections planned : {planned * args.burst} at most ({planned} points, bursts of {args.burst})")
+    else:
+        print(f"Injections planned : {planned}")
+    if per_injection is None:
+        print("No outcome costs, give --timings of a previous campaign or at least --cost normal=<seconds> for an estimate")
+    else:
+        if not outcome_mix:
+            print("No outcome mix (--timings), every injection is costed as a normal outcome")
+        print(f"Expected time per injection : {per_injection:.3f} s, estimated duration : {format_duration(planned * args.burst * per_injection)}")
+        if args.time_budget is not None:
+            table_plan = PrettyTable()
+            table_plan.field_names = [f"Fits in {format_duration(args.time_budget * 3600)}", "injections", "estimated duration"]
+            for options, n, seconds in suggest(gc, per_injection, args.time_budget * 3600, args.dedup == "model", args.burst):
+                table_plan.add_row([options, n, format_duration(seconds)])
+            print(table_plan)
+    if args.plan:
+        raise SystemExit(0)
+
+# Widget for display progress bar
+widgets = [
+        progressbar.Percentage(),
+        ' [', progressbar.Timer(), '] ',
+        progressbar.GranularBar(), ' ',
+    ]
 
 
 if args.path_exp is not None and not os.path.exists(args.path_exp):
@@ -106,7 +213,7 @@ if args.path_exp is not None:
     # Display configuration 
     print("Configuration setup 🔧 : ")
     print(f"Bitstream File: {args.bitstream_file}")
-    print(f"Function Targeted: {args.function_targeted}")
+    print(f"Function Targeted: {', '.join(f + (':' + a if a else '') for f, a in functions)}")
     print("\nGlitch Parameters 🎯:")
     table_conf = PrettyTable()
     table_conf.field_names = ["Parameters", "Minimum", "Maximum"]
@@ -115,6 +222,8 @@ if args.path_exp is not None:
     table_conf.add_row(["ext_offset", args.min_ext_offset, args.max_ext_offset])
     print(table_conf)
     print(f"Repeat: {args.repeat}")
+    if args.sampling != "grid":
+        print(f"Sampling: {args.sampling}, budget {args.budget}, seed {args.seed}")
 
     print("\nLog file 📁: ")
     print(args.csv_log)
@@ -124,86 +233,155 @@ if args.path_exp is not None:
         file.write(f"Bitstream File: {args.bitstream_file} \n")
         file.write(f"ChipWhisperer setup is the {args.sn_chipwhisperer} \n")
         file.write(f"FPGA setup is the {args.ftdi_FPGA} \n")
-        file.write(f"Function Targeted: {args.function_targeted}\n")
+        file.write(f"Function Targeted: {', '.join(f + (':' + a if a else '') for f, a in functions)}\n")
         file.write("\nGlitch Parameters 🎯:\n")
         table_conf_str = table_conf.get_string()
         file.write(table_conf_str)
         file.write(f"\nRepeat: {args.repeat}\n")
+        if args.burst > 1:
+            file.write(f"Burst: {args.burst} calls per injection\n")
+        if args.sampling != "grid":
+            file.write(f"Sampling: {args.sampling}, budget {args.budget}, seed {args.seed}\n")
         file.write("\nLog files 📁:\n")
         file.write(args.csv_log)
 
+# one log (and SQLite campaign) per function of a multi-function sweep
+file_logs = [None] * len(functions)
 if args.csv_log is not None:
     file_log       = os.path.join(args.path_exp, args.csv_log)
-
-
-print("\n Scope preparation ... 🎠\n")
-
-
-# declaration scope and target
-scope = cw.scope(sn=args.sn_chipwhisperer)
-target = cw.target(scope)
-
-# Checking the ChipWhisperer 
-tk.setup_generic(scope, target)
-
-# Clock configuration for 25Mhz
-# Multiply the ChipWhisperer clock to get 25 MHz
-scope.clock.clkgen_mul = 7
-target.baud = 115200
-print("baudrate : ", target.baud) # Display the baudrate communication
-
-# ## Settings configuration for clock glitch
-scope.glitch.clk_src = 'clkgen'
-scope.glitch.trigger_src = 'ext_single'
-scope.glitch.output = "clock_xor"
-scope.io.hs2 = "glitch"
-
-# ## Results of fault injections
-gc = glitch.GlitchController(groups=["success", "reset", "normal"], parameters=["width", "offset", "ext_offset"])
-
-### Faults injections in clock ###
-
-# Glitch a part between -49 and 49
-# These width/offset settings are for CW-Lite/Pro; width/offset
-
-# 3 settings for realized the glitch Clock
-gc.set_range("width", args.min_width, args.max_width)
-gc.set_range("offset", args.min_offset, args.max_offset)
-gc.set_range("ext_offset", args.min_ext_offset, args.max_ext_offset)
-
-step = 1
-gc.set_global_step(step)
+    if multi_function:
+        root, ext = os.path.splitext(file_log)
+        file_logs = [f"{root}_f{i}_{f}{ext}" for i, (f, _) in enumerate(functions)]
+    else:
+        file_logs = [file_log]
+
+results_dbs = [None] * len(functions)
+if args.sqlite_db is not None:
+    from src.results_db import ResultsDB
+    campaign_name = args.campaign_name or args.csv_log or "campaign"
+    if multi_function:
+        results_dbs = [ResultsDB(args.sqlite_db, f"{campaign_name}:f{i}_{f}") for i, (f, _) in enumerate(functions)]
+    else:
+        results_dbs = [ResultsDB(args.sqlite_db, campaign_name)]
+
+payloads = [None] * len(functions)
+if args.payload_dict:
+    payloads = [tk.PayloadDictionary(file_log) if file_log is not None else None for file_log in file_logs]
+
+
+# Connection to the ChipWhisperer and the FPGA target, bitstream loaded
+session = Session(args.name_board, args.sn_chipwhisperer, args.ftdi_FPGA, args.freq_load_bit, args.bitstream_file)
+if args.watchdog:
+    from src.watchdog import Watchdog, parse_deadlines
+    try:
+        session.watchdog = Watchdog(parse_deadlines(args.deadline))
+    except ValueError as e:
+        parser.error(str(e))
+session.open()
+scope = session.scope
+target = session.target
+
+checkpoint = None
+state = None
+if args.checkpoint is not None:
+    from src.checkpoint import Checkpointer, restore
+    identity = {k: getattr(args, k) for k in ("min_width", "max_width", "min_offset", "max_offset", "min_ext_offset", "max_ext_offset",
+                                               "step", "repeat", "burst", "sampling", "budget", "seed", "dedup", "quantum", "function_targeted", "function_argument", "functions", "golden_runs")}
+    checkpoint = Checkpointer(args.checkpoint, args.checkpoint_interval, identity)
+    state = checkpoint.load()
+
+if args.golden_runs > 0 and (state is None or args.classifier != "off"):
+    for i, (function, _) in enumerate(functions):
+        session.golden_run(function, encoded_arguments[i], args.size_data, args.golden_runs, key=i if multi_function else None,
+                           collect_traces=args.classifier != "off")
+
+if args.classifier != "off":
+    from src.classifier import TraceClassifier
+    session.classifier = TraceClassifier(args.classifier, args.classifier_margin, reset_distance=args.classifier_reset_distance,
+                                         audit_every=args.classifier_audit)
+    for key, golden_traces in session.golden_traces.items():
+        session.classifier.add_template(key, golden_traces)
+
+if args.dedup == "probe":
+    for p in ("width", "offset"):
+        gc.set_effective(p, session.probe_effective(p, gc.axis_values(p)))
 
 scope.glitch.repeat = args.repeat
 sample_size = 10
 
-tk.reboot_flush(scope, target)
 broken = False
 
 
 print("\nFault injection in progress ... ⏰\n")
 
 # Total number step during the clock glitch
-result = 1
-for i in range(len(gc.parameters)):
-    range_param = abs(gc.parameter_max[i] - gc.parameter_min[i]) + 1
-    result *= range_param 
-    
+result = gc.num_glitch_values(unique=args.dedup != "off")
+if args.dedup != "off":
+    print(f"Distinct hardware settings : {result} of {gc.num_glitch_values()} requested")
 # result*= scope.glitch.repeat
-print("Total number fault injection : ", result)
 
 iteration_progressbar = 0 # variable for progress bar
 iteration_success     = 0
 iteration_normal      = 0
+iteration_corrupted   = 0
 iteration_reset       = 0
-iteration_FI          = 0
+iteration_stall       = 0
+iteration_FI          = 0 # position in the sweep, one per reset/arm cycle
+call_FI               = 0 # number of the target call, first column of the log
+
+if state is not None:
+    counters = restore(gc, state, session)
+    iteration_success   = counters["success"]
+    iteration_normal    = counters["normal"]
+    iteration_corrupted = counters["corrupted"]
+    iteration_reset     = counters["reset"]
+    iteration_stall     = counters.get("stall", 0)
+    args.resume_progress = state["iteration_FI"] + 1
+    call_FI = iteration_success + iteration_normal + iteration_corrupted + iteration_reset + iteration_stall
+    broken = iteration_success > 0
+    print(f"Checkpoint restored, resume at the injection {args.resume_progress}")
+
+if args.sampling == "grid" and args.dedup != "off":
+    glitch_values = gc.unique_values(clear=state is None)
+elif args.sampling == "grid":
+    glitch_values = gc.glitch_values(clear=state is None)
+else:
+    # space filling sample, resumed directly at its index
+    result = args.budget
+    iteration_FI = iteration_progressbar = max(args.resume_progress - 1, 0)
+    glitch_values = gc.sample_values(args.budget, args.sampling, args.seed, iteration_FI, clear=state is None)
+
+if state is None:
+    # exact without --burst, the calls of the previous run are not known otherwise
+    call_FI = max(args.resume_progress - 1, 0)
 
-# reload the bitstream
-tk.reboot_bitstream(args.name_board, args.ftdi_FPGA, args.freq_load_bit, args.bitstream_file)
+print("Total number fault injection : ", result)
+# the ETA counts sweep points, a point costs up to --burst injections
+per_point = per_injection * args.burst if per_injection is not None else None
+if per_point is not None:
+    print(f"Estimated duration : {format_duration((result - max(args.resume_progress - 1, 0)) * per_point)}")
+eta = EtaTracker(result, max(args.resume_progress - 1, 0), per_point)
+
+metrics = None
+if args.metrics_file is not None:
+    from src.metrics import MetricsExporter
+    metrics = MetricsExporter(args.metrics_file, args.metrics_interval, campaign=args.campaign_name or args.csv_log, grid_size=result)
+
+if args.shared_memory is not None:
+    gc.publish(args.shared_memory)
+
+traces = None
+if args.traces is not None:
+    from src.traces import TraceStore
+    capacity = args.trace_capacity
+    if capacity is None:
+        capacity = result // args.trace_every + 1 if args.trace_mode == "every" else result
+    traces = TraceStore(os.path.join(args.path_exp or ".", args.traces), capacity, session.scope.adc.samples,
+                        args.trace_mode, args.trace_every, args.trace_decimate, args.trace_dtype)
 
 with progressbar.ProgressBar(max_value=result, widgets=widgets) as bar:
 
-    for glitch_settings in gc.glitch_values():
+    for glitch_settings in glitch_values:
 
         iteration_progressbar += 1
         iteration_FI += 1 # counter number of fault injection
@@ -211,108 +389,124 @@ with progressbar.ProgressBar(max_value=result, widgets=widgets) as bar:
         if iteration_FI >= args.resume_progress:
 
             
+            if iteration_FI == max(args.resume_progress, 1):
+                print(f"Cold start to first injection : {time.perf_counter() - T_START:.3f} s")
+
             print("progressbar : ", iteration_progressbar)
 
             bar.update(iteration_progressbar)
 
-            scope.glitch.offset = glitch_settings[1]
-            scope.glitch.width = glitch_settings[0]
-            scope.glitch.ext_offset = glitch_settings[2]
-
-            print("\nWidth | Offset | Ext_Offset [",glitch_settings[0]," | ", glitch_settings[1], " | ", glitch_settings[2],"]\n")
-
-            if scope.adc.state:
-
-                print(scope.adc.state)
-
-                print("reboot ... 💥")
-                # can detect crash here (fast) before timing out (slow)
-                print("Trigger still high!")
-                gc.add("reset", (scope.glitch.width, scope.glitch.offset, scope.glitch.ext_offset))
-                #Device is slow to boot?
-                tk.reboot_flush(scope, target)
+            key = int(round(glitch_settings[3])) if multi_function else None
+            f = key or 0
+            outcomes = session.inject_burst(gc, glitch_settings, functions[f][0], encoded_arguments[f], args.size_data, args.burst, key)
 
-                # reload the bitstream
-                tk.reboot_bitstream(args.name_board, args.ftdi_FPGA, args.freq_load_bit, args.bitstream_file)
+            # each call of a burst is logged as its own injection, see ClockFIrepeat.py
+            for k, (event, data_read) in enumerate(outcomes):
 
+                call_FI += 1
 
-            tk.reboot_flush(scope, target) # initialisation
-
-            scope.arm()
-
-            tk.target_function(target, args.function_targeted, args.function_argument)
-
-            ret = scope.capture()
-
-            if ret:
-                print('Timeout - no trigger')
-                gc.add("reset", (scope.glitch.width, scope.glitch.offset, scope.glitch.ext_offset))
-
-                print("reboot ... 💥")
-
-                # reload the bitstream
-                tk.reboot_bitstream(args.name_board, args.ftdi_FPGA, args.freq_load_bit, args.bitstream_file)
-
-                #Device is slow to boot?
-                tk.reboot_flush(scope, target)
-
-                iteration_reset+=1
-                event = "reset"
-
-            else:
-
-                val = target.simpleserial_read_witherrors('r', 1, glitch_timeout=10, ack=False)#For loop check
-                print(val)
-
-                if val['valid'] is False:
-                    gc.add("reset", (scope.glitch.width, scope.glitch.offset, scope.glitch.ext_offset))
-                    print("reboot ... 💥")
-
+                if event == "success":
+                    broken = True
+                    iteration_success+=1
+                elif event == "corrupted":
+                    iteration_corrupted+=1
+                elif event == "reset":
                     iteration_reset+=1
-                    event = "reset"
-
+                elif event == "stall":
+                    iteration_stall += 1
                 else:
-                    if val['payload'] == bytearray([0xc]): #for loop check
-                        broken = True
-                        gc.add("success", (scope.glitch.width, scope.glitch.offset, scope.glitch.ext_offset))
+                    iteration_normal+=1
 
-                        print(val)
-                        print(scope.glitch.width, scope.glitch.offset, scope.glitch.ext_offset)
-                        print("Successful injection ! 🐙 \n")
+                tk.log_file(file_logs[f], call_FI, event, *session.last_parameters, data_read, payloads[f])
 
-                        iteration_success+=1
-                        event = "success"
+                if traces is not None and k == int(session.trigger_reset):
+                    # only the first call of a burst is captured, after the reset of a trigger still high
+                    traces.record(session, call_FI, event)
 
-                    else:
-                        gc.add("normal", (scope.glitch.width, scope.glitch.offset, scope.glitch.ext_offset))
-                        event = "normal"
-                        iteration_normal+=1
+                if results_dbs[f] is not None:
+                    results_dbs[f].add(call_FI, event, *session.last_parameters, tk.printable(data_read))
 
-            data_read = target.read(args.size_data)
+            if metrics is not None:
+                metrics.update(gc, iteration_FI, session, len(outcomes))
 
-            tk.log_file(file_log, iteration_FI, event, scope.glitch.width, scope.glitch.offset, scope.glitch.ext_offset, data_read)
+            if checkpoint is not None:
+                checkpoint.update(gc, iteration_FI, {"success": iteration_success, "normal": iteration_normal,
+                                                     "corrupted": iteration_corrupted, "reset": iteration_reset, "stall": iteration_stall}, session)
         
         print("FI: ", iteration_FI)
         print("normal: ", iteration_normal)
+        print("corrupted: ", iteration_corrupted)
         print("reset: ", iteration_reset)
         print("success: ", iteration_success)
+        print("ETA : ", format_duration(eta.update(iteration_FI)))
 
 print("\n --- Results ---\n")
 table = PrettyTable()
 table.field_names = ["Parameters", "number of visits"]
 table.add_row(["success", iteration_success])
 table.add_row(["normal", iteration_normal])
+table.add_row(["corrupted", iteration_corrupted])
 table.add_row(["reset", iteration_reset])
+if session.watchdog is not None:
+    table.add_row(["stall", iteration_stall])
+    table.add_row(["stall time (s)", f"{session.stall_time:.1f}"])
 print(table)
 
+if multi_function:
+    # counts by function, summed over the glitch parameters
+    by_function = gc.results.calc(ignore_params=[0, 1, 2])
+    table_functions = PrettyTable()
+    table_functions.field_names = ["Function", "success", "normal", "corrupted", "reset"]
+    for i, (function, argument) in enumerate(functions):
+        counts = by_function.get((i,), {})
+        table_functions.add_row([function + (":" + argument if argument else "")] + [counts.get(g, 0) for g in ("success", "normal", "corrupted", "reset")])
+    print(table_functions)
+
+if session.classifier is not None:
+    # labels of the traces against the serial check
+    events, rows = session.classifier.report()
+    table_classifier = PrettyTable()
+    table_classifier.field_names = ["Label \\ checked"] + events + ["total"]
+    for row in rows:
+        table_classifier.add_row(row)
+    agreement = session.classifier.agreement()
+    print(table_classifier)
+    print("Classifier agreement : ", "-" if agreement is None else f"{agreement:.4f}", ", serial checks skipped : ", session.classifier.shortcuts)
+
 with open(README, 'a') as file:
     file.write("\n\n --- Results ---\n")
     table_str = table.get_string()
     file.write(table_str)
+    if session.classifier is not None:
+        file.write("\n")
+        file.write(table_classifier.get_string())
+        file.write(f"\nClassifier agreement: {'-' if agreement is None else f'{agreement:.4f}'}, serial checks skipped: {session.classifier.shortcuts}\n")
+    if multi_function:
+        file.write("\n")
+        file.write(table_functions.get_string())
     file.write("\nWith a total FI of ")
     file.write(str(result))
 
+for results_db in results_dbs:
+    if results_db is not None:
+        results_db.close()
+
+if metrics is not None:
+    metrics.update(gc, iteration_FI, session, force=True)
+
+if checkpoint is not None:
+    checkpoint.update(gc, iteration_FI, {"success": iteration_success, "normal": iteration_normal,
+                                         "corrupted": iteration_corrupted, "reset": iteration_reset, "stall": iteration_stall}, session, force=True)
+
+if traces is not None:
+    traces.close()
+
+if args.path_exp is not None:
+    session.write_timings(os.path.join(args.path_exp, "timings.json"))
+
+gc.unpublish()
+
 # Disconnected the setup
-tk.disconnected_setup(scope, target)
+session.close()
 
 assert broken, "No fault was successfully injected"
@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+This script runs every sweep of a campaign file back to back over a single
+ChipWhisperer connection: the scope setup and the bitstream load are done
+once for the whole campaign instead of once per sweep.
+
+See src/campaign.py for the campaign file format.
+"""
+
+#### LIBRARY ####
+
+import argparse, textwrap
+import os
+import time
+
+import src.campaign as campaign
+
+# Arguments manager
+parser = argparse.ArgumentParser(description = textwrap.dedent('''
+Run a campaign file: several clock glitch sweeps in one hardware session
+
+ * The [setup] section gives the FPGA board, the ChipWhisperer, the bitstream and the experiment folder
+ * Each [sweep:<name>] section gives the ranges, step, repeat, function targeted and argument of one sweep
+ * Every sweep writes its README and csv log in <path_exp>/<name>/
+'''), formatter_class=argparse.RawTextHelpFormatter)
+
+parser.add_argument('--campaign-file',  type=str, required=True,        help='Campaign file (INI)')
+parser.add_argument('--sweep',          type=str, nargs='+', default=None, help='Run only these sweeps')
+parser.add_argument('--metrics-file',   type=str, default=None,         help='Metrics file (.prom) rewritten for the node exporter textfile collector')
+parser.add_argument('--metrics-interval', type=float, default=5.0,      help='Seconds between two rewrites of the metrics file')
+args = parser.parse_args()
+
+setup, sweeps = campaign.read_campaign(args.campaign_file)
+
+if args.sweep is not None:
+    unknown = set(args.sweep) - {name for name, _ in sweeps}
+    if unknown:
+        parser.error(f"Unknown sweep(s): {', '.join(sorted(unknown))}")
+    sweeps = [(name, sweep) for name, sweep in sweeps if name in args.sweep]
+
+print("\nCampaign of", len(sweeps), "sweeps 🎯 :", ", ".join(name for name, _ in sweeps))
+
+session = campaign.make_session(setup)
+session.open()
+
+from prettytable import PrettyTable
+
+metrics = None
+if args.metrics_file is not None:
+    from src.metrics import MetricsExporter
+    metrics = MetricsExporter(args.metrics_file, args.metrics_interval, campaign=os.path.splitext(os.path.basename(args.campaign_file))[0])
+
+summary = PrettyTable()
+summary.field_names = ["Sweep", "success", "corrupted", "reset", "normal", "time (s)"]
+
+try:
+    for name, sweep in sweeps:
+        start = time.perf_counter()
+        gc = campaign.run_sweep(session, name, sweep, setup["path_exp"], metrics=metrics)
+        summary.add_row([name] + gc.group_counts + [round(time.perf_counter() - start, 1)])
+finally:
+    # Disconnected the setup
+    session.close()
+
+print("\n --- Campaign ---\n")
+print(summary)
+print("Bitstream reloads : ", session.reload_count, f"({session.reload_time:.1f} s)")
@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+This script compares two campaigns (e.g. two bitstream builds, with and
+without a countermeasure) and reports the glitch parameters whose success
+or reset rate changed significantly, and the overall deltas.
+"""
+
+#### LIBRARY ####
+
+import argparse, textwrap
+import glob
+
+import src.compare as compare
+
+# Arguments manager
+parser = argparse.ArgumentParser(description = textwrap.dedent('''
+Differential comparison of two campaigns, cell by cell
+
+ * Each side is a counts file written by ClockFImerge.py or csv logs (merged on the fly)
+ * Rates of a cell are compared with Fisher's exact test, p-values adjusted for the
+   number of cells (Benjamini-Hochberg q-values)
+'''), formatter_class=argparse.RawTextHelpFormatter)
+
+parser.add_argument('--a',                  type=str, nargs='+', required=True, help='Reference campaign: counts file, or log files / glob patterns')
+parser.add_argument('--b',                  type=str, nargs='+', required=True, help='Compared campaign: counts file, or log files / glob patterns')
+parser.add_argument('--groups',             type=str, nargs='+', default=['success', 'reset'], help='Groups whose rates are compared')
+parser.add_argument('--alpha',              type=float, default=0.05,   help='Significance level of the q-values')
+parser.add_argument('--min-total',          type=int,   default=1,      help='Minimum number of injections of a cell in each campaign')
+parser.add_argument('--output',             type=str,   default=None,   help='Csv file of the significant cells')
+parser.add_argument('--top',                type=int,   default=20,     help='Number of cells displayed per group')
+parser.add_argument('--processes',          type=int,   default=None,   help='Number of worker processes to merge logs')
+args = parser.parse_args()
+
+
+def expand(patterns):
+    files = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern))
+        files.extend(matches if matches else [pattern])
+    return files
+
+
+results_a = compare.load_results(expand(args.a), args.processes)
+results_b = compare.load_results(expand(args.b), args.processes)
+for group in args.groups:
+    if group not in results_a.groups:
+        parser.error(f"unknown group {group} (groups are {results_a.groups})")
+
+report = compare.compare(results_a, results_b, args.groups, args.alpha, args.min_total)
+
+if args.output is not None:
+    compare.write_comparison(report, args.output, results_a.parameters)
+
+from prettytable import PrettyTable
+
+print(f"{report['tested']} cells tested by both campaigns, {report['only_a']} only by a, {report['only_b']} only by b")
+
+overall = PrettyTable()
+overall.field_names = ["Group", "rate a", "rate b", "delta", "p", "significant cells"]
+for group, (rate_a, rate_b, delta, p) in report["overall"].items():
+    overall.add_row([group, f"{rate_a:.4f}", f"{rate_b:.4f}", f"{delta:+.4f}", f"{p:.3g}", len(report["cells"][group])])
+print(overall)
+
+for group, cells in report["cells"].items():
+    if not cells:
+        continue
+    table = PrettyTable()
+    table.field_names = list(results_a.parameters) + ["total a", "rate a", "total b", "rate b", "delta", "q"]
+    for params, n_a, rate_a, n_b, rate_b, delta, p, q in cells[:args.top]:
+        table.add_row(list(params) + [n_a, f"{rate_a:.2f}", n_b, f"{rate_b:.2f}", f"{delta:+.2f}", f"{q:.3g}"])
+    print(f"\n{group}: cells with the largest significant changes")
+    print(table)
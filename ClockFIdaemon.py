@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+This script runs the fault injection daemon, or talks to it.
+
+The daemon opens the ChipWhisperer and loads the bitstream once, then runs
+the campaign jobs submitted to its spool directory one after the other. See
+src/daemon.py for the spool layout and src/campaign.py for the job format.
+"""
+
+#### LIBRARY ####
+
+import argparse, textwrap
+import signal
+import sys
+
+from src.daemon import Spool
+
+# Arguments manager
+parser = argparse.ArgumentParser(description = textwrap.dedent('''
+Fault injection daemon with a spool directory job queue
+
+ * serve  : hold the hardware connection open and run the queued jobs
+ * submit : queue a campaign file (its [sweep:<name>] sections)
+ * status : display the daemon state and the queue
+ * cancel : remove a queued job or stop the running one after the current injection
+'''), formatter_class=argparse.RawTextHelpFormatter)
+
+parser.add_argument('--spool',          type=str, required=True,    help='Spool directory of the daemon')
+subparsers = parser.add_subparsers(dest='command', required=True)
+
+parser_serve = subparsers.add_parser('serve', help='Run the daemon')
+parser_serve.add_argument('--setup-file',   type=str, required=True,    help='Campaign file whose [setup] section describes the hardware')
+parser_serve.add_argument('--metrics-file', type=str, default=None,     help='Metrics file (.prom) rewritten for the node exporter textfile collector')
+parser_serve.add_argument('--metrics-interval', type=float, default=5.0, help='Seconds between two rewrites of the metrics file')
+parser_serve.add_argument('--poll',         type=float, default=1.0,    help='Seconds between two looks at an empty queue')
+
+parser_submit = subparsers.add_parser('submit', help='Queue a campaign file')
+parser_submit.add_argument('campaign_file', type=str,                   help='Campaign file to run')
+parser_submit.add_argument('--name',        type=str, default=None,     help='Name of the job')
+
+parser_status = subparsers.add_parser('status', help='Display the daemon state')
+
+parser_cancel = subparsers.add_parser('cancel', help='Cancel a job')
+parser_cancel.add_argument('job',           type=str,                   help='Job id')
+
+args = parser.parse_args()
+
+spool = Spool(args.spool)
+
+if args.command == 'submit':
+    print(spool.submit(args.campaign_file, args.name))
+
+elif args.command == 'cancel':
+    try:
+        print(spool.cancel(args.job))
+    except ValueError as e:
+        sys.exit(str(e))
+
+elif args.command == 'status':
+    status = spool.read_status()
+    if status is None:
+        print("No daemon ever ran on this spool")
+    else:
+        print(f"Daemon {status['pid']} : {status['state']}")
+        if status['job'] is not None:
+            print(f"Job {status['job']} sweep {status['sweep']} FI {status['iteration']}")
+        print(f"done: {status['done']}  failed: {status['failed']}  cancelled: {status['cancelled']}")
+    for state in ["queue", "running"]:
+        for job in spool.jobs(state):
+            print(f"{state:<8} {job}")
+
+else:
+    import src.campaign as campaign
+    from src.daemon import serve
+
+    setup = campaign.read_setup(campaign.read_setup_config(args.setup_file), args.setup_file)
+
+    # SIGTERM stops the daemon like Ctrl-C
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+
+    session = campaign.make_session(setup)
+    session.open()
+    try:
+        metrics = None
+        if args.metrics_file is not None:
+            from src.metrics import MetricsExporter
+            metrics = MetricsExporter(args.metrics_file, args.metrics_interval, campaign="daemon")
+        serve(session, spool, args.poll, metrics)
+    except KeyboardInterrupt:
+        print("\nDaemon stopped")
+    finally:
+        # Disconnected the setup
+        session.close()
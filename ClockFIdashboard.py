@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+This script watches a running campaign from another process: it maps the
+shared memory block published by ClockFI.py --shared-memory and prints the
+outcome counts, the injection rate and the best points, without slowing the
+injection loop down.
+"""
+
+#### LIBRARY ####
+
+import argparse, textwrap
+import time
+
+from src.shared_results import SharedResultsView
+
+# Arguments manager
+parser = argparse.ArgumentParser(description = textwrap.dedent('''
+Live view of a campaign published in shared memory
+
+ * Start the campaign with ClockFI.py --shared-memory NAME
+ * Then run ClockFIdashboard.py NAME in another terminal
+'''), formatter_class=argparse.RawTextHelpFormatter)
+
+parser.add_argument('name',                 type=str,                   help='Name of the shared memory block')
+parser.add_argument('--interval',           type=float, default=2.0,    help='Seconds between two refreshes')
+parser.add_argument('--group',              type=str, default='success', help='Group of the best points')
+parser.add_argument('--top',                type=int, default=10,       help='Number of best points displayed')
+parser.add_argument('--once',               action='store_true',        help='Print one snapshot and exit')
+args = parser.parse_args()
+
+from prettytable import PrettyTable
+
+view = SharedResultsView(args.name)
+if args.group not in view.groups:
+    parser.error(f"unknown group {args.group} (groups are {view.groups})")
+g = view.groups.index(args.group)
+
+previous = None
+try:
+    while True:
+        try:
+            best = view.top_cells(g, args.top)
+            totals, counts = view.snapshot(best)
+        except RuntimeError as e:
+            print(f"\n{time.strftime('%H:%M:%S')}  {e}, retrying")
+            time.sleep(args.interval)
+            continue
+        now = time.monotonic()
+        total = sum(totals)
+        rate = (total - previous[1]) / (now - previous[0]) if previous is not None and now > previous[0] else 0.0
+        previous = (now, total)
+
+        table = PrettyTable()
+        table.field_names = ["Group", "Count", "Rate"]
+        for group, n in zip(view.groups, totals):
+            table.add_row([group, n, f"{n / total:.4f}" if total else "-"])
+
+        top = PrettyTable()
+        top.field_names = list(view.parameters) + [args.group, "total", "rate"]
+        for c, cell in zip(best, counts):
+            top.add_row(list(view.parameters_of(c)) + [cell[g], sum(cell), f"{cell[g] / sum(cell):.2f}"])
+
+        print(f"\n{time.strftime('%H:%M:%S')}  {total} injections  {rate:.1f} inj/s")
+        print(table)
+        print(top)
+
+        if args.once:
+            break
+        time.sleep(args.interval)
+except KeyboardInterrupt:
+    pass
+finally:
+    view.close()
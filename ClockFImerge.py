@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+This script merges the log files of many campaigns (boards, days, bitstream
+builds) into one aggregate of counts by glitch parameters, in parallel.
+"""
+
+#### LIBRARY ####
+
+import argparse, textwrap
+import glob
+
+import src.merge as merge
+
+# Arguments manager
+parser = argparse.ArgumentParser(description = textwrap.dedent('''
+Merge csv logs into one aggregate: width,offset,ext_offset,total,success,corrupted,reset,normal
+
+ * Each log is parsed and counted by a worker process, the partial counts are summed
+ * Rows can be filtered by event and by parameter range
+'''), formatter_class=argparse.RawTextHelpFormatter)
+
+parser.add_argument('logs',                 type=str, nargs='+',        help='Log files or glob patterns')
+parser.add_argument('--output',             type=str, required=True,    help='Counts file to write')
+parser.add_argument('--events',             type=str, nargs='+', default=None, choices=merge.GROUPS, help='Only count these events')
+parser.add_argument('--min-width',          type=float, default=None,   help='Value minimum Width')
+parser.add_argument('--max-width',          type=float, default=None,   help='Value maximum Width')
+parser.add_argument('--min-offset',         type=float, default=None,   help='Value minimum offset')
+parser.add_argument('--max-offset',         type=float, default=None,   help='Value maximum offset')
+parser.add_argument('--min-ext-offset',     type=float, default=None,   help='Value minimum ext_offset')
+parser.add_argument('--max-ext-offset',     type=float, default=None,   help='Value maximum ext_offset')
+parser.add_argument('--processes',          type=int,   default=None,   help='Number of worker processes (number of CPUs by default)')
+args = parser.parse_args()
+
+files = []
+for pattern in args.logs:
+    matches = sorted(glob.glob(pattern))
+    files.extend(matches if matches else [pattern])
+
+ranges = {}
+for p in merge.PARAMETERS:
+    low = getattr(args, "min_" + p)
+    high = getattr(args, "max_" + p)
+    if low is not None or high is not None:
+        ranges[p] = (float("-inf") if low is None else low, float("inf") if high is None else high)
+
+results = merge.merge_logs(files, events=args.events, ranges=ranges, processes=args.processes)
+merge.write_counts(results, args.output)
+
+from prettytable import PrettyTable
+
+table = PrettyTable()
+table.field_names = ["Parameters", "number of visits"]
+for group in results.groups:
+    table.add_row([group, sum(entry[group] for entry in results._result_dict.values())])
+print(f"{len(files)} log files, {len(results._result_dict)} parameter sets")
+print(table)
@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+This script finds the connected regions of success of one or more
+campaigns and reports, for each region, its bounding box, size, peak and
+mean success rate and a representative point to replay.
+"""
+
+#### LIBRARY ####
+
+import argparse, textwrap
+import glob
+
+import src.merge as merge
+import src.regions as regions
+
+# Arguments manager
+parser = argparse.ArgumentParser(description = textwrap.dedent('''
+Connected regions of success in the (width, offset, ext_offset) lattice
+
+ * Give csv logs (merged like ClockFImerge.py) or a counts file written by ClockFImerge.py
+ * The representative of a region is the tested point closest to its success-weighted centroid
+'''), formatter_class=argparse.RawTextHelpFormatter)
+
+parser.add_argument('logs',                 type=str, nargs='*',        help='Log files or glob patterns')
+parser.add_argument('--counts',             type=str, default=None,     help='Counts file written by ClockFImerge.py, instead of logs')
+parser.add_argument('--group',              type=str, default='success', help='Group forming the regions')
+parser.add_argument('--min-rate',           type=float, default=0.0,    help='Minimum rate of a point to belong to a region')
+parser.add_argument('--output',             type=str, default=None,     help='Csv file of the regions')
+parser.add_argument('--top',                type=int, default=20,       help='Number of regions displayed')
+args = parser.parse_args()
+
+if args.counts is not None:
+    results = merge.read_counts(args.counts)
+elif args.logs:
+    files = []
+    for pattern in args.logs:
+        matches = sorted(glob.glob(pattern))
+        files.extend(matches if matches else [pattern])
+    results = merge.merge_logs(files)
+else:
+    parser.error("give log files or --counts")
+
+found = regions.find_regions(regions.cells_from_results(results, args.group), args.min_rate)
+
+if args.output is not None:
+    regions.write_regions(found, args.output, results.parameters)
+
+from prettytable import PrettyTable
+
+table = PrettyTable()
+table.field_names = ["Region", "Size", args.group, "Peak rate", "Mean rate", "Representative", "Min", "Max"]
+for i, r in enumerate(found[:args.top]):
+    table.add_row([i, r["size"], r["count"], f"{r['peak_rate']:.2f}", f"{r['mean_rate']:.2f}", r["representative"], r["min"], r["max"]])
+
+print(f"{len(found)} regions, {sum(r['size'] for r in found)} points")
+print(table)
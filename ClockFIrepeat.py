@@ -7,35 +7,15 @@ This script performs clock glitching attacks using ChipWhisperer against an FPGA
 
 #### LIBRARY ####
 
-import chipwhisperer as cw
-import src.glitch as glitch
-import subprocess
-import csv
-import ast
 import time
-from importlib import reload
-from tqdm.notebook import tqdm
-import re
-import struct
-from progressbar import progressbar
-import progressbar
-import argparse, configparser, textwrap
-import configparser
-import serial
+T_START = time.perf_counter() # reference for the cold start measurement
+
+import argparse, textwrap
 import os
-from prettytable import PrettyTable
-import pandas as pd
-import csv, ast
 
+import src.glitch as glitch
 import src.cw_toolkit as tk
 
-# Widget for display progress bar
-widgets = [
-        progressbar.Percentage(),
-        ' [', progressbar.Timer(), '] ',
-        progressbar.GranularBar(), ' ',
-    ]
-
 # Configuration scope
 PLATFORM = "NOTHING"
 SCOPETYPE = 'OPENADC'
@@ -61,41 +41,74 @@ parser.add_argument('--freq-load-bit',      type=int,                   help='Fr
 parser.add_argument('--bitstream-file',     type=str, required=True,    help='Bitstream file target`s build path')
 parser.add_argument('--repeat',             type=int, default=1,        help='Value repeat')
 parser.add_argument('--Nb-FI',              type=int, default=1,        help='Number of injections on a parameter set')
+parser.add_argument('--burst',              type=int, default=1,        help='Number of target calls per reset/arm cycle, each with its own outcome,\nthe burst ends on the first reset (1: one call per injection)')
 parser.add_argument('--resume-progress',    type=int, default=0,        help='Value to resume progression')
 parser.add_argument('--size-data',          type=int, default=0,        help='Size of character to read by injection')
 parser.add_argument('--function-targeted',  type=str, default='s',      help='Specify the letter for selected the function target:\n')
 parser.add_argument('--function-argument',  type=str, default='',       help='If necessary specify argument for function target\n')
 parser.add_argument('--path-exp',                     default=None,     help='Folder for experimentation')
 parser.add_argument('--csv-log',                      default=None,     help='Log file')
-parser.add_argument('--file-log',    type=str, required = True,  help = 'Log file to analyzed')
+parser.add_argument('--file-log',    type=str, default=None,     help = 'Log file to analyzed')
+parser.add_argument('--replay-db',          type=str, default=None,     help='SQLite database to select the success parameters from, instead of --file-log')
+parser.add_argument('--replay-campaign',    type=str, default=None,     help='Campaign of --replay-db to select from (all by default)')
+parser.add_argument('--min-success-rate',   type=float, default=0.0,    help='Minimum success rate of the parameters selected in --replay-db')
+parser.add_argument('--min-success',        type=int, default=1,        help='Minimum number of past successes of a parameter set to replay it')
+parser.add_argument('--max-tuples',         type=int, default=None,     help='Replay only the parameter sets with the most past successes')
+parser.add_argument('--order',              type=str, default='settings', choices=['settings', 'weight', 'log'],
+                                                                        help='Replay order: settings (fewest width/offset changes),\nweight (most past successes first) or log (order of the log)')
+parser.add_argument('--regions',            action='store_true',        help='Replay one representative point per connected region of success')
+parser.add_argument('--weighted-trials',    action='store_true',        help='Nb-FI injections for the parameter set with the most past successes,\nproportionally fewer for the others')
+parser.add_argument('--golden-runs',        type=int, default=0,        help='Number of runs without glitch to record the expected output,\nvalid outputs differing from it are classified as corrupted (0: disabled)')
+parser.add_argument('--sqlite-db',          type=str, default=None,     help='Also store the results in this SQLite database')
+parser.add_argument('--campaign-name',      type=str, default=None,     help='Campaign name in the SQLite database (csv-log by default)')
+parser.add_argument('--metrics-file',       type=str,   default=None,   help = 'Metrics file (.prom) rewritten for the node exporter textfile collector')
+parser.add_argument('--metrics-interval',   type=float, default=5.0,    help = 'Seconds between two rewrites of the metrics file')
+parser.add_argument('--watchdog',           action='store_true',          help = 'Enforce deadlines on the phases of each injection, a stalled point is\nlogged as "stall" and recovered (flush, nRST, scope reconnect, bitstream reload)')
+parser.add_argument('--deadline',           type=str,   action='append', default=[], help = 'Deadline of a watchdog phase "<phase>=<seconds>", phases: reload, capture, read, recover')
+parser.add_argument('--payload-dict',       action='store_true',        help='Log a payload ID per row, distinct payloads are written once in <csv-log>_payloads.csv')
 args = parser.parse_args()
 
+if args.file_log is None and args.replay_db is None:
+    parser.error("one of --file-log or --replay-db is required")
+if args.burst < 1:
+    parser.error("--burst must be 1 or more")
 
-# Load CSV file
-try:
-    df_log = pd.read_csv(args.file_log, header=None)
-except Exception as e:
-    print("ERROR: read_csv()")
-    lines = []
-    with open(args.file_log, 'r', encoding='utf-8') as file:
-        reader = csv.reader(file)
-        for line in reader:
-            lines.append(line)
-    df_log = pd.DataFrame(lines)
+import progressbar
+from prettytable import PrettyTable
 
+from src.replay import count_tuples, plan_regions, plan_replay, plan_trials
+from src.session import Session
 
-list_width      = []
-list_offset     = []
-list_ext_offset = []
+# Widget for display progress bar
+widgets = [
+        progressbar.Percentage(),
+        ' [', progressbar.Timer(), '] ',
+        progressbar.GranularBar(), ' ',
+    ]
 
-for index, row in df_log.iterrows():
 
-    if row['event'] == 'success':
-        list_width.append(float(row['Width']))
-        list_offset.append(float(row['Offset']))
-        list_ext_offset.append(float(row['Ext_Offset']))
+if args.replay_db is not None:
 
-args = parser.parse_args()
+    # Indexed query of the success parameters
+    from src.results_db import ResultsDB
+    replay_db = ResultsDB(args.replay_db)
+    counts = {(width, offset, ext_offset): [count, total] for width, offset, ext_offset, count, total
+              in replay_db.select("success", args.min_success_rate, args.min_success, campaign=args.replay_campaign)}
+    replay_db.close()
+
+else:
+
+    # Load CSV file
+    counts = count_tuples(tk.read_log(args.file_log))
+
+# Unique parameter sets weighted by their number of successes
+if args.regions:
+    plan = plan_regions(counts, min_rate=args.min_success_rate, min_count=args.min_success, max_tuples=args.max_tuples, order=args.order)
+else:
+    plan = plan_replay(counts, min_count=args.min_success, min_rate=args.min_success_rate, max_tuples=args.max_tuples, order=args.order)
+trials = plan_trials(plan, args.Nb_FI, args.weighted_trials)
+
+print(f"Replay set : {len(plan)} parameter sets, {sum(trials)} injections")
 
 if args.path_exp is not None and not os.path.exists(args.path_exp):
     os.makedirs(args.path_exp)
@@ -111,7 +124,7 @@ if args.path_exp is not None:
     print(f"Bitstream File: {args.bitstream_file}")
     print(f"Function Targeted: {args.function_targeted}")
     print("\nGlitch Parameters 🎯:")
-    print("Testing the values success in file : ", args.file_log_replay)
+    print("Testing the values success in file : ", args.file_log or args.replay_db)
     print(f"Repeat: {args.repeat}")
 
     print("\nLog file 📁: ")
@@ -124,127 +137,120 @@ if args.path_exp is not None:
         file.write(f"FPGA setup is the {args.ftdi_FPGA} \n")
         file.write(f"Function Targeted: {args.function_targeted}\n")
         file.write("\nGlitch Parameters 🎯:\n")
+        file.write(f"Replay set of {args.file_log or args.replay_db}: {len(plan)} parameter sets, {sum(trials)} injections, order {args.order}\n")
         file.write(f"\nRepeat: {args.repeat}\n")
+        if args.burst > 1:
+            file.write(f"Burst: {args.burst} calls per injection\n")
         file.write("\nLog files 📁:\n")
         file.write(args.csv_log)
 
+file_log = None
 if args.csv_log is not None:
     file_log = os.path.join(args.path_exp, args.csv_log)
 
-print("\n Scope preparation ... 🎠\n")
+results_db = None
+if args.sqlite_db is not None:
+    from src.results_db import ResultsDB
+    results_db = ResultsDB(args.sqlite_db, args.campaign_name or args.csv_log or "replay")
 
-# declaration scope and target
-scope = cw.scope(sn=args.sn_chipwhisperer)
-target = cw.target(scope)
+payloads = None
+if args.payload_dict and file_log is not None:
+    payloads = tk.PayloadDictionary(file_log)
 
-# Checking the ChipWhisperer 
-tk.setup_generic(scope, target)
+# Connection to the ChipWhisperer and the FPGA target, bitstream loaded
+session = Session(args.name_board, args.sn_chipwhisperer, args.ftdi_FPGA, args.freq_load_bit, args.bitstream_file)
+if args.watchdog:
+    from src.watchdog import Watchdog, parse_deadlines
+    try:
+        session.watchdog = Watchdog(parse_deadlines(args.deadline))
+    except ValueError as e:
+        parser.error(str(e))
+session.open()
+scope = session.scope
+target = session.target
 
-# Clock configuration for 25Mhz
-# Multiply the ChipWhisperer clock to get 25 MHz
-scope.clock.clkgen_mul = 7
-target.baud = 115200
-print("baudrate : ", target.baud) # Display the baudrate communication
+scope.glitch.repeat = args.repeat
 
-# ## Settings configuration for clock glitch
-scope.glitch.clk_src = 'clkgen'
-scope.glitch.trigger_src = 'ext_single'
-scope.glitch.output = "clock_xor"
-scope.io.hs2 = "glitch"
+if args.golden_runs > 0:
+    session.golden_run(args.function_targeted, args.function_argument, args.size_data, args.golden_runs)
 
 # ## Results of fault injections
-gc = glitch.GlitchController(groups=["success", "reset", "normal"], parameters=["width", "offset", "ext_offset"])
+gc = glitch.GlitchController(groups=["success", "corrupted", "reset", "normal"], parameters=["width", "offset", "ext_offset"])
 
 print("\nFault injection in progress ... ⏰\n")
 
+broken = False
+
 iteration_progressbar = 0 # variable for progress bar
 iteration_success     = 0
 iteration_normal      = 0
+iteration_corrupted   = 0
 iteration_reset       = 0
+iteration_stall       = 0
 iteration_FI          = 0
 
-# reload the bitstream
-tk.reboot_bitstream(args.name_board, args.ftdi_FPGA, args.freq_load_bit, args.bitstream_file)
+metrics = None
+if args.metrics_file is not None:
+    from src.metrics import MetricsExporter
+    metrics = MetricsExporter(args.metrics_file, args.metrics_interval, campaign=args.campaign_name or args.csv_log, grid_size=sum(trials))
 
-with progressbar.ProgressBar(max_value=args.Nb_FI*len(list_width), widgets=widgets) as bar:
+with progressbar.ProgressBar(max_value=sum(trials), widgets=widgets) as bar:
 
-    for param_select in range(len(list_width)):
+    for (glitch_settings, weight, rate), nb_fi in zip(plan, trials):
 
-        for i in range(args.Nb_FI):
+        done = 0 # injections of this parameter set
+        while done < nb_fi:
 
-            iteration_progressbar += 1
-            iteration_FI += 1 # counter number of fault injection
+            if iteration_FI + 1 < args.resume_progress:
+                # skipped up to the resumed injection
+                skip = min(nb_fi - done, args.resume_progress - 1 - iteration_FI)
+                iteration_progressbar += skip
+                iteration_FI += skip
+                done += skip
+                continue
 
-            if iteration_FI >= args.resume_progress:
-
-                print("progressbar : ", iteration_progressbar)
+            if iteration_FI + 1 == max(args.resume_progress, 1):
+                print(f"Cold start to first injection : {time.perf_counter() - T_START:.3f} s")
 
-                bar.update(iteration_progressbar)
+            # up to --burst injections of the parameter set per reset/arm cycle
+            outcomes = session.inject_burst(gc, glitch_settings, args.function_targeted, args.function_argument, args.size_data,
+                                            min(args.burst, nb_fi - done))
 
-                scope.glitch.width = list_width[param_select]
-                scope.glitch.offset = list_offset[param_select]
-                scope.glitch.ext_offset = list_ext_offset[param_select]
+            for event, data_read in outcomes:
 
-                print("\nWidth | Offset | Ext_Offset [", scope.glitch.width, " | ", scope.glitch.offset, " | ", scope.glitch.ext_offset, "]\n")
+                iteration_progressbar += 1
+                iteration_FI += 1 # counter number of fault injection
+                done += 1
 
-                if scope.adc.state:
-                    print(scope.adc.state)
-                    print("reboot ... 💥")
-                    gc.add("reset", (scope.glitch.width, scope.glitch.offset, scope.glitch.ext_offset))
-                    tk.reboot_flush(scope, target)
-                    tk.reboot_bitstream(args.name_board, args.ftdi_FPGA, args.freq_load_bit, args.bitstream_file)
+                print("progressbar : ", iteration_progressbar)
 
-                tk.reboot_flush(scope, target) # initialization
+                bar.update(iteration_progressbar)
 
-                scope.arm()
+                if event == "success":
+                    broken = True
+                    iteration_success += 1
+                elif event == "corrupted":
+                    iteration_corrupted += 1
+                elif event == "reset":
+                    iteration_reset += 1
+                elif event == "stall":
+                    iteration_stall += 1
+                else:
+                    iteration_normal += 1
 
-                tk.target_function(target, args.function_targeted, args.function_argument)
+                data_read =  str(session.scope.io.tio_states[2]) + ", " + data_read
 
-                ret = scope.capture()
+                tk.log_file(file_log, iteration_FI, event, *session.last_parameters, data_read, payloads)
 
-                if ret:
-                    print('Timeout - no trigger')
-                    gc.add("reset", (scope.glitch.width, scope.glitch.offset, scope.glitch.ext_offset))
-                    print("reboot ... 💥")
-                    tk.reboot_bitstream(args.name_board, args.ftdi_FPGA, args.freq_load_bit, args.bitstream_file)
-                    tk.reboot_flush(scope, target)
-                    iteration_reset += 1
-                    event = "reset"
+                if results_db is not None:
+                    results_db.add(iteration_FI, event, *session.last_parameters, tk.printable(data_read))
 
-                else:
-                    val = target.simpleserial_read_witherrors('r', 1, glitch_timeout=10, ack=False)
-                    print(val)
-
-                    if val['valid'] is False:
-                        gc.add("reset", (scope.glitch.width, scope.glitch.offset, scope.glitch.ext_offset))
-                        plt.plot(scope.glitch.width, scope.glitch.offset, 'xr', alpha=1)
-                        print("reboot ... 💥")
-                        iteration_reset += 1
-                        event = "reset"
-
-                    else:
-                        if val['payload'] == bytearray([0xc]):
-                            broken = True
-                            gc.add("success", (scope.glitch.width, scope.glitch.offset, scope.glitch.ext_offset))
-                            print(val)
-                            print(scope.glitch.width, scope.glitch.offset, scope.glitch.ext_offset)
-                            plt.plot(scope.glitch.width, scope.glitch.offset, 'go', alpha=1)
-                            print("Successful injection ! 🐙 \n")
-                            iteration_success += 1
-                            event = "success"
-                        else:
-                            gc.add("normal", (scope.glitch.width, scope.glitch.offset, scope.glitch.ext_offset))
-                            event = "normal"
-                            iteration_normal+=1
-
-                data_read = target.read(args.size_data)
-
-                data_read =  str(scope.io.tio_states[2]) + ", " + data_read
-
-                tk.log_file(file_log, iteration_FI, event, scope.glitch.width, scope.glitch.offset, scope.glitch.ext_offset, data_read)
+                if metrics is not None:
+                    metrics.update(gc, iteration_FI, session)
         
     print("FI: ", iteration_FI)
     print("normal: ", iteration_normal)
+    print("corrupted: ", iteration_corrupted)
     print("reset: ", iteration_reset)
     print("success: ", iteration_success)
 
@@ -253,7 +259,11 @@ table = PrettyTable()
 table.field_names = ["Parameters", "number of visits"]
 table.add_row(["success", iteration_success])
 table.add_row(["normal", iteration_normal])
+table.add_row(["corrupted", iteration_corrupted])
 table.add_row(["reset", iteration_reset])
+if session.watchdog is not None:
+    table.add_row(["stall", iteration_stall])
+    table.add_row(["stall time (s)", f"{session.stall_time:.1f}"])
 print(table)
 
 with open(README, 'a') as file:
@@ -261,9 +271,15 @@ with open(README, 'a') as file:
     table_str = table.get_string()
     file.write(table_str)
     file.write("\nWith a total FI of ")
-    file.write(str(args.Nb_FI))
+    file.write(str(iteration_FI))
+
+if results_db is not None:
+    results_db.close()
+
+if metrics is not None:
+    metrics.update(gc, iteration_FI, session, force=True)
 
 # Disconnected the setup
-tk.disconnected_setup(scope, target)
+session.close()
 
 assert broken, "No fault was successfully injected"
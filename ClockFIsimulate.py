@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+This script evaluates search strategies offline: an exhaustive campaign log
+is replayed as an oracle to estimate, for each strategy, the number of
+injections and the bench time needed to find a number of success points.
+"""
+
+#### LIBRARY ####
+
+import argparse, textwrap
+import csv
+import glob
+
+import src.simulator as simulator
+
+# Arguments manager
+parser = argparse.ArgumentParser(description = textwrap.dedent('''
+Offline simulation of search strategies against a recorded campaign
+
+ * The logs (ideally of an exhaustive grid) give the outcome probabilities of each cell
+ * Outcome costs come from the timings.json written by ClockFI.py in its --path-exp,
+   or --cost <event>=<seconds> (1 s per injection otherwise)
+ * Every (strategy, seed) pair runs in its own worker process
+'''), formatter_class=argparse.RawTextHelpFormatter)
+
+parser.add_argument('logs',                 type=str, nargs='+',        help='Log files or glob patterns of the oracle campaign')
+parser.add_argument('--timings',            type=str, default=None,     help='timings.json of the campaign')
+parser.add_argument('--cost',               type=str, action='append', default=[], help='Cost of an outcome "<event>=<seconds>", overrides --timings')
+parser.add_argument('--strategies',         type=str, nargs='+', default=simulator.DEFAULT_STRATEGIES, choices=simulator.STRATEGIES, help='Strategies simulated (sobol needs scipy)')
+parser.add_argument('--seeds',              type=int, default=10,       help='Number of seeds per strategy')
+parser.add_argument('--goal',               type=int, default=1,        help='Number of distinct success points to find')
+parser.add_argument('--budget',             type=int, default=None,     help='Maximum injections per run (4 times the grid by default)')
+parser.add_argument('--output',             type=str, default=None,     help='Csv file of every run')
+parser.add_argument('--processes',          type=int, default=None,     help='Number of worker processes (number of CPUs by default)')
+args = parser.parse_args()
+
+files = []
+for pattern in args.logs:
+    matches = sorted(glob.glob(pattern))
+    files.extend(matches if matches else [pattern])
+
+overrides = {}
+for spec in args.cost:
+    event, _, seconds = spec.partition("=")
+    try:
+        overrides[event] = float(seconds)
+    except ValueError:
+        parser.error(f"invalid cost {spec!r}, expected <event>=<seconds>")
+
+oracle = simulator.load_oracle(files, args.processes)
+costs = simulator.read_costs(args.timings, overrides)
+
+grid = 1
+for values in oracle["axes"]:
+    grid *= len(values)
+budget = args.budget if args.budget is not None else 4 * grid
+
+print(f"Oracle: {len(oracle['cells'])} cells of a grid of {grid}, " +
+      ", ".join(f"{len(values)} values in [{values[0]:g}, {values[-1]:g}]" for values in oracle["axes"]))
+print("Costs (s):", ", ".join(f"{event} {cost:g}" for event, cost in sorted(costs.items())) or f"{simulator.DEFAULT_COST:g} per injection")
+
+runs = simulator.simulate_strategies(oracle, costs, args.strategies, range(args.seeds), args.goal, budget, args.processes)
+
+if args.output is not None:
+    with open(args.output, 'w', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=list(runs[0]))
+        writer.writeheader()
+        writer.writerows(runs)
+
+from prettytable import PrettyTable
+
+table = PrettyTable()
+table.field_names = ["Strategy", "runs", f"reached {args.goal}", "median FI", "mean FI", "median time (s)", "mean time (s)", "mean unknown"]
+for strategy, n, reached, median_fi, mean_fi, median_s, mean_s, unknown in simulator.summarize(runs):
+    table.add_row([strategy, n, reached, median_fi, f"{mean_fi:.1f}", f"{median_s:.1f}", f"{mean_s:.1f}", f"{unknown:.1f}"])
+print(table)
+
+if any(run["unknown"] for run in runs):
+    print(f"Warning: the oracle misses {grid - len(oracle['cells'])} points of its grid, their visits are counted as unknown, not as injections")
@@ -0,0 +1,195 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+Micro-benchmarks of the host-side hot paths, no hardware needed.
+
+- GlitchController.glitch_values / _loop_rec iteration over a grid
+- GlitchResults.add with 1M-10M entries
+- GlitchResults.calc with different ignore_params
+- GlitchResults.res_dict_of_lists
+- cw_toolkit.log_file throughput, with and without payload dictionary
+
+Each benchmark keeps the best of `--repeat` runs. Results are written as
+JSON; `--save` stores them as the baseline and `--compare` fails (exit
+status 1) when a benchmark is slower than the baseline by more than
+`--threshold`.
+
+    $ python3 benchmarks/bench_hotpaths.py --save
+    $ python3 benchmarks/bench_hotpaths.py --compare
+    $ python3 benchmarks/bench_hotpaths.py --sizes 1000000 10000000 --output hotpaths.json
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import src.glitch as glitch
+import src.cw_toolkit as tk
+
+GROUPS = ["success", "corrupted", "reset", "normal"]
+PARAMETERS = ["width", "offset", "ext_offset"]
+DEFAULT_BASELINE = os.path.join(ROOT, "benchmarks", "baseline_hotpaths.json")
+
+
+def best_of(repeat, func):
+    """
+    Runs func() `repeat` times.
+
+    Returns:
+    tuple: (best time in seconds, number of items processed by func).
+    """
+    best = None
+    items = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        items = func()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best, items
+
+
+def controller(width, offset, ext_offset):
+    gc = glitch.GlitchController(groups=GROUPS, parameters=PARAMETERS)
+    gc.set_range("width", -(width // 2), width - width // 2 - 1)
+    gc.set_range("offset", -(offset // 2), offset - offset // 2 - 1)
+    gc.set_range("ext_offset", 0, ext_offset - 1)
+    gc.set_global_step(1)
+    return gc
+
+
+def random_results(n, grid, seed=0):
+    """
+    GlitchResults filled with n random injections over a grid of `grid` cells.
+    """
+    rng = random.Random(seed)
+    results = glitch.GlitchResults(groups=GROUPS, parameters=PARAMETERS)
+    side = max(int(round(grid ** (1 / 3))), 1)
+    for _ in range(n):
+        results.add(rng.choice(GROUPS), (rng.randrange(side), rng.randrange(side), rng.randrange(side)))
+    return results
+
+
+def bench_glitch_values(repeat, grid):
+    gc = controller(*grid)
+
+    def run():
+        n = 0
+        for _ in gc.glitch_values():
+            n += 1
+        return n
+    return best_of(repeat, run)
+
+
+def bench_add(repeat, n, cells):
+    rng = random.Random(0)
+    side = max(int(round(cells ** (1 / 3))), 1)
+    rows = [(rng.choice(GROUPS), (rng.randrange(side), rng.randrange(side), rng.randrange(side))) for _ in range(min(n, 1000000))]
+    # the rows are replayed until n entries, sliced here and not in the timed run
+    chunks = [rows] * (n // len(rows))
+    if n % len(rows):
+        chunks.append(rows[:n % len(rows)])
+
+    def run():
+        results = glitch.GlitchResults(groups=GROUPS, parameters=PARAMETERS)
+        add = results.add
+        for chunk in chunks:
+            for group, parameters in chunk:
+                add(group, parameters)
+        return n
+    return best_of(repeat, run)
+
+
+def bench_calc(repeat, results, ignore_params):
+    return best_of(repeat, lambda: (results.calc(ignore_params=ignore_params), len(results._result_dict))[1])
+
+
+def bench_res_dict_of_lists(repeat, results):
+    data = results.calc()
+    return best_of(repeat, lambda: (results.res_dict_of_lists(data), len(data))[1])
+
+
+def bench_log_file(repeat, n, dictionary):
+    rng = random.Random(0)
+    payloads_pool = ["r\x00 0c", "garbage\x07\x01", "normal output 1234", ""]
+    rows = [(i, rng.choice(GROUPS), rng.randrange(-49, 50), rng.randrange(-49, 50), rng.randrange(201), rng.choice(payloads_pool)) for i in range(n)]
+
+    def run():
+        with tempfile.TemporaryDirectory() as folder:
+            reg_file = os.path.join(folder, "log.csv")
+            payloads = tk.PayloadDictionary(reg_file) if dictionary else None
+            for row in rows:
+                tk.log_file(reg_file, *row, payloads)
+        return n
+    return best_of(repeat, run)
+
+
+def record(results, name, seconds, items):
+    results[name] = {"seconds": seconds, "items": items, "us_per_item": seconds / items * 1e6 if items else None}
+    print(f"{name:<44} {seconds:9.3f} s  {results[name]['us_per_item']:9.3f} us/item  ({items} items)")
+
+
+parser = argparse.ArgumentParser(description="Micro-benchmarks of the host-side hot paths")
+parser.add_argument('--repeat',     type=int,   default=3,                  help='Runs per benchmark, the best one is kept')
+parser.add_argument('--sizes',      type=int,   nargs='+', default=[1000000], help='Number of entries for GlitchResults.add')
+parser.add_argument('--cells',      type=int,   default=99 * 99 * 201,      help='Number of distinct parameter sets in GlitchResults')
+parser.add_argument('--grid',       type=int,   nargs=3, default=[99, 99, 201], help='Grid size (width offset ext_offset) for glitch_values')
+parser.add_argument('--log-rows',   type=int,   default=100000,             help='Rows written by the log_file benchmark')
+parser.add_argument('--output',     type=str,   default=None,               help='Write the results to this JSON file')
+parser.add_argument('--save',       action='store_true',                    help='Store the results as the baseline')
+parser.add_argument('--compare',    action='store_true',                    help='Compare the results to the baseline')
+parser.add_argument('--baseline',   type=str,   default=DEFAULT_BASELINE,   help='Baseline file')
+parser.add_argument('--threshold',  type=float, default=0.2,                help='Relative slowdown reported as a regression')
+args = parser.parse_args()
+
+results = {}
+
+record(results, "glitch_values {}x{}x{}".format(*args.grid), *bench_glitch_values(args.repeat, args.grid))
+
+for n in args.sizes:
+    record(results, f"GlitchResults.add {n}", *bench_add(args.repeat, n, args.cells))
+
+gr = random_results(max(args.sizes), args.cells)
+for ignore in ([], [2], [1, 2], [0, 1, 2]):
+    record(results, f"GlitchResults.calc ignore_params={ignore}", *bench_calc(args.repeat, gr, ignore))
+record(results, "GlitchResults.res_dict_of_lists", *bench_res_dict_of_lists(args.repeat, gr))
+
+record(results, "log_file", *bench_log_file(args.repeat, args.log_rows, False))
+record(results, "log_file payload_dict", *bench_log_file(args.repeat, args.log_rows, True))
+
+report = {"python": sys.version.split()[0], "time": time.strftime("%Y-%m-%dT%H:%M:%S"), "benchmarks": results}
+
+if args.output is not None:
+    with open(args.output, 'w') as file:
+        json.dump(report, file, indent=2)
+
+status = 0
+if args.compare:
+    if not os.path.exists(args.baseline):
+        sys.exit(f"No baseline {args.baseline}, record one with --save")
+    with open(args.baseline) as file:
+        baseline = json.load(file)["benchmarks"]
+    print(f"\nCompared to {args.baseline}:")
+    for name, res in results.items():
+        if name not in baseline or not baseline[name]["us_per_item"]:
+            continue
+        ratio = res["us_per_item"] / baseline[name]["us_per_item"]
+        flag = "REGRESSION" if ratio > 1 + args.threshold else ""
+        if flag:
+            status = 1
+        print(f"{name:<44} x{ratio:6.2f} {flag}")
+
+if args.save:
+    with open(args.baseline, 'w') as file:
+        json.dump(report, file, indent=2)
+    print(f"\nBaseline saved in {args.baseline}")
+
+sys.exit(status)
@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+Cold-start benchmark of the Clock Fault Injector entry points.
+
+Every measurement runs in a fresh interpreter so that nothing is cached
+between samples:
+
+- import of src.cw_toolkit and src.glitch
+- `ClockFI.py --help` and `ClockFIrepeat.py --help` (argument parsing only)
+- import of chipwhisperer, if it is installed
+
+With `--command`, a full campaign command line is also launched and the time
+until it prints the "Cold start to first injection" line is measured. The
+process is stopped as soon as the first injection is reached.
+
+    $ python3 benchmarks/bench_startup.py --runs 10 --output startup.json
+    $ python3 benchmarks/bench_startup.py --command "python3 ClockFI.py --name-board ... --csv-log log.csv"
+"""
+
+import argparse
+import json
+import os
+import shlex
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MARKER = "Cold start to first injection"
+
+
+def time_command(command, runs):
+    """
+    Runs a command several times in a fresh interpreter.
+
+    Parameters:
+    command (list): Command line to run.
+    runs (int): Number of samples.
+
+    Returns:
+    list: Wall time of each run in seconds, None if the command failed.
+    """
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        ret = subprocess.run(command, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        samples.append(time.perf_counter() - start)
+        if ret.returncode != 0:
+            return None
+    return samples
+
+
+def time_first_injection(command, timeout):
+    """
+    Launches a campaign and waits for its first injection.
+
+    Parameters:
+    command (list): Campaign command line.
+    timeout (float): Seconds to wait before giving up.
+
+    Returns:
+    tuple: (wall time seen from outside, time reported by the script), None on failure.
+    """
+    start = time.perf_counter()
+    proc = subprocess.Popen(command, cwd=ROOT, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    try:
+        for line in proc.stdout:
+            if line.startswith(MARKER):
+                wall = time.perf_counter() - start
+                reported = float(line.split(":")[1].split()[0])
+                return wall, reported
+            if time.perf_counter() - start > timeout:
+                break
+        return None
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def summary(samples):
+    return {
+        "runs": len(samples),
+        "median_s": statistics.median(samples),
+        "min_s": min(samples),
+        "max_s": max(samples),
+    }
+
+
+parser = argparse.ArgumentParser(description="Cold-start time of the Clock Fault Injector entry points")
+parser.add_argument('--runs',       type=int,   default=5,      help='Number of fresh interpreters per measurement')
+parser.add_argument('--command',    type=str,   default=None,   help='Full campaign command line to time up to the first injection')
+parser.add_argument('--timeout',    type=float, default=300,    help='Seconds to wait for the first injection')
+parser.add_argument('--output',     type=str,   default=None,   help='Write the results to this JSON file')
+args = parser.parse_args()
+
+python = sys.executable
+stages = {
+    "python": [python, "-c", "pass"],
+    "import src.cw_toolkit": [python, "-c", "import src.cw_toolkit"],
+    "import src.glitch": [python, "-c", "import src.glitch"],
+    "ClockFI.py --help": [python, "ClockFI.py", "--help"],
+    "ClockFIrepeat.py --help": [python, "ClockFIrepeat.py", "--help"],
+    "import chipwhisperer": [python, "-c", "import chipwhisperer"],
+}
+
+results = {}
+for name, command in stages.items():
+    samples = time_command(command, args.runs)
+    if samples is None:
+        print(f"{name:<28} failed (missing dependency?)")
+        continue
+    results[name] = summary(samples)
+    print(f"{name:<28} median {results[name]['median_s']*1000:8.1f} ms   min {results[name]['min_s']*1000:8.1f} ms")
+
+if args.command is not None:
+    first = time_first_injection(shlex.split(args.command), args.timeout)
+    if first is None:
+        print("first injection             not reached")
+    else:
+        results["first injection"] = {"wall_s": first[0], "reported_s": first[1]}
+        print(f"{'first injection':<28} wall {first[0]:8.3f} s   reported {first[1]:8.3f} s")
+
+if args.output is not None:
+    with open(args.output, 'w') as file:
+        json.dump({"python": sys.version.split()[0], "stages": results}, file, indent=2)
@@ -0,0 +1,323 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+Campaign files: several sweeps run back to back over one hardware session.
+
+A campaign file is an INI file read with cw_toolkit.read_config. The [setup]
+section describes the hardware, each [sweep:<name>] section describes one
+sweep. Keys are the ClockFI.py options written with underscores, and values
+placed in [DEFAULT] are shared by every sweep::
+
+    [DEFAULT]
+    repeat = 5
+    function_targeted = s
+
+    [setup]
+    name_board = arty
+    sn_chipwhisperer = 50203120394a3...
+    ftdi_FPGA = 210319B0B1C0
+    bitstream_file = build/top.bit
+    path_exp = exp/overnight
+    watchdog = yes
+    deadlines = reload=60 read=2
+
+    [sweep:loop_narrow]
+    min_width = -10
+    max_width = 10
+    min_ext_offset = 0
+    max_ext_offset = 50
+
+    [sweep:loop_arg]
+    function_argument = 1234
+    repeat = 10
+
+Each sweep writes its README.md and csv log in <path_exp>/<name>/.
+"""
+
+import os
+
+import src.glitch as glitch
+import src.cw_toolkit as tk
+
+SETUP_KEYS = ["name_board", "sn_chipwhisperer", "ftdi_fpga", "freq_load_bit", "bitstream_file", "path_exp", "watchdog", "deadlines"]
+
+# Same defaults as the ClockFI.py arguments
+SWEEP_INT_DEFAULTS = {
+    "min_width": -49,
+    "max_width": 49,
+    "min_offset": -49,
+    "max_offset": 49,
+    "min_ext_offset": 0,
+    "max_ext_offset": 200,
+    "repeat": 5,
+    "resume_progress": 0,
+    "size_data": 0,
+    "golden_runs": 0,
+    "budget": 20000,
+    "seed": 0,
+}
+
+SWEEP_FLOAT_DEFAULTS = {
+    "step": 1.0,
+}
+
+SWEEP_STR_DEFAULTS = {
+    "sampling": "grid",
+    "function_targeted": "s",
+    "function_argument": "",
+    "csv_log": None,
+    "sqlite_db": None,
+}
+
+SWEEP_BOOL_DEFAULTS = {
+    "payload_dict": False,
+}
+
+# Same choices as ClockFI.py --sampling
+SAMPLING_CHOICES = ["grid"] + glitch.GlitchController.SAMPLING_METHODS
+
+
+def read_campaign(file_path):
+    """
+    Reads a campaign file.
+
+    Parameters:
+    file_path (str): Path to the campaign file.
+
+    Returns:
+    tuple: (setup dict, list of (sweep name, sweep dict)) in file order.
+    """
+    config = read_setup_config(file_path)
+    setup = read_setup(config, file_path)
+
+    sweeps = read_sweeps(config)
+    if not sweeps:
+        raise ValueError(f"{file_path}: no [sweep:<name>] section")
+
+    return setup, sweeps
+
+
+def read_setup_config(file_path):
+    """
+    Reads a campaign file that must contain a [setup] section.
+
+    Parameters:
+    file_path (str): Path to the campaign file.
+
+    Returns:
+    configparser.ConfigParser: Configuration data.
+    """
+    if not os.path.exists(file_path):
+        raise FileNotFoundError(f"Campaign file {file_path} not found")
+
+    config = tk.read_config(file_path)
+
+    if not config.has_section("setup"):
+        raise ValueError(f"{file_path}: missing [setup] section")
+    return config
+
+
+def read_setup(config, file_path=""):
+    """
+    Returns the [setup] section of a configuration.
+
+    Parameters:
+    config (configparser.ConfigParser): Configuration data.
+    file_path (str): Path of the file, for error messages.
+
+    Returns:
+    dict: Hardware setup, keys of SETUP_KEYS.
+    """
+    section = config["setup"]
+    setup = {key: section.get(key) for key in SETUP_KEYS}
+    for key in ["name_board", "sn_chipwhisperer", "bitstream_file"]:
+        if not setup[key]:
+            raise ValueError(f"{file_path}: [setup] needs a value for {key}")
+    if setup["freq_load_bit"]:
+        setup["freq_load_bit"] = int(setup["freq_load_bit"])
+    setup["watchdog"] = section.getboolean("watchdog", fallback=False)
+    setup["deadlines"] = (setup["deadlines"] or "").split()
+    return setup
+
+
+def make_session(setup):
+    """
+    Returns the (not yet opened) Session of a [setup] section, with its
+    watchdog if enabled.
+    """
+    from src.session import Session
+
+    session = Session(setup["name_board"], setup["sn_chipwhisperer"], setup["ftdi_fpga"], setup["freq_load_bit"], setup["bitstream_file"])
+    if setup["watchdog"]:
+        from src.watchdog import Watchdog, parse_deadlines
+        session.watchdog = Watchdog(parse_deadlines(setup["deadlines"]))
+    return session
+
+
+def parse_sweep(section):
+    """
+    Converts a [sweep:<name>] section into a dictionary of typed values.
+
+    Parameters:
+    section (configparser.SectionProxy): Sweep section.
+
+    Returns:
+    dict: Sweep settings, with the ClockFI.py defaults for missing keys.
+    """
+    sweep = {}
+    for key, default in SWEEP_INT_DEFAULTS.items():
+        sweep[key] = section.getint(key, fallback=default)
+    for key, default in SWEEP_FLOAT_DEFAULTS.items():
+        sweep[key] = section.getfloat(key, fallback=default)
+    for key, default in SWEEP_STR_DEFAULTS.items():
+        sweep[key] = section.get(key, fallback=default)
+    for key, default in SWEEP_BOOL_DEFAULTS.items():
+        sweep[key] = section.getboolean(key, fallback=default)
+    if sweep["sampling"] not in SAMPLING_CHOICES:
+        raise ValueError(f"[{section.name}]: invalid sampling {sweep['sampling']} (choices are {', '.join(SAMPLING_CHOICES)})")
+    return sweep
+
+
+def read_sweeps(config):
+    """
+    Returns the [sweep:<name>] sections of a configuration.
+
+    Parameters:
+    config (configparser.ConfigParser): Configuration data.
+
+    Returns:
+    list: (sweep name, sweep dict) in file order.
+    """
+    return [(name[len("sweep:"):], parse_sweep(config[name])) for name in config.sections() if name.startswith("sweep:")]
+
+
+def run_sweep(session, name, sweep, path_exp, cancelled=None, metrics=None):
+    """
+    Runs one sweep over an opened session.
+
+    Parameters:
+    session (src.session.Session): Opened hardware session.
+    name (str): Name of the sweep.
+    sweep (dict): Sweep settings from parse_sweep.
+    path_exp (str): Campaign folder, None to skip README and log.
+    cancelled (callable): Called with the injection number after each injection,
+                          the sweep stops when it returns True.
+    metrics (src.metrics.MetricsExporter): Live metrics, labelled with the sweep name.
+
+    Returns:
+    glitch.GlitchController: Controller holding the results of the sweep.
+    """
+    from prettytable import PrettyTable
+
+    print(f"\n=== Sweep {name} ===\n")
+
+    gc = glitch.GlitchController(groups=["success", "corrupted", "reset", "normal"], parameters=["width", "offset", "ext_offset"])
+    gc.set_range("width", sweep["min_width"], sweep["max_width"])
+    gc.set_range("offset", sweep["min_offset"], sweep["max_offset"])
+    gc.set_range("ext_offset", sweep["min_ext_offset"], sweep["max_ext_offset"])
+    gc.set_global_step(sweep["step"])
+
+    session.scope.glitch.repeat = sweep["repeat"]
+
+    if metrics is not None:
+        metrics.labels["sweep"] = name
+
+    session.golden = None
+    if sweep["golden_runs"] > 0:
+        session.golden_run(sweep["function_targeted"], sweep["function_argument"], sweep["size_data"], sweep["golden_runs"])
+
+    README = None
+    file_log = None
+    payloads = None
+    results_db = None
+    if sweep["sqlite_db"]:
+        from src.results_db import ResultsDB
+        results_db = ResultsDB(sweep["sqlite_db"], name)
+
+    if path_exp is not None:
+        folder = os.path.join(path_exp, name)
+        os.makedirs(folder, exist_ok=True)
+        README = os.path.join(folder, "README.md")
+        file_log = os.path.join(folder, sweep["csv_log"] or name + ".csv")
+        if sweep["payload_dict"]:
+            payloads = tk.PayloadDictionary(file_log)
+
+        table_conf = PrettyTable()
+        table_conf.field_names = ["Parameters", "Minimum", "Maximum"]
+        table_conf.add_row(["width", sweep["min_width"], sweep["max_width"]])
+        table_conf.add_row(["offset", sweep["min_offset"], sweep["max_offset"]])
+        table_conf.add_row(["ext_offset", sweep["min_ext_offset"], sweep["max_ext_offset"]])
+
+        with open(README, 'a') as file:
+            file.write(f"Sweep {name} 🔧 : \n")
+            file.write(f"Bitstream File: {session.bitstream_file} \n")
+            file.write(f"ChipWhisperer setup is the {session.sn_chipwhisperer} \n")
+            file.write(f"FPGA setup is the {session.ftdi_FPGA} \n")
+            file.write(f"Function Targeted: {sweep['function_targeted']}\n")
+            file.write(f"Function Argument: {sweep['function_argument']}\n")
+            file.write("\nGlitch Parameters 🎯:\n")
+            file.write(table_conf.get_string())
+            file.write(f"\nStep: {sweep['step']}\n")
+            file.write(f"\nRepeat: {sweep['repeat']}\n")
+            if sweep["sampling"] != "grid":
+                file.write(f"Sampling: {sweep['sampling']}, budget {sweep['budget']}, seed {sweep['seed']}\n")
+            file.write("\nLog files 📁:\n")
+            file.write(file_log)
+
+    stalls, stall_time = session.stall_count, session.stall_time
+    iteration_FI = 0 # position in the sweep
+    call_FI = max(sweep["resume_progress"] - 1, 0) # number of the logged outcome, see ClockFI.py
+    if sweep["sampling"] == "grid":
+        glitch_values = gc.glitch_values()
+    else:
+        # space filling sample, resumed directly at its index
+        iteration_FI = max(sweep["resume_progress"] - 1, 0)
+        glitch_values = gc.sample_values(sweep["budget"], sweep["sampling"], sweep["seed"], iteration_FI)
+
+    for glitch_settings in glitch_values:
+
+        iteration_FI += 1 # counter number of fault injection
+        if iteration_FI < sweep["resume_progress"]:
+            continue
+
+        # one injection, after the reset of a trigger still high if any
+        outcomes = session.inject_burst(gc, glitch_settings, sweep["function_targeted"], sweep["function_argument"], sweep["size_data"], 1)
+
+        for event, data_read in outcomes:
+            call_FI += 1
+            tk.log_file(file_log, call_FI, event, *session.last_parameters, data_read, payloads)
+
+            if results_db is not None:
+                results_db.add(call_FI, event, *session.last_parameters, tk.printable(data_read))
+
+        if metrics is not None:
+            metrics.update(gc, iteration_FI, session, len(outcomes))
+
+        if cancelled is not None and cancelled(iteration_FI):
+            print(f"Sweep {name} cancelled at FI {iteration_FI}")
+            break
+
+    if results_db is not None:
+        results_db.close()
+
+    if metrics is not None:
+        metrics.update(gc, iteration_FI, session, force=True)
+
+    table = PrettyTable()
+    table.field_names = ["Parameters", "number of visits"]
+    for group, count in zip(gc.groups, gc.group_counts):
+        table.add_row([group, count])
+    if session.watchdog is not None:
+        table.add_row(["stall", session.stall_count - stalls])
+        table.add_row(["stall time (s)", f"{session.stall_time - stall_time:.1f}"])
+    print(table)
+
+    if README is not None:
+        with open(README, 'a') as file:
+            file.write("\n\n --- Results ---\n")
+            file.write(table.get_string())
+            file.write("\nWith a total FI of ")
+            file.write(str(iteration_FI))
+
+    return gc
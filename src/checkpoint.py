@@ -0,0 +1,162 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+Checkpoints of the full state of a campaign, for crash recovery.
+
+--resume-progress only restores the injection number: the results of the
+GlitchController and the counters of the final table would start from zero,
+or have to be rebuilt by parsing the whole log. A checkpoint holds all of
+them (grid position, counters, group counts, aggregated results per point
+and golden output hash), rewritten every `interval` seconds through a
+temporary file, fsync and rename, so a crash at any time leaves either the
+previous or the new checkpoint, never a truncated one.
+
+The file holds no pickle, loading it runs no code::
+
+    8 bytes   magic "CLKFICKP"
+    uint32    length of the header (little endian)
+    header    JSON: version, identity, iteration_FI, counters, goldens...
+    results   GlitchResults.to_bytes() of the results per point
+"""
+
+import json
+import os
+import struct
+import time
+
+import src.glitch as glitch
+
+MAGIC = b"CLKFICKP"
+FORMAT_VERSION = 2
+
+
+def save_checkpoint(file_path, state):
+    """
+    Writes a checkpoint atomically.
+
+    Parameters:
+    file_path (str): Checkpoint file.
+    state (dict): State of the campaign, see Checkpointer.state.
+    """
+    header = dict(state)
+    results = header.pop("results")
+    # JSON keys are strings, the function indexes are restored by load_checkpoint
+    header["goldens"] = {str(key): golden for key, golden in header.get("goldens", {}).items()}
+    header = json.dumps(header).encode()
+
+    folder = os.path.dirname(os.path.abspath(file_path))
+    tmp = os.path.join(folder, "." + os.path.basename(file_path) + ".tmp")
+    with open(tmp, 'wb') as file:
+        file.write(MAGIC + struct.pack("<I", len(header)) + header)
+        file.write(results.to_bytes())
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp, file_path)
+    # persist the rename itself
+    fd = os.open(folder, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def load_checkpoint(file_path, identity=None):
+    """
+    Reads a checkpoint.
+
+    Parameters:
+    file_path (str): Checkpoint file.
+    identity (dict): Settings of the campaign, compared to those of the checkpoint.
+
+    Returns:
+    dict: State of the campaign, None if the file does not exist.
+    """
+    if not os.path.exists(file_path):
+        return None
+    with open(file_path, 'rb') as file:
+        data = file.read()
+    if data[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"{file_path} is not a checkpoint file")
+    offset = len(MAGIC) + 4
+    size, = struct.unpack_from("<I", data, len(MAGIC))
+    state = json.loads(data[offset:offset + size])
+    if state.get("version") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported checkpoint version in {file_path}")
+    state["goldens"] = {int(key): golden for key, golden in state.get("goldens", {}).items()}
+    state["results"] = glitch.GlitchResults.from_bytes(memoryview(data)[offset + size:])
+    if identity is not None and state["identity"] != identity:
+        changed = sorted(k for k in set(identity) | set(state["identity"])
+                         if identity.get(k) != state["identity"].get(k))
+        raise ValueError(f"Checkpoint {file_path} belongs to another campaign (different {', '.join(changed)})")
+    return state
+
+
+def restore(gc, state, session=None):
+    """
+    Loads the results and group counts of a checkpoint in a GlitchController.
+
+    Iterate the controller with glitch_values(clear=False) or
+    sample_values(..., clear=False) afterwards, or they are cleared again.
+
+    Returns:
+    dict: The counters of the checkpoint.
+    """
+    gc.results.clear()
+    gc.results.merge(state["results"])
+    gc.group_counts = list(state["group_counts"])
+    if session is not None:
+        if state.get("golden") is not None:
+            session.golden = state["golden"]
+        session.goldens.update(state.get("goldens", {}))
+    return dict(state["counters"])
+
+
+class Checkpointer:
+    """Periodic checkpoints of a running campaign.
+
+    Example::
+
+        checkpoint = Checkpointer("campaign.ckpt", interval=30, identity=vars(args))
+        state = checkpoint.load()
+        if state is not None:
+            counters = restore(gc, state, session)
+        for glitch_settings in gc.glitch_values(clear=state is None):
+            ...
+            checkpoint.update(gc, iteration_FI, counters, session)
+        checkpoint.update(gc, iteration_FI, counters, session, force=True)
+    """
+
+    def __init__(self, file_path, interval=30.0, identity=None):
+        self.file_path = file_path
+        self.interval = interval
+        self.identity = identity if identity is not None else {}
+        self._last_save = time.monotonic()
+
+    def load(self):
+        return load_checkpoint(self.file_path, self.identity)
+
+    def state(self, gc, iteration_FI, counters, session=None):
+        '''
+        Returns the state of the campaign after injection `iteration_FI`.
+        '''
+        return {
+            "version": FORMAT_VERSION,
+            "identity": self.identity,
+            "time": time.time(),
+            "iteration_FI": iteration_FI,
+            "counters": dict(counters),
+            "group_counts": list(gc.group_counts),
+            "results": gc.results,
+            "golden": session.golden if session is not None else None,
+            "goldens": dict(session.goldens) if session is not None else {},
+        }
+
+    def update(self, gc, iteration_FI, counters, session=None, force=False):
+        '''
+        Saves a checkpoint when `interval` seconds have elapsed since the last one.
+        '''
+        now = time.monotonic()
+        if force or now - self._last_save >= self.interval:
+            save_checkpoint(self.file_path, self.state(gc, iteration_FI, counters, session))
+            self._last_save = now
@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+Outcome pre-classifier working on the ADC trace of an injection.
+
+After scope.capture(), the trace is compared to a template, the mean of the
+traces recorded by the golden run, with a correlation distance
+(1 - Pearson correlation). Close to the template the injection is labelled
+"normal", far from it "reset" (if a reset distance is given), and in
+between "candidate": a possible fault that always goes through the serial
+check.
+
+Modes:
+
+- off: no trace classification
+- shadow: the serial check always runs, the classifier is only evaluated
+- shortcut: the serial reads are skipped for the points labelled "normal"
+  or "reset", except one point every `audit_every` which is checked to keep
+  measuring the agreement
+
+The agreement between the labels and the serial check is kept in
+`confusion` and reported by report().
+"""
+
+MODES = ["off", "shadow", "shortcut"]
+LABELS = ["normal", "reset", "candidate"]
+
+
+class TraceClassifier:
+    """Template classifier of the injection traces.
+
+    Example::
+
+        classifier = TraceClassifier("shortcut", margin=3.0, audit_every=100)
+        session.golden_run('s', b'', 0, runs=10, collect_traces=True)
+        classifier.add_template(None, session.golden_traces[None])
+        session.classifier = classifier
+    """
+
+    def __init__(self, mode="shadow", margin=3.0, min_distance=1e-3, reset_distance=None, audit_every=100):
+        import numpy as np # type: ignore
+
+        if mode not in MODES:
+            raise ValueError("Invalid mode {} (modes are {})".format(mode, MODES))
+        self.np = np
+        self.mode = mode
+        self.margin = margin
+        self.min_distance = min_distance
+        self.reset_distance = reset_distance
+        self.audit_every = max(audit_every, 1)
+
+        self.templates = {} # key: (normalised template, normal distance)
+        self.confusion = {} # (label, event): count
+        self.shortcuts = 0
+        self._classified = 0
+
+    def _normalise(self, traces):
+        np = self.np
+        traces = np.atleast_2d(np.asarray(traces, dtype=np.float64))
+        traces = traces - traces.mean(axis=1, keepdims=True)
+        norms = np.linalg.norm(traces, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return traces / norms
+
+    def add_template(self, key, traces):
+        '''
+        Builds the template of a function from its golden traces.
+
+        The normal distance is the largest distance of a golden trace to the
+        template, times `margin` (at least `min_distance`).
+        '''
+        np = self.np
+        golden = self._normalise(traces)
+        template = self._normalise(golden.mean(axis=0))[0]
+        distances = 1.0 - golden @ template
+        threshold = max(float(np.max(distances)) * self.margin, self.min_distance)
+        self.templates[key] = (template, threshold)
+        print(f"Trace template : {len(golden)} golden traces, normal distance {threshold:.4f}")
+
+    def distance(self, trace, key=None):
+        template, _ = self.templates[key]
+        return float(1.0 - self._normalise(trace)[0] @ template)
+
+    def label(self, trace, key=None):
+        '''
+        Returns "normal", "reset" or "candidate".
+        '''
+        d = self.distance(trace, key)
+        if d <= self.templates[key][1]:
+            return "normal"
+        if self.reset_distance is not None and d >= self.reset_distance:
+            return "reset"
+        return "candidate"
+
+    def predict(self, trace, key=None):
+        '''
+        Labels a trace and decides if the serial check must run.
+
+        Returns:
+        tuple: (label, check), check being False when the serial reads can be skipped.
+        '''
+        label = self.label(trace, key)
+        self._classified += 1
+        if self.mode != "shortcut" or label == "candidate":
+            return label, True
+        if self._classified % self.audit_every == 0:
+            return label, True # audit
+        self.shortcuts += 1
+        return label, False
+
+    def check(self, label, event):
+        '''
+        Records the outcome of the serial check of a labelled injection.
+        '''
+        self.confusion[(label, event)] = self.confusion.get((label, event), 0) + 1
+
+    def agreement(self):
+        '''
+        Returns the fraction of the checked "normal"/"reset" labels confirmed
+        by the serial check, None if there are none.
+        '''
+        checked = sum(n for (label, _), n in self.confusion.items() if label != "candidate")
+        agreed = sum(n for (label, event), n in self.confusion.items() if label == event)
+        return agreed / checked if checked else None
+
+    def report(self):
+        '''
+        Returns the rows (label, counts by event..., total) of the confusion
+        table and the list of events, for a PrettyTable.
+        '''
+        events = sorted({event for _, event in self.confusion})
+        rows = []
+        for label in LABELS:
+            counts = [self.confusion.get((label, event), 0) for event in events]
+            rows.append([label] + counts + [sum(counts)])
+        return events, rows
@@ -0,0 +1,225 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+Differential comparison of two campaigns, e.g. two bitstream builds or a
+countermeasure on/off.
+
+Both GlitchResults aggregates are aligned on the union of their parameter
+sets with numpy (np.unique over the stacked parameters) into count arrays.
+For each group (success, reset...) and each cell tested by both campaigns,
+the rates are compared with Fisher's exact test (a cell is visited a few
+times only, too few for a normal approximation); the p-values are then
+adjusted for the number of cells (Benjamini-Hochberg q-values) so that a
+million-cell grid does not report thousands of false positives. The same
+test on the summed counts gives the overall delta.
+"""
+
+import csv
+
+import src.merge as merge
+
+
+def load_results(paths, processes=None):
+    """
+    Loads one side of a comparison: a counts file written by ClockFImerge.py,
+    or log files merged on the fly.
+
+    Parameters:
+    paths (list): Counts file, or log files.
+    processes (int): Number of workers of merge_logs.
+
+    Returns:
+    glitch.GlitchResults: Aggregated results.
+    """
+    if len(paths) == 1:
+        with open(paths[0], 'r') as file:
+            header = file.readline().split(",")
+        if "total" in header:
+            return merge.read_counts(paths[0])
+    return merge.merge_logs(paths, processes=processes)
+
+
+def align(results_a, results_b):
+    """
+    Aligns two GlitchResults on the union of their parameter sets.
+
+    Returns:
+    tuple: (parameters (n, dims), counts_a (n, groups), counts_b (n, groups),
+            total_a (n,), total_b (n,)) numpy arrays, with the groups of
+            results_a; a cell missing from one campaign has a total of 0.
+    """
+    import numpy as np # type: ignore
+
+    groups = list(results_a.groups)
+    missing = [g for g in groups if g not in results_b.groups]
+    if missing:
+        raise ValueError(f"Groups {missing} missing from the second campaign")
+
+    def arrays(results):
+        keys = list(results._result_dict)
+        entries = results._result_dict.values()
+        params = np.array(keys, dtype=np.float64).reshape(len(keys), len(results.parameters))
+        counts = np.array([[e[g] for g in groups] for e in entries], dtype=np.int64).reshape(len(keys), len(groups))
+        totals = np.array([e['total'] for e in entries], dtype=np.int64)
+        return params, counts, totals
+
+    params_a, counts_a, totals_a = arrays(results_a)
+    params_b, counts_b, totals_b = arrays(results_b)
+
+    parameters, inverse = np.unique(np.concatenate([params_a, params_b]), axis=0, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    n = len(parameters)
+    index_a, index_b = inverse[:len(params_a)], inverse[len(params_a):]
+
+    aligned_a = np.zeros((n, len(groups)), dtype=np.int64)
+    aligned_b = np.zeros((n, len(groups)), dtype=np.int64)
+    total_a = np.zeros(n, dtype=np.int64)
+    total_b = np.zeros(n, dtype=np.int64)
+    aligned_a[index_a] = counts_a
+    aligned_b[index_b] = counts_b
+    total_a[index_a] = totals_a
+    total_b[index_b] = totals_b
+    return parameters, aligned_a, aligned_b, total_a, total_b
+
+
+def _log_factorials(n):
+    import numpy as np # type: ignore
+    return np.concatenate([[0.0], np.cumsum(np.log(np.arange(1, n + 1, dtype=np.float64)))])
+
+
+def fisher_exact_test(k_a, n_a, k_b, n_b, max_elements=1 << 22):
+    """
+    Two-sided Fisher's exact test of k_a / n_a against k_b / n_b, element-wise.
+
+    Given the number of events k_a + k_b, k_a follows a hypergeometric
+    distribution; the p-value sums the probabilities of the tables no more
+    likely than the observed one. Cells are processed in chunks of at most
+    `max_elements` table probabilities.
+
+    Returns:
+    tuple: (rate_a, rate_b, p-value) arrays; p is 1 where a total is 0.
+    """
+    import numpy as np # type: ignore
+
+    k_a, n_a, k_b, n_b = np.broadcast_arrays(*(np.asarray(v, dtype=np.int64) for v in (k_a, n_a, k_b, n_b)))
+    shape = k_a.shape
+    k_a, n_a, k_b, n_b = (v.reshape(-1) for v in (k_a, n_a, k_b, n_b))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rate_a = np.where(n_a > 0, k_a / n_a, 0.0)
+        rate_b = np.where(n_b > 0, k_b / n_b, 0.0)
+
+    p = np.ones(len(k_a))
+    tested = np.nonzero((n_a > 0) & (n_b > 0))[0]
+    if len(tested):
+        lf = _log_factorials(int((n_a + n_b)[tested].max()))
+
+        def log_pmf(x, events, total_a, total_b):
+            # log of C(total_a, x) C(total_b, events - x) / C(total_a + total_b, events)
+            return (lf[total_a] - lf[x] - lf[total_a - x]
+                    + lf[total_b] - lf[events - x] - lf[total_b - events + x]
+                    - lf[total_a + total_b] + lf[events] + lf[total_a + total_b - events])
+
+        events = k_a + k_b
+        low = np.maximum(0, events - n_b)
+        high = np.minimum(events, n_a)
+        support = high - low + 1
+        # cells of similar support in the same chunk
+        tested = tested[np.argsort(support[tested], kind='stable')]
+        start = 0
+        while start < len(tested):
+            end = min(len(tested), start + max(1, max_elements // int(support[tested[start]])))
+            while end - start > 1 and (end - start) * int(support[tested[end - 1]]) > max_elements:
+                end = start + (end - start) // 2
+            idx = tested[start:end]
+            x = low[idx, None] + np.arange(int(support[idx].max()))[None, :]
+            inside = x <= high[idx, None]
+            x = np.where(inside, x, low[idx, None])
+            log_p = log_pmf(x, events[idx, None], n_a[idx, None], n_b[idx, None])
+            observed = log_pmf(k_a[idx], events[idx], n_a[idx], n_b[idx])
+            # relative tolerance on the probabilities, as scipy.stats.fisher_exact
+            keep = inside & (log_p <= observed[:, None] + 1e-7)
+            p[idx] = np.minimum(np.where(keep, np.exp(log_p), 0.0).sum(axis=1), 1.0)
+            start = end
+
+    return rate_a.reshape(shape), rate_b.reshape(shape), p.reshape(shape)
+
+
+def benjamini_hochberg(p):
+    """
+    Returns the Benjamini-Hochberg q-values of an array of p-values.
+    """
+    import numpy as np # type: ignore
+
+    p = np.asarray(p, dtype=np.float64)
+    n = len(p)
+    if n == 0:
+        return p
+    order = np.argsort(p)
+    q = p[order] * n / np.arange(1, n + 1)
+    q = np.minimum.accumulate(q[::-1])[::-1]
+    result = np.empty(n)
+    result[order] = np.minimum(q, 1.0)
+    return result
+
+
+def compare(results_a, results_b, groups=("success", "reset"), alpha=0.05, min_total=1):
+    """
+    Compares two campaigns.
+
+    Parameters:
+    results_a (glitch.GlitchResults): Reference campaign.
+    results_b (glitch.GlitchResults): Compared campaign.
+    groups (list): Groups whose rates are compared.
+    alpha (float): Significance level of the q-values.
+    min_total (int): Minimum number of injections of a cell in each campaign.
+
+    Returns:
+    dict: {"overall": {group: (rate_a, rate_b, delta, p)},
+           "cells": {group: [(parameters, total_a, rate_a, total_b, rate_b, delta, p, q)]}
+                    significant cells, largest |delta| first,
+           "tested": number of cells tested by both campaigns,
+           "only_a", "only_b": number of cells tested by one campaign only}
+    """
+    import numpy as np # type: ignore
+
+    parameters, counts_a, counts_b, total_a, total_b = align(results_a, results_b)
+    group_index = list(results_a.groups)
+    both = (total_a >= min_total) & (total_b >= min_total)
+
+    report = {
+        "overall": {},
+        "cells": {},
+        "tested": int(both.sum()),
+        "only_a": int(((total_a > 0) & (total_b == 0)).sum()),
+        "only_b": int(((total_b > 0) & (total_a == 0)).sum()),
+    }
+    for group in groups:
+        g = group_index.index(group)
+        k_a, k_b = counts_a[both, g], counts_b[both, g]
+        n_a, n_b = total_a[both], total_b[both]
+
+        rate_a, rate_b, p = fisher_exact_test(k_a.sum(), n_a.sum(), k_b.sum(), n_b.sum())
+        report["overall"][group] = (float(rate_a), float(rate_b), float(rate_b - rate_a), float(p))
+
+        rate_a, rate_b, p = fisher_exact_test(k_a, n_a, k_b, n_b)
+        q = benjamini_hochberg(p)
+        delta = rate_b - rate_a
+        significant = np.nonzero(q <= alpha)[0]
+        significant = significant[np.argsort(-np.abs(delta[significant]), kind='stable')]
+        cells = parameters[both]
+        report["cells"][group] = [(tuple(cells[i].tolist()), int(n_a[i]), float(rate_a[i]), int(n_b[i]), float(rate_b[i]),
+                                   float(delta[i]), float(p[i]), float(q[i])) for i in significant]
+    return report
+
+
+def write_comparison(report, file_path, parameters=merge.PARAMETERS):
+    """
+    Saves the significant cells of a comparison, one line per (group, cell).
+    """
+    with open(file_path, 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(["group"] + list(parameters) + ["total_a", "rate_a", "total_b", "rate_b", "delta", "p", "q"])
+        for group, cells in report["cells"].items():
+            for params, n_a, rate_a, n_b, rate_b, delta, p, q in cells:
+                writer.writerow([group] + list(params) + [n_a, round(rate_a, 4), n_b, round(rate_b, 4), round(delta, 4), f"{p:.3g}", f"{q:.3g}"])
@@ -1,25 +1,130 @@
 #!/usr/bin/env python
 # coding: utf-8
 
-import chipwhisperer as cw
-import src.glitch as glitch
 import subprocess
 import csv
-import ast
+import hashlib
+import os
 import time
-from importlib import reload
-from tqdm.notebook import tqdm
-import re
-import struct
-from progressbar import progressbar
-import progressbar
-import argparse, configparser, textwrap
 import configparser
-import serial
-import os
-from prettytable import PrettyTable
 
-def log_file(reg_file, i_FI, event, width, offset, ext_offset, data):
+# chipwhisperer pulls in numpy, pyusb and the firmware tables: it is only
+# imported by the functions that open a hardware connection.
+
+def printable(data):
+    """
+    Keeps the printable characters of the data read from the target.
+
+    Parameters:
+    data (str): Data read from the target.
+
+    Returns:
+    str: Data without the non printable characters.
+    """
+    return "".join(char for char in data if char.isprintable())
+
+class PayloadDictionary:
+    """
+    Dictionary of the distinct payloads of a log file.
+
+    Most injections return one of a few payloads, so the log stores a small
+    integer ID per row and each distinct payload is written once, with its
+    content hash, in <log>_payloads.csv (ID,hash,payload). Entries are
+    appended as soon as they are seen so the dictionary survives a crash,
+    and an existing dictionary is reloaded to resume a log (or to decode
+    it).
+
+    Parameters:
+    reg_file (str): Log file the dictionary belongs to.
+    """
+    def __init__(self, reg_file):
+        self.file = dictionary_file(reg_file)
+        self.ids = {}
+        self.payloads = {}
+        for payload_id, digest, payload in read_payloads(self.file):
+            self.ids[digest] = payload_id
+            self.payloads[payload_id] = payload
+
+    def encode(self, data):
+        """
+        Returns the ID of a payload, adding it to the dictionary if new.
+
+        Parameters:
+        data (str): Data read from the target.
+
+        Returns:
+        int: Payload ID.
+        """
+        payload = printable(data)
+        digest = payload_digest(payload)
+        payload_id = self.ids.get(digest)
+        if payload_id is None:
+            payload_id = len(self.ids)
+            self.ids[digest] = payload_id
+            self.payloads[payload_id] = payload
+            with open(self.file, 'a', newline='') as file:
+                csv.writer(file).writerow([payload_id, digest, payload])
+        return payload_id
+
+    def decode(self, payload_id):
+        """
+        Returns the payload of an ID, KeyError if it is not in the dictionary.
+
+        Parameters:
+        payload_id (int or str): Payload ID, e.g. the last column of a log row.
+
+        Returns:
+        str: Printable payload.
+        """
+        return self.payloads[int(payload_id)]
+
+def dictionary_file(reg_file):
+    """
+    Returns the payload dictionary file of a log file.
+    """
+    return os.path.splitext(reg_file)[0] + "_payloads.csv"
+
+def payload_digest(payload):
+    """
+    Returns the content hash of a payload.
+
+    Parameters:
+    payload (str): Printable payload.
+
+    Returns:
+    str: 16 hexadecimal characters.
+    """
+    return hashlib.blake2b(payload.encode(), digest_size=8).hexdigest()
+
+def output_digest(payload, data):
+    """
+    Returns the hash of the output of the target function.
+
+    Parameters:
+    payload (bytearray): Payload of the simpleserial response.
+    data (str): Data read from the target.
+
+    Returns:
+    str: 16 hexadecimal characters.
+    """
+    return payload_digest(bytes(payload).hex() + "|" + printable(data))
+
+def read_payloads(file_path):
+    """
+    Reads a payload dictionary.
+
+    Parameters:
+    file_path (str): Dictionary file (<log>_payloads.csv).
+
+    Returns:
+    list: (ID, hash, payload) tuples, empty if the file does not exist.
+    """
+    if not os.path.exists(file_path):
+        return []
+    with open(file_path, 'r', newline='') as file:
+        return [(int(row[0]), row[1], row[2]) for row in csv.reader(file)]
+
+def log_file(reg_file, i_FI, event, width, offset, ext_offset, data, payloads=None):
     """
     Logs glitching information to a file.
 
@@ -31,23 +136,36 @@ def log_file(reg_file, i_FI, event, width, offset, ext_offset, data):
     offset (int): Glitch offset.
     ext_offset (int): Extended glitch offset.
     data (str): Data related to the glitch event.
+    payloads (PayloadDictionary): If given, the payload ID is written instead of the data.
     """
     if reg_file is not None:
+        if payloads is not None:
+            data = str(payloads.encode(data))
+        else:
+            data = printable(data)
         with open(reg_file, 'a') as file:
-            file.write(str(i_FI))
-            file.write(",")
-            file.write(str(event))
-            file.write(",")
-            file.write(str(width))
-            file.write(",")
-            file.write(str(offset))
-            file.write(",")
-            file.write(str(ext_offset))
-            file.write(",")
-            for char in data:
-                if char.isprintable():  # Check if character is printable
-                    file.write(char)  # Write character to the file
-            file.write("\n")
+            file.write(f"{i_FI},{event},{width},{offset},{ext_offset},{data}\n")
+
+def read_log(file_path):
+    """
+    Reads a log file written by log_file.
+
+    Parameters:
+    file_path (str): Log file.
+
+    Returns:
+    generator: (i_FI, event, width, offset, ext_offset, data) for each row,
+               the glitch parameters as floats.
+    """
+    with open(file_path, 'r', encoding='utf-8', errors='replace') as file:
+        for line in file:
+            row = line.rstrip("\n").split(",", 5)
+            if len(row) < 5:
+                continue
+            try:
+                yield (int(row[0]), row[1], float(row[2]), float(row[3]), float(row[4]), row[5] if len(row) > 5 else "")
+            except ValueError:
+                continue # header or truncated line
 
 def read_config(file_path):
     """
@@ -71,6 +189,8 @@ def setup_generic(scope, target):
     scope (chipwhisperer.scope): ChipWhisperer scope object.
     target (chipwhisperer.targets): ChipWhisperer target object.
     """
+    import chipwhisperer as cw
+
     try:
         if not scope.connectStatus:
             scope.con()
@@ -92,6 +212,26 @@ def setup_generic(scope, target):
     time.sleep(0.05)
     scope.default_setup()
 
+def setup_clock_glitch(scope, target):
+    """
+    Configures the clock and the clock glitch module for the FPGA target.
+
+    Parameters:
+    scope (chipwhisperer.scope): ChipWhisperer scope object.
+    target (chipwhisperer.targets): ChipWhisperer target object.
+    """
+    # Clock configuration for 25Mhz
+    # Multiply the ChipWhisperer clock to get 25 MHz
+    scope.clock.clkgen_mul = 7
+    target.baud = 115200
+    print("baudrate : ", target.baud) # Display the baudrate communication
+
+    # Settings configuration for clock glitch
+    scope.glitch.clk_src = 'clkgen'
+    scope.glitch.trigger_src = 'ext_single'
+    scope.glitch.output = "clock_xor"
+    scope.io.hs2 = "glitch"
+
 def reboot_flush(scope, target):
     """
     Resets the target.
@@ -105,7 +245,7 @@ def reboot_flush(scope, target):
     scope.io.nrst = "high"
     target.flush()
 
-def reboot_bitstream(name_board, IDfpga, freq, bistream):
+def reboot_bitstream(name_board, IDfpga, freq, bistream, timeout=None):
     """
     Loads the FPGA bitstream.
 
@@ -114,6 +254,8 @@ def reboot_bitstream(name_board, IDfpga, freq, bistream):
     IDfpga (str): FPGA serial ID.
     freq (str): Frequency.
     bistream (str): Path to the bitstream file.
+    timeout (float): Seconds before openFPGALoader is killed and
+                     subprocess.TimeoutExpired raised, no limit if None.
     """
     print("\nLoad the bitstream ... 🏗️")
 
@@ -122,7 +264,7 @@ def reboot_bitstream(name_board, IDfpga, freq, bistream):
      
     command = "openFPGALoader -b " + name_board + " " + Frequency + " " + IDProduct_FPGA + " " + bistream
 
-    subprocess.run(f'{command}', shell=True, executable="/bin/bash")
+    subprocess.run(f'exec {command}', shell=True, executable="/bin/bash", timeout=timeout)
 
 def write_result_Glitch(file, liste):
     """
@@ -138,6 +280,30 @@ def write_result_Glitch(file, liste):
         for valeur in liste:
             writer.writerow([valeur])
 
+def encode_argument(argumentfunc):
+    """
+    Encodes a function argument once, for target_function.
+
+    Parameters:
+    argumentfunc (str): Function argument.
+
+    Returns:
+    bytearray: Encoded argument.
+    """
+    return bytearray(argumentfunc.encode())
+
+def parse_function(spec):
+    """
+    Parses a function of a multi-function sweep, "<callfunc>[:<argumentfunc>]".
+
+    Returns:
+    tuple: (callfunc, argumentfunc).
+    """
+    callfunc, _, argumentfunc = spec.partition(":")
+    if len(callfunc) != 1:
+        raise ValueError(f"Invalid function {spec!r}, expected <letter>[:<argument>]")
+    return callfunc, argumentfunc
+
 def target_function(target, callfunc, argumentfunc):
     """
     Chooses the function target to be faulted.
@@ -145,9 +311,11 @@ def target_function(target, callfunc, argumentfunc):
     Parameters:
     target (chipwhisperer.targets): ChipWhisperer target object.
     callfunc (str): Function call.
-    argumentfunc (bytes): Function argument.
+    argumentfunc (bytearray or str): Function argument, pre-encoded with encode_argument.
     """
-    target.simpleserial_write(callfunc, bytearray(argumentfunc.encode()))
+    if isinstance(argumentfunc, str):
+        argumentfunc = encode_argument(argumentfunc)
+    target.simpleserial_write(callfunc, argumentfunc)
 
 def disconnected_setup(scope, target):
     """
@@ -0,0 +1,231 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+Fault injection daemon fed by a spool directory.
+
+The daemon keeps one Session (scope/target connection and loaded bitstream)
+open and runs the jobs dropped in the spool directory, one after the other.
+A job is a campaign file whose [sweep:<name>] sections are run over the
+daemon's session; its [setup] section, if any, is ignored except for
+path_exp. Spool layout::
+
+    <spool>/queue/<job>.ini      jobs waiting, run in name order
+    <spool>/running/<job>.ini    job in progress
+    <spool>/done/<job>.ini       finished jobs
+    <spool>/failed/<job>.ini     jobs that raised, with <job>.err
+    <spool>/cancelled/<job>.ini  cancelled jobs
+    <spool>/cancel/<job>         cancellation requests
+    <spool>/results/<job>/       default output folder of a job
+    <spool>/status.json          state of the daemon, rewritten atomically
+
+Files are only ever moved with os.replace, so a job is always in exactly one
+folder and clients never see half-written files.
+"""
+
+import json
+import os
+import shutil
+import time
+import traceback
+
+import src.cw_toolkit as tk
+import src.campaign as campaign
+
+STATES = ["queue", "running", "done", "failed", "cancelled"]
+
+
+class Spool:
+    """Spool directory shared by the daemon and its clients."""
+
+    def __init__(self, path):
+        self.path = path
+        for folder in STATES + ["cancel", "results"]:
+            os.makedirs(os.path.join(path, folder), exist_ok=True)
+
+    def job_file(self, state, job):
+        return os.path.join(self.path, state, job + ".ini")
+
+    def jobs(self, state):
+        '''
+        Returns the jobs of a folder, oldest first.
+        '''
+        names = [f[:-len(".ini")] for f in os.listdir(os.path.join(self.path, state)) if f.endswith(".ini")]
+        return sorted(names)
+
+    def submit(self, file_path, name=None):
+        '''
+        Copies a campaign file in the queue and returns the job id.
+        '''
+        # check the file before queuing it, errors are reported to the client
+        config = tk.read_config(file_path)
+        if not campaign.read_sweeps(config):
+            raise ValueError(f"{file_path}: no [sweep:<name>] section")
+
+        base = name or os.path.splitext(os.path.basename(file_path))[0]
+        job = time.strftime("%Y%m%d-%H%M%S") + "-" + base
+        n = 1
+        while any(os.path.exists(self.job_file(state, job)) for state in STATES):
+            n += 1
+            job = time.strftime("%Y%m%d-%H%M%S") + "-" + base + "-" + str(n)
+
+        tmp = os.path.join(self.path, "queue", "." + job + ".tmp")
+        shutil.copyfile(file_path, tmp)
+        os.replace(tmp, self.job_file("queue", job))
+        return job
+
+    def cancel(self, job):
+        '''
+        Cancels a job: removed from the queue if waiting, stopped after the
+        current injection if running.
+        '''
+        try:
+            os.replace(self.job_file("queue", job), self.job_file("cancelled", job))
+            return "cancelled"
+        except FileNotFoundError:
+            pass
+        if os.path.exists(self.job_file("running", job)):
+            open(os.path.join(self.path, "cancel", job), 'w').close()
+            return "cancel requested"
+        raise ValueError(f"Job {job} is neither queued nor running")
+
+    def cancel_requested(self, job):
+        return os.path.exists(os.path.join(self.path, "cancel", job))
+
+    def move(self, job, src_state, dst_state):
+        os.replace(self.job_file(src_state, job), self.job_file(dst_state, job))
+        try:
+            os.remove(os.path.join(self.path, "cancel", job))
+        except FileNotFoundError:
+            pass
+
+    def write_status(self, status):
+        '''
+        Writes status.json atomically.
+        '''
+        status = dict(status, updated=time.time(), queue=self.jobs("queue"))
+        tmp = os.path.join(self.path, ".status.json.tmp")
+        with open(tmp, 'w') as file:
+            json.dump(status, file, indent=2)
+        os.replace(tmp, os.path.join(self.path, "status.json"))
+
+    def read_status(self):
+        try:
+            with open(os.path.join(self.path, "status.json")) as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return None
+
+
+def run_job(session, spool, job, status, metrics=None):
+    """
+    Runs every sweep of a job over the daemon session.
+
+    Parameters:
+    session (src.session.Session): Opened hardware session.
+    spool (Spool): Spool directory.
+    job (str): Job id, its file is in the running folder.
+    status (dict): Status of the daemon, updated in place.
+    metrics (src.metrics.MetricsExporter): Live metrics of the daemon.
+
+    Returns:
+    bool: False if the job was cancelled.
+    """
+    config = tk.read_config(spool.job_file("running", job))
+    path_exp = None
+    if config.has_section("setup"):
+        path_exp = config["setup"].get("path_exp")
+    if not path_exp:
+        path_exp = os.path.join(spool.path, "results", job)
+
+    last_update = [0.0]
+
+    def cancelled(iteration_FI):
+        status["iteration"] = iteration_FI
+        if time.monotonic() - last_update[0] > 1.0:
+            last_update[0] = time.monotonic()
+            spool.write_status(status)
+        return spool.cancel_requested(job)
+
+    for name, sweep in campaign.read_sweeps(config):
+        status["sweep"] = name
+        status["iteration"] = 0
+        spool.write_status(status)
+        if metrics is not None:
+            metrics.labels["job"] = job
+        campaign.run_sweep(session, name, sweep, path_exp, cancelled=cancelled, metrics=metrics)
+        if spool.cancel_requested(job):
+            return False
+    return True
+
+
+def serve(session, spool, poll=1.0, metrics=None):
+    """
+    Runs the queued jobs until KeyboardInterrupt. A job interrupted this way
+    is moved to the cancelled folder.
+
+    Parameters:
+    session (src.session.Session): Opened hardware session.
+    spool (Spool): Spool directory.
+    poll (float): Seconds between two looks at an empty queue.
+    metrics (src.metrics.MetricsExporter): Live metrics of the daemon.
+
+    Returns:
+    dict: Final status of the daemon.
+    """
+    status = {"state": "idle", "pid": os.getpid(), "job": None, "sweep": None, "iteration": 0,
+              "done": 0, "failed": 0, "cancelled": 0}
+
+    # a job left in running/ by a previous daemon is queued again
+    for job in spool.jobs("running"):
+        spool.move(job, "running", "queue")
+
+    try:
+        while True:
+            queue = spool.jobs("queue")
+            if not queue:
+                status.update(state="idle", job=None, sweep=None, iteration=0)
+                spool.write_status(status)
+                time.sleep(poll)
+                continue
+
+            job = queue[0]
+            try:
+                spool.move(job, "queue", "running")
+            except FileNotFoundError:
+                continue # cancelled meanwhile
+
+            print(f"\n### Job {job} ###\n")
+            status.update(state="running", job=job)
+            spool.write_status(status)
+
+            try:
+                completed = run_job(session, spool, job, status, metrics)
+            except KeyboardInterrupt:
+                spool.move(job, "running", "cancelled")
+                status["cancelled"] += 1
+                raise
+            except Exception:
+                with open(os.path.join(spool.path, "failed", job + ".err"), 'w') as file:
+                    file.write(traceback.format_exc())
+                spool.move(job, "running", "failed")
+                status["failed"] += 1
+                print(f"Job {job} failed, reconnecting the setup")
+                try:
+                    session.close()
+                except Exception:
+                    pass
+                session.open()
+                continue
+
+            if completed:
+                spool.move(job, "running", "done")
+                status["done"] += 1
+            else:
+                spool.move(job, "running", "cancelled")
+                status["cancelled"] += 1
+    finally:
+        status.update(state="stopped", job=None, sweep=None)
+        spool.write_status(status)
+
+    return status
@@ -3,10 +3,13 @@
 # GlitchController will be part of ChipWhisperer core - just run this block
 # for now.
 
-try:
-    import ipywidgets as widgets # type: ignore
-except ModuleNotFoundError:
-    widgets = None
+def _import_widgets():
+    """ipywidgets is only needed for display_stats(), import it on demand."""
+    try:
+        import ipywidgets as widgets # type: ignore
+    except ModuleNotFoundError:
+        widgets = None
+    return widgets
 
 class GlitchController:
     
@@ -19,6 +22,7 @@ class GlitchController:
         self.parameter_min = [0.0] * len(parameters)
         self.parameter_max = [10.0] * len(parameters)
         self.steps = [[1]] * len(parameters) # add a separate step setting for each parameter
+        self.effective = [None] * len(parameters) # requested value -> hardware value, see set_effective()
         
         self.widget_list_parameter = None
         self.widget_list_groups = None
@@ -26,12 +30,16 @@ class GlitchController:
         self._dmaps = None
         self._buffers = None
         self._glitch_plotdots = None
+
+        self.shared = None
         
         self.clear()
         
     def clear(self):
         self.results.clear()        
         self.group_counts = [0] * len(self.groups)
+        if self.shared is not None:
+            self.shared.clear()
         
         if self.widget_list_groups:
             for w in self.widget_list_groups:
@@ -47,13 +55,12 @@ class GlitchController:
         i = self.parameters.index(parameter)
         self.parameter_min[i] = low
         self.parameter_max[i] = high
-        if not (widgets is None): 
-            if self.widget_list_parameter:
-                # When changing them, need to ensure we don't have min > max ever or will throw
-                # an error, so we set max to super-high first.
-                self.widget_list_parameter[i].max = 1E9
-                self.widget_list_parameter[i].min = low
-                self.widget_list_parameter[i].max = high
+        if self.widget_list_parameter:
+            # When changing them, need to ensure we don't have min > max ever or will throw
+            # an error, so we set max to super-high first.
+            self.widget_list_parameter[i].max = 1E9
+            self.widget_list_parameter[i].min = low
+            self.widget_list_parameter[i].max = high
     
     def set_step(self, parameter, step):
         '''Set a step for a single parameter
@@ -111,10 +118,56 @@ class GlitchController:
         #Basic count
         self.group_counts[i] += 1
         # self.widget_list_groups[i].value =  self.group_counts[i] # modify bug in script .py
+        if self.shared is not None:
+            self.shared.add(i, parameters)
 
         if plot and self._buffers:
             self.update_plot(parameters[self._x_index], parameters[self._y_index], group)
 
+    def merge(self, results):
+        '''Adds the counts of a GlitchResults (e.g. a partial of results.partial()
+        filled by another producer) to the results and the group counts.
+
+        Call from the thread owning the controller; the shared memory block,
+        if published, is updated too.
+        '''
+        self.results.merge(results)
+        for parameters, entry in list(results._result_dict.items()):
+            for i, group in enumerate(self.groups):
+                n = entry[group]
+                if n:
+                    self.group_counts[i] += n
+                    if self.shared is not None:
+                        self.shared.add(i, parameters, n)
+
+    def publish(self, name):
+        '''Publish the live counts in shared memory for out-of-process viewers.
+
+        Call after set_range/set_step: the published grid uses the current
+        ranges and the first step of each parameter. Read it from another
+        process with src.shared_results.SharedResultsView(name). The block
+        starts with the results already counted, e.g. restored from a
+        checkpoint.
+        '''
+        from src.shared_results import SharedResults
+        self.unpublish()
+        sizes = [int(round((self.parameter_max[i] - self.parameter_min[i]) / self.steps[i][0])) + 1
+                 for i in range(len(self.parameters))]
+        shared = SharedResults(name, self.groups, self.parameters, self.parameter_min,
+                               [s[0] for s in self.steps], sizes)
+        for parameters, entry in self.results._result_dict.items():
+            for i, group in enumerate(self.groups):
+                if entry[group]:
+                    shared.add(i, parameters, entry[group])
+        self.shared = shared
+        return self.shared
+
+    def unpublish(self):
+        '''Destroy the shared memory block of publish().'''
+        if self.shared is not None:
+            self.shared.close()
+            self.shared = None
+
     def glitch_plot(self, plotdots, x_index=0, y_index=1, x_bound=None, y_bound=None, bufferlen=10000):
         import holoviews as hv # type: ignore
         from holoviews.streams import Buffer # type: ignore
@@ -167,6 +220,7 @@ class GlitchController:
         self._buffers[label].send(DataFrame([(x, y)], columns=['x', 'y']))
     
     def display_stats(self):
+        widgets = _import_widgets()
         if widgets is None:
             raise ModuleNotFoundError("Could not load ipywidgets, display not available")
         self.widget_list_groups = [widgets.IntText(value=0, description=group + " count:", disabled=True)
@@ -230,6 +284,115 @@ class GlitchController:
                 yield from self._loop_rec(parameter_index+1, final_index, step)
                 self.parameter_values[parameter_index] += step[parameter_index]
 
+    def set_effective(self, parameter, mapping):
+        '''Set the hardware value that each requested value of a parameter results in.
+
+        mapping is a dict {requested: effective} (e.g. probed by writing the
+        values to the scope and reading them back) or a function. On
+        CW-Lite/Pro, width and offset are realised by discrete phase shift
+        steps: adjacent percentages often give the same setting, which
+        unique_values() only injects once.
+        '''
+        if type(parameter) is str:
+            parameter = self.parameters.index(parameter)
+        self.effective[parameter] = mapping
+
+    def axis_values(self, parameter, unique=False):
+        '''Requested values of a parameter with its first step.
+
+        With unique, only the first requested value of each effective value
+        is kept; a dict mapping must hold every requested value (KeyError).
+        '''
+        if type(parameter) is str:
+            parameter = self.parameters.index(parameter)
+        values = []
+        v = self.parameter_min[parameter]
+        while v <= self.parameter_max[parameter]:
+            values.append(v)
+            v += self.steps[parameter][0]
+
+        mapping = self.effective[parameter]
+        if unique and mapping is not None:
+            effective = mapping.__getitem__ if isinstance(mapping, dict) else mapping
+            seen = set()
+            kept = []
+            for v in values:
+                e = effective(v)
+                if e not in seen:
+                    seen.add(e)
+                    kept.append(v)
+            values = kept
+        return values
+
+    def num_glitch_values(self, unique=False):
+        '''Number of points of unique_values(), or of one pass of glitch_values() with unique=False.'''
+        n = 1
+        for i in range(len(self.parameters)):
+            n *= len(self.axis_values(i, unique))
+        return n
+
+    def unique_values(self, clear=True):
+        """Generator like glitch_values() with the first step, skipping the
+        values that give the same hardware setting as a previous one (see
+        set_effective). The yielded values are the requested ones, the scope
+        reports the effective ones."""
+        import itertools
+
+        if clear:
+            self.clear()
+
+        axes = [self.axis_values(i, unique=True) for i in range(len(self.parameters))]
+        self.parameter_values = self.parameter_min[:]
+        for point in itertools.product(*axes):
+            self.parameter_values[:] = point
+            if self.widget_list_parameter:
+                for i,v in enumerate(point):
+                    self.widget_list_parameter[i].value = v
+            yield self.parameter_values
+
+    SAMPLING_METHODS = ["halton", "lhs", "sobol"]
+
+    def sample_values(self, budget, method="halton", seed=0, start=0, clear=True):
+        """Generator returning `budget` parameter values spread over the whole range.
+
+        Instead of the lexicographic order of glitch_values(), points are drawn
+        from a low-discrepancy sequence (Halton or Sobol) or a Latin hypercube,
+        then snapped to the grid given by each parameter's first step. The
+        sequence only depends on `seed`: the same seed gives the same points,
+        and `start` resumes it at a given index (the first value yielded is
+        point number `start`).
+
+        Sobol needs scipy.
+        """
+        if method not in self.SAMPLING_METHODS:
+            raise ValueError("Invalid sampling method {} (methods are {})".format(method, self.SAMPLING_METHODS))
+
+        if clear:
+            self.clear()
+
+        dims = len(self.parameters)
+        sizes = []
+        for i in range(dims):
+            step = self.steps[i][0]
+            sizes.append(int(round((self.parameter_max[i] - self.parameter_min[i]) / step)) + 1)
+
+        if method == "halton":
+            points = _halton_points(dims, seed, start, budget)
+        elif method == "lhs":
+            points = _lhs_points(dims, seed, start, budget)
+        else:
+            points = _sobol_points(dims, seed, start, budget)
+
+        self.parameter_values = self.parameter_min[:]
+        for point in points:
+            for i, u in enumerate(point):
+                k = min(int(u * sizes[i]), sizes[i] - 1)
+                self.parameter_values[i] = self.parameter_min[i] + k * self.steps[i][0]
+            if self.widget_list_parameter:
+                for i,v in enumerate(self.parameter_values):
+                    self.widget_list_parameter[i].value = v
+            yield self.parameter_values
+
     def calc(self, ignore_params=[], sort=None):
         if (type(ignore_params) is int) or (type(ignore_params) is str):
             ignore_params = [ignore_params]
@@ -250,6 +413,57 @@ class GlitchController:
         return rtn
                 
 
+_PRIMES = [2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37]
+
+def _radical_inverse(i, base):
+    inv = 0.0
+    f = 1.0 / base
+    while i > 0:
+        i, digit = divmod(i, base)
+        inv += digit * f
+        f /= base
+    return inv
+
+def _halton_points(dims, seed, start, budget):
+    """Halton sequence with a random shift per dimension (Cranley-Patterson rotation)."""
+    import random
+    rng = random.Random(seed)
+    shifts = [rng.random() for _ in range(dims)]
+    for i in range(start, budget):
+        # index 0 of the radical inverse is 0 in every base, skip it
+        yield [(_radical_inverse(i + 1, _PRIMES[d]) + shifts[d]) % 1.0 for d in range(dims)]
+
+def _lhs_points(dims, seed, start, budget):
+    """Latin hypercube of `budget` points: one point per row of each dimension."""
+    import random
+    rng = random.Random(seed)
+    perms = []
+    for _ in range(dims):
+        perm = list(range(budget))
+        rng.shuffle(perm)
+        perms.append(perm)
+    # the jitter of point i is drawn from its own generator so that it does
+    # not depend on where the sequence is resumed
+    for i in range(start, budget):
+        jitter = random.Random(seed * 1000003 + i)
+        yield [(perms[d][i] + jitter.random()) / budget for d in range(dims)]
+
+def _sobol_points(dims, seed, start, budget):
+    """Scrambled Sobol sequence, from scipy."""
+    try:
+        from scipy.stats import qmc # type: ignore
+    except ModuleNotFoundError:
+        raise ModuleNotFoundError("Could not load scipy, Sobol sampling not available")
+    sampler = qmc.Sobol(d=dims, scramble=True, seed=seed)
+    sampler.fast_forward(start)
+    remaining = budget - start
+    while remaining > 0:
+        n = min(remaining, 4096)
+        for point in sampler.random(n):
+            yield list(point)
+        remaining -= n
+
+
 class GlitchResults:
     """GlitchResults tracks and plots fault injection attempts.
     
@@ -330,6 +544,108 @@ class GlitchResults:
         self._result_dict[parameters][group] += 1
         self._result_dict[parameters]['total'] += 1
 
+    def add_counts(self, parameters, counts):
+        '''
+        Add already counted results for one set of parameters.
+
+        counts is a list with one count per group, in the order of the groups,
+        so that aggregated results (e.g. merged log files) can be loaded
+        without calling add() once per injection.
+        '''
+        if len(counts) != len(self.groups):
+            raise ValueError("Invalid number of counts passed: {:d} passed, {:d} expected".format(len(counts), len(self.groups)))
+        if len(parameters) != len(self.parameters):
+            raise ValueError("Invalid number of parameters passed: {:d} passed, {:d} expected".format(len(parameters), len(self.parameters)))
+
+        parameters = tuple(parameters)
+
+        if not parameters in self._result_dict:
+            self._result_dict[parameters] = {'total': 0}
+            for k in self.groups:
+                self._result_dict[parameters][k] = 0
+                self._result_dict[parameters][k+'_rate'] = 0
+
+        entry = self._result_dict[parameters]
+        for k, n in zip(self.groups, counts):
+            entry[k] += n
+            entry['total'] += n
+
+    def partial(self):
+        '''
+        Returns an empty GlitchResults with the same groups and parameters.
+
+        Concurrent producers (capture threads, worker processes) each add to
+        their own partial, with no lock, and the partials are merged into the
+        global results by a single consumer::
+
+            part = results.partial()
+            part.add("reset", (12.3, 33.4))
+            results += part
+        '''
+        return GlitchResults(groups=list(self.groups), parameters=list(self.parameters))
+
+    def merge(self, other):
+        '''
+        Adds the counts of another GlitchResults, in place, and returns self.
+
+        The merge is associative and commutative, partials can be reduced in
+        any order. Both results must have the same groups and parameters.
+        '''
+        if list(other.groups) != list(self.groups) or list(other.parameters) != list(self.parameters):
+            raise ValueError("Cannot merge results of groups {} and parameters {} into groups {} and parameters {}".format(
+                other.groups, other.parameters, self.groups, self.parameters))
+        for parameters, entry in list(other._result_dict.items()):
+            self.add_counts(parameters, [entry[k] for k in self.groups])
+        return self
+
+    def __iadd__(self, other):
+        return self.merge(other)
+
+    def __add__(self, other):
+        return self.partial().merge(self).merge(other)
+
+    def to_bytes(self):
+        '''
+        Serialises the counts compactly: a JSON header with the groups and
+        parameters, then the parameter sets as float64 and the counts of each
+        group as int64 (native byte order, to ship between processes of the
+        same machine). Load back with GlitchResults.from_bytes().
+        '''
+        import json, struct
+        from array import array
+        header = json.dumps({"groups": list(self.groups), "parameters": list(self.parameters)}).encode()
+        values = array('d')
+        counts = array('q')
+        for parameters, entry in self._result_dict.items():
+            values.extend(parameters)
+            counts.extend(entry[k] for k in self.groups)
+        return struct.pack('<II', len(header), len(self._result_dict)) + header + values.tobytes() + counts.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data):
+        '''
+        Loads results serialised by to_bytes().
+        '''
+        import json, struct
+        from array import array
+        header_size, n = struct.unpack_from('<II', data)
+        offset = struct.calcsize('<II')
+        header = json.loads(bytes(data[offset:offset + header_size]))
+        offset += header_size
+        results = cls(groups=header["groups"], parameters=header["parameters"])
+        dims, n_groups = len(results.parameters), len(results.groups)
+        values = array('d')
+        values.frombytes(data[offset:offset + 8 * n * dims])
+        counts = array('q')
+        counts.frombytes(data[offset + 8 * n * dims:offset + 8 * n * (dims + n_groups)])
+        for i in range(n):
+            results.add_counts(values[i * dims:(i + 1) * dims], counts[i * n_groups:(i + 1) * n_groups])
+        return results
+
+    def __reduce__(self):
+        # pickled (e.g. between multiprocessing workers) in the compact form
+        return (GlitchResults.from_bytes, (self.to_bytes(),))
+
     def res_dict_of_lists(self, results):
         rtn = {}
 
@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+Merge of many campaign logs into one GlitchResults aggregate.
+
+Map-reduce over a multiprocessing pool: each worker parses one log file into
+a partial GlitchResults, shipped back in its compact serialised form
+(GlitchResults.to_bytes), and the partials are merged into a single
+GlitchResults. Rows can be filtered by event and by parameter range.
+
+The aggregate is saved as a counts file, one line per parameter set::
+
+    width,offset,ext_offset,total,success,corrupted,reset,normal
+"""
+
+import csv
+import multiprocessing
+
+import src.glitch as glitch
+import src.cw_toolkit as tk
+
+GROUPS = ["success", "corrupted", "reset", "normal"]
+PARAMETERS = ["width", "offset", "ext_offset"]
+
+
+def aggregate_log(file_path, groups=GROUPS, events=None, ranges=None):
+    """
+    Counts the events of one log file by glitch parameters.
+
+    Parameters:
+    file_path (str): Log file written by cw_toolkit.log_file.
+    groups (list): Groups to count, rows of other events are ignored.
+    events (list): Only count these events, all groups if None.
+    ranges (dict): {parameter: (min, max)} bounds, inclusive.
+
+    Returns:
+    glitch.GlitchResults: Counts of the log.
+    """
+    index = {group: i for i, group in enumerate(groups)}
+    if events is not None:
+        index = {group: i for group, i in index.items() if group in events}
+
+    bounds = []
+    if ranges:
+        bounds = [(PARAMETERS.index(p), low, high) for p, (low, high) in ranges.items()]
+
+    table = {}
+    n_groups = len(groups)
+    for _, event, width, offset, ext_offset, _ in tk.read_log(file_path):
+        i = index.get(event)
+        if i is None:
+            continue
+        parameters = (width, offset, ext_offset)
+        if bounds and not all(low <= parameters[p] <= high for p, low, high in bounds):
+            continue
+        counts = table.get(parameters)
+        if counts is None:
+            counts = table[parameters] = [0] * n_groups
+        counts[i] += 1
+
+    results = glitch.GlitchResults(groups=groups, parameters=PARAMETERS)
+    for parameters, counts in table.items():
+        results.add_counts(parameters, counts)
+    return results
+
+
+def _aggregate_task(task):
+    file_path, groups, events, ranges = task
+    return aggregate_log(file_path, groups, events, ranges).to_bytes()
+
+
+def merge_logs(files, groups=GROUPS, events=None, ranges=None, processes=None):
+    """
+    Merges log files into one GlitchResults.
+
+    Parameters:
+    files (list): Log files.
+    groups (list): Groups of the results.
+    events (list): Only count these events, all groups if None.
+    ranges (dict): {parameter: (min, max)} bounds, inclusive.
+    processes (int): Number of workers, number of CPUs if None.
+
+    Returns:
+    glitch.GlitchResults: Aggregated results.
+    """
+    tasks = [(f, groups, events, ranges) for f in files]
+    results = glitch.GlitchResults(groups=groups, parameters=PARAMETERS)
+
+    if processes == 1 or len(files) == 1:
+        for file_path, groups, events, ranges in tasks:
+            results += aggregate_log(file_path, groups, events, ranges)
+    else:
+        with multiprocessing.Pool(processes) as pool:
+            for data in pool.imap_unordered(_aggregate_task, tasks):
+                results += glitch.GlitchResults.from_bytes(data)
+    return results
+
+
+def write_counts(results, file_path):
+    """
+    Saves the counts of a GlitchResults.
+
+    Parameters:
+    results (glitch.GlitchResults): Results to save.
+    file_path (str): Counts file.
+    """
+    with open(file_path, 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(list(results.parameters) + ['total'] + list(results.groups))
+        for parameters, entry in sorted(results._result_dict.items()):
+            writer.writerow(list(parameters) + [entry['total']] + [entry[g] for g in results.groups])
+
+
+def read_counts(file_path):
+    """
+    Loads a counts file saved by write_counts.
+
+    Parameters:
+    file_path (str): Counts file.
+
+    Returns:
+    glitch.GlitchResults: Results with the groups and parameters of the file.
+    """
+    with open(file_path, 'r', newline='') as file:
+        reader = csv.reader(file)
+        header = next(reader)
+        split = header.index('total')
+        parameters = header[:split]
+        groups = header[split + 1:]
+        results = glitch.GlitchResults(groups=groups, parameters=parameters)
+        for row in reader:
+            results.add_counts([float(v) for v in row[:split]], [int(v) for v in row[split + 1:]])
+    return results
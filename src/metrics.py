@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+Live metrics of a campaign in a text file scraped by node exporter.
+
+The file is written in the Prometheus text format (with the OpenMetrics
+`# EOF` terminator, a comment for Prometheus parsers), every `interval`
+seconds, to a temporary file renamed over the previous one, so a scrape
+never reads half a file. Point the textfile collector of node exporter to
+its folder and give it a .prom name::
+
+    clockfi_injections_total{campaign="arty"} 18234
+    clockfi_injections_per_second{campaign="arty"} 4.1
+    clockfi_outcomes_total{campaign="arty",group="success"} 12
+    clockfi_outcomes_window{campaign="arty",group="reset"} 31
+    clockfi_bitstream_reloads_total{campaign="arty"} 402
+    clockfi_bitstream_reload_seconds_total{campaign="arty"} 1608.2
+    clockfi_trigger_resets_total{campaign="arty"} 7
+    clockfi_grid_index{campaign="arty"} 18234
+"""
+
+import collections
+import os
+import time
+
+
+def _escape(value):
+    # backslash, double quote and line feed are the escapes of the text format
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class MetricsExporter:
+    """Writes the metrics of a running campaign.
+
+    Example::
+
+        metrics = MetricsExporter("/var/lib/node_exporter/clockfi.prom", campaign="arty")
+        for glitch_settings in gc.glitch_values():
+            ...
+            metrics.update(gc, iteration_FI, session)
+        metrics.update(gc, iteration_FI, session, force=True)
+    """
+
+    def __init__(self, path, interval=5.0, window=60.0, campaign=None, grid_size=None):
+        self.path = path
+        self.interval = interval
+        self.window = window
+        self.grid_size = grid_size
+        self.labels = {} if campaign is None else {"campaign": campaign}
+
+        self.injections = 0
+        self.start = time.monotonic()
+        self._last_write = None
+        self._snapshots = collections.deque() # (time, injections, group counts)
+
+    def update(self, gc, grid_index, session=None, injections=1, force=False):
+        '''
+        Counts injections and rewrites the file when `interval` has elapsed.
+
+        Parameters:
+        gc (glitch.GlitchController): Controller of the campaign.
+        grid_index (int): Current position in the sweep.
+        session (src.session.Session): Session, for the bitstream reload statistics.
+        injections (int): Target calls since the last update, e.g. the calls of a burst.
+        force (bool): Write the file now, without counting an injection.
+        '''
+        if not force:
+            self.injections += injections
+        now = time.monotonic()
+        if force or self._last_write is None or now - self._last_write >= self.interval:
+            self.write(gc, grid_index, session, now)
+
+    def write(self, gc, grid_index, session=None, now=None):
+        '''
+        Rewrites the metrics file atomically.
+        '''
+        if now is None:
+            now = time.monotonic()
+        self._last_write = now
+
+        counts = list(gc.group_counts)
+        if self._snapshots and any(n < n0 for n, n0 in zip(counts, self._snapshots[-1][2])):
+            self._snapshots.clear() # new controller, e.g. next sweep of a campaign
+        self._snapshots.append((now, self.injections, counts))
+        while len(self._snapshots) > 1 and now - self._snapshots[0][0] > self.window:
+            self._snapshots.popleft()
+        t0, injections0, counts0 = self._snapshots[0]
+
+        elapsed = now - t0
+        rate = (self.injections - injections0) / elapsed if elapsed > 0 else 0.0
+
+        lines = []
+        self._metric(lines, "clockfi_injections_total", "counter", "Injections since the start of the campaign", self.injections)
+        self._metric(lines, "clockfi_injections_per_second", "gauge", f"Injections per second over the last {self.window:g} s", rate)
+        self._metric(lines, "clockfi_outcomes_total", "counter", "Outcomes since the start of the campaign",
+                     [({"group": g}, n) for g, n in zip(gc.groups, counts)])
+        self._metric(lines, "clockfi_outcomes_window", "gauge", f"Outcomes over the last {self.window:g} s",
+                     [({"group": g}, n - n0) for g, n, n0 in zip(gc.groups, counts, counts0)])
+        if session is not None:
+            self._metric(lines, "clockfi_bitstream_reloads_total", "counter", "Calls to reboot_bitstream", session.reload_count)
+            self._metric(lines, "clockfi_bitstream_reload_seconds_total", "counter", "Time spent in reboot_bitstream", session.reload_time)
+            self._metric(lines, "clockfi_trigger_resets_total", "counter", "Resets of a target found crashed before an injection", session.trigger_reset_count)
+            if session.watchdog is not None:
+                self._metric(lines, "clockfi_stalls_total", "counter", "Injections stopped by the watchdog", session.stall_count)
+                self._metric(lines, "clockfi_stall_seconds_total", "counter", "Time lost in stalls and their recovery", session.stall_time)
+        self._metric(lines, "clockfi_grid_index", "gauge", "Current injection number in the sweep", grid_index)
+        if self.grid_size is not None:
+            self._metric(lines, "clockfi_grid_size", "gauge", "Number of injections of the sweep", self.grid_size)
+        self._metric(lines, "clockfi_uptime_seconds", "gauge", "Time since the start of the exporter", now - self.start)
+        lines.append("# EOF")
+
+        tmp = os.path.join(os.path.dirname(os.path.abspath(self.path)), "." + os.path.basename(self.path) + ".tmp")
+        with open(tmp, 'w') as file:
+            file.write("\n".join(lines) + "\n")
+        os.replace(tmp, self.path)
+
+    def _metric(self, lines, name, kind, help, samples):
+        lines.append(f"# HELP {name} {help}")
+        lines.append(f"# TYPE {name} {kind}")
+        if not isinstance(samples, list):
+            samples = [({}, samples)]
+        for labels, value in samples:
+            labels = dict(self.labels, **labels)
+            label_str = ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+            label_str = "{" + label_str + "}" if label_str else ""
+            lines.append(f"{name}{label_str} {value:.3f}" if isinstance(value, float) else f"{name}{label_str} {value}")
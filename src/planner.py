@@ -0,0 +1,190 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+Time estimates of a sweep, before and during the run.
+
+Before the run, the duration is the number of injections times the
+expected cost of one injection: the mean time of each outcome weighted by
+how often it happens, both taken from the timings.json of a previous
+campaign on the same setup (Session.write_timings) and/or given per outcome.
+A reset costs a bitstream reload, so the outcome mix matters as much as the
+grid size.
+
+During the run, EtaTracker follows the observed time per injection with an
+exponential moving average. suggest() lists settings of ClockFI.py that fit
+a sweep in a wall-time budget.
+
+An injection is one call of the target function: with --burst, a sweep
+point costs up to `burst` injections.
+"""
+
+import json
+import math
+import time
+
+GLITCH_PARAMETERS = ("width", "offset", "ext_offset")
+
+
+def read_timings(file_path=None, overrides=None):
+    """
+    Returns the costs and the outcome mix of a timings.json.
+
+    Parameters:
+    file_path (str): timings.json written by Session.write_timings, or None.
+    overrides (dict): {event: seconds} replacing the recorded means.
+
+    Returns:
+    tuple: ({event: seconds}, {event: fraction of the injections}).
+    """
+    costs, mix = {}, {}
+    if file_path is not None:
+        with open(file_path) as file:
+            timings = json.load(file)
+        total = sum(t["count"] for t in timings.values())
+        for event, t in timings.items():
+            costs[event] = t["mean"]
+            if total:
+                mix[event] = t["count"] / total
+    costs.update(overrides or {})
+    return costs, mix
+
+
+def seconds_per_injection(costs, mix=None):
+    """
+    Expected duration of one injection, None if it cannot be estimated.
+
+    Without a mix (no previous campaign, or none of its outcomes has a
+    cost), an injection costs as much as a normal outcome, by far the most
+    frequent one of a sweep; None without a "normal" cost.
+    """
+    known = {event: share for event, share in (mix or {}).items() if event in costs}
+    weight = sum(known.values())
+    if not weight:
+        return costs.get("normal")
+    return sum(costs[event] * share for event, share in known.items()) / weight
+
+
+def format_duration(seconds):
+    """
+    Formats a duration as "[<d> d ]HH:MM:SS".
+    """
+    if seconds is None or math.isinf(seconds):
+        return "-"
+    seconds = int(round(seconds))
+    days, seconds = divmod(seconds, 86400)
+    hours, seconds = divmod(seconds, 3600)
+    minutes, seconds = divmod(seconds, 60)
+    text = f"{hours:02d}:{minutes:02d}:{seconds:02d}"
+    return f"{days} d {text}" if days else text
+
+
+def _axis_size(gc, i, low, high, step, unique):
+    # number of values of GlitchController.axis_values() for another range or step
+    values = []
+    v = low
+    while v <= high:
+        values.append(v)
+        v += step
+    mapping = gc.effective[i]
+    if not unique or mapping is None:
+        return len(values)
+    effective = mapping.__getitem__ if isinstance(mapping, dict) else mapping
+    return len({effective(v) for v in values})
+
+
+def suggest(gc, per_injection, budget_seconds, unique=False, burst=1):
+    """
+    Lists sweeps of the grid of `gc` fitting in a wall-time budget.
+
+    Every range keeps at least one step: a suggestion that would leave a
+    glitch parameter a single value is dropped.
+
+    Parameters:
+    gc (glitch.GlitchController): Controller with the ranges of the sweep.
+    per_injection (float): Expected seconds per injection.
+    budget_seconds (float): Wall-time budget.
+    unique (bool): Count the points of gc.unique_values() (--dedup model).
+    burst (int): Injections per sweep point (--burst).
+
+    Returns:
+    list: (ClockFI.py options, number of injections, estimated seconds).
+    """
+    points = int(budget_seconds // (per_injection * burst))
+    if points < 1:
+        return []
+    ranges = list(zip(gc.parameter_min, gc.parameter_max))
+    steps = [gc.steps[i][0] for i in range(len(ranges))]
+    sizes = [_axis_size(gc, i, low, high, step, unique) for i, ((low, high), step) in enumerate(zip(ranges, steps))]
+    # --step scales the glitch axes, never the "function" one of a multi-function sweep
+    scaled = [p in GLITCH_PARAMETERS for p in gc.parameters]
+    step = next(s for s, scale in zip(steps, scaled) if scale)
+    spans = [high - low for (low, high), scale in zip(ranges, scaled) if scale and high > low]
+    suggestions = []
+
+    def injections(n):
+        return (n * burst, n * burst * per_injection)
+
+    # coarser global step, no longer than the shortest range
+    k = 1
+    while True:
+        n = math.prod(_axis_size(gc, i, low, high, step * k, unique) if scale else size
+                      for i, ((low, high), scale, size) in enumerate(zip(ranges, scaled, sizes)))
+        if n <= points:
+            suggestions.append((f"--step {step * k:g}", *injections(n)))
+            break
+        if not spans or step * (k + 1) > min(spans):
+            break
+        k += 1
+
+    # shorter ext_offset range, the other axes untouched
+    if "ext_offset" in gc.parameters:
+        i = gc.parameters.index("ext_offset")
+        low, high = ranges[i]
+        others = math.prod(size for j, size in enumerate(sizes) if j != i)
+        keep = min(points // others, sizes[i])
+        if keep >= 2:
+            maximum = low + (keep - 1) * steps[i]
+            n = _axis_size(gc, i, low, maximum, steps[i], unique) * others
+            suggestions.append((f"--max-ext-offset {maximum:g}", *injections(n)))
+
+    # space filling sample of the whole ranges, --dedup does not apply to it
+    n = min(points, math.prod(_axis_size(gc, i, low, high, step, False)
+                              for i, ((low, high), step) in enumerate(zip(ranges, steps))))
+    suggestions.append((f"--sampling halton --budget {n}", *injections(n)))
+    return suggestions
+
+
+class EtaTracker:
+    """Live estimate of the remaining time of a sweep.
+
+    Example::
+
+        eta = EtaTracker(total=result, done=args.resume_progress)
+        for glitch_settings in glitch_values:
+            ...
+            print("ETA : ", format_duration(eta.update(iteration_FI)))
+    """
+
+    def __init__(self, total, done=0, per_injection=None, smoothing=0.02):
+        self.total = total
+        self.smoothing = smoothing
+        self.per_injection = per_injection # prior, from the timings of a previous campaign
+        self._last = (done, time.monotonic())
+
+    def update(self, done):
+        '''
+        Records the progress and returns the estimated remaining seconds.
+        '''
+        now = time.monotonic()
+        last_done, last_time = self._last
+        if done > last_done:
+            sample = (now - last_time) / (done - last_done)
+            if self.per_injection is None:
+                self.per_injection = sample
+            else:
+                self.per_injection += self.smoothing * (sample - self.per_injection)
+            self._last = (done, now)
+        if self.per_injection is None:
+            return None
+        return max(self.total - done, 0) * self.per_injection
@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+Connected regions of success in the (width, offset, ext_offset) lattice.
+
+Cells with at least one success are grouped with a union-find over their
+lattice neighbours. Logged values are read back from the scope, quantized
+and unevenly spaced, so each parameter is indexed by the position of its
+value among the distinct tested values, and two cells are neighbours when
+these positions differ by 1 along one parameter. Each region is reported
+with its bounding box, size, peak and mean success rate, and a
+representative: the tested cell closest to the success-weighted centroid.
+A large success cloud is thus reduced to one replay point per region.
+"""
+
+import csv
+
+
+def cells_from_results(results, group="success"):
+    """
+    Returns the cells of a GlitchResults as {parameters: (count, total)}.
+
+    Parameters:
+    results (glitch.GlitchResults): Results of a campaign.
+    group (str): Group counted.
+    """
+    return {parameters: (entry[group], entry['total']) for parameters, entry in results._result_dict.items()}
+
+
+def lattice_axes(cells):
+    """
+    Returns the distinct tested values of each parameter, sorted.
+
+    Parameters:
+    cells (dict or iterable): Parameter sets, e.g. {parameters: (count, total)}.
+
+    Returns:
+    list: Sorted list of values per parameter.
+    """
+    cells = list(cells)
+    dims = len(cells[0])
+    return [sorted({p[d] for p in cells}) for d in range(dims)]
+
+
+def find_regions(cells, min_rate=0.0, axes=None):
+    """
+    Finds the connected regions of success.
+
+    Parameters:
+    cells (dict): {parameters: (count, total)}, all tested cells.
+    min_rate (float): Minimum success rate of a cell to belong to a region.
+    axes (list): Sorted values of each parameter, from the cells if None.
+
+    Returns:
+    list: One dict per region, largest first, with the keys size, count,
+          total, peak_rate, mean_rate, min, max, centroid, representative
+          and cells.
+    """
+    if not cells:
+        return []
+    if axes is None:
+        axes = lattice_axes(cells)
+    dims = len(axes)
+    positions = [{v: i for i, v in enumerate(values)} for values in axes]
+
+    def coords(p):
+        return tuple(positions[d][p[d]] for d in range(dims))
+
+    members = {}
+    for p, (count, total) in cells.items():
+        if count > 0 and total > 0 and count / total >= min_rate:
+            members[coords(p)] = p
+
+    # union-find with path halving
+    parent = {c: c for c in members}
+
+    def find(c):
+        while parent[c] != c:
+            parent[c] = parent[parent[c]]
+            c = parent[c]
+        return c
+
+    for c in members:
+        for d in range(dims):
+            n = c[:d] + (c[d] + 1,) + c[d + 1:]
+            if n in members:
+                a, b = find(c), find(n)
+                if a != b:
+                    parent[b] = a
+
+    groups = {}
+    for c in members:
+        groups.setdefault(find(c), []).append(c)
+
+    regions = []
+    for group in groups.values():
+        params = [members[c] for c in group]
+        counts = [cells[p][0] for p in params]
+        rates = [cells[p][0] / cells[p][1] for p in params]
+        count = sum(counts)
+        centroid = tuple(sum(p[d] * n for p, n in zip(params, counts)) / count for d in range(dims))
+        # closest tested cell to the centroid, in lattice positions, the highest rate on ties
+        center = tuple(sum(c[d] * n for c, n in zip(group, counts)) / count for d in range(dims))
+        representative = min(group, key=lambda c: (sum((c[d] - center[d]) ** 2 for d in range(dims)),
+                                                   -cells[members[c]][0] / cells[members[c]][1]))
+        representative = members[representative]
+        regions.append({
+            "size": len(params),
+            "count": count,
+            "total": sum(cells[p][1] for p in params),
+            "peak_rate": max(rates),
+            "mean_rate": sum(rates) / len(rates),
+            "min": tuple(min(p[d] for p in params) for d in range(dims)),
+            "max": tuple(max(p[d] for p in params) for d in range(dims)),
+            "centroid": centroid,
+            "representative": representative,
+            "cells": sorted(params),
+        })
+
+    regions.sort(key=lambda r: (-r["size"], -r["count"]))
+    return regions
+
+
+def write_regions(regions, file_path, parameters=("width", "offset", "ext_offset")):
+    """
+    Saves the regions, one line per region.
+
+    Parameters:
+    regions (list): Regions from find_regions.
+    file_path (str): Csv file.
+    parameters (list): Names of the parameters.
+    """
+    with open(file_path, 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(["region", "size", "count", "total", "peak_rate", "mean_rate"]
+                        + [p for p in parameters]
+                        + ["min_" + p for p in parameters] + ["max_" + p for p in parameters]
+                        + ["centroid_" + p for p in parameters])
+        for i, r in enumerate(regions):
+            writer.writerow([i, r["size"], r["count"], r["total"], round(r["peak_rate"], 4), round(r["mean_rate"], 4)]
+                            + list(r["representative"]) + list(r["min"]) + list(r["max"])
+                            + [round(v, 3) for v in r["centroid"]])
@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+Replay planner of ClockFIrepeat.py.
+
+A log usually holds the same (width, offset, ext_offset) many times, when the
+sweep used several passes or was merged from several runs. The planner
+collapses them into unique tuples weighted by their historical success count,
+keeps the best ones and orders them so that the expensive glitch settings
+change as rarely as possible.
+
+Changing width or offset reconfigures the phase shift of the glitch module of
+the scope, changing ext_offset is a single register write: the default order
+groups the tuples by width, then offset, and only ext_offset moves between
+consecutive tuples of a group.
+"""
+
+import src.cw_toolkit as tk
+
+ORDERS = ["settings", "weight", "log"]
+
+
+def count_tuples(rows, event="success"):
+    """
+    Counts the occurrences of an event by glitch parameters, the stalled
+    injections are not counted.
+
+    Parameters:
+    rows (iterable): Rows of cw_toolkit.read_log.
+    event (str): Event to count.
+
+    Returns:
+    dict: {(width, offset, ext_offset): [count, total]}, in order of first appearance.
+    """
+    counts = {}
+    for _, row_event, width, offset, ext_offset, _ in rows:
+        if row_event == "stall":
+            continue # no outcome, see Session.inject
+        entry = counts.get((width, offset, ext_offset))
+        if entry is None:
+            entry = counts[(width, offset, ext_offset)] = [0, 0]
+        entry[1] += 1
+        if row_event == event:
+            entry[0] += 1
+    return counts
+
+
+def plan_replay(counts, min_count=1, min_rate=0.0, max_tuples=None, order="settings"):
+    """
+    Builds the replay set.
+
+    Parameters:
+    counts (dict): {(width, offset, ext_offset): [count, total]} from count_tuples.
+    min_count (int): Minimum number of past successes of a tuple.
+    min_rate (float): Minimum past success rate of a tuple.
+    max_tuples (int): Keep only the tuples with the highest weights, all if None.
+    order (str): "settings" to minimise the changes of width/offset,
+                 "weight" for the highest weight first,
+                 "log" for the order of first appearance in the log.
+
+    Returns:
+    list: (parameters, weight, rate) tuples, weight being the past success count.
+    """
+    if order not in ORDERS:
+        raise ValueError("Invalid order {} (orders are {})".format(order, ORDERS))
+
+    plan = []
+    for position, (parameters, (count, total)) in enumerate(counts.items()):
+        rate = count / total if total else 0.0
+        if count >= max(min_count, 1) and rate >= min_rate:
+            plan.append((parameters, count, rate, position))
+
+    # highest weight first, ties broken by rate then by log order
+    plan.sort(key=lambda p: (-p[1], -p[2], p[3]))
+    if max_tuples is not None:
+        plan = plan[:max_tuples]
+
+    if order == "settings":
+        plan.sort(key=lambda p: p[0])
+    elif order == "log":
+        plan.sort(key=lambda p: p[3])
+
+    return [(parameters, weight, rate) for parameters, weight, rate, _ in plan]
+
+
+def plan_trials(plan, nb_fi, weighted=False):
+    """
+    Returns the number of injections of each tuple of a plan.
+
+    Parameters:
+    plan (list): Replay set from plan_replay.
+    nb_fi (int): Number of injections of the tuple with the highest weight.
+    weighted (bool): If True, the other tuples get a number of injections
+                     proportional to their weight (at least one), else nb_fi.
+
+    Returns:
+    list: Number of injections, in the order of the plan.
+    """
+    if not weighted or not plan:
+        return [nb_fi] * len(plan)
+    top = max(weight for _, weight, _ in plan)
+    return [max(1, round(nb_fi * weight / top)) for _, weight, _ in plan]
+
+
+def plan_regions(counts, min_rate=0.0, **kwargs):
+    """
+    Builds a replay set of one point per connected region of success.
+
+    Each region of src.regions.find_regions is replaced by its representative,
+    weighted by the successes of the whole region; the other arguments are
+    those of plan_replay.
+    """
+    from src.regions import find_regions
+
+    representatives = {}
+    for region in find_regions({p: tuple(c) for p, c in counts.items()}, min_rate):
+        representatives[region["representative"]] = [region["count"], region["total"]]
+    return plan_replay(representatives, **kwargs)
+
+
+def plan_from_log(file_path, **kwargs):
+    """
+    Builds the replay set of the success rows of a log file, see plan_replay.
+    """
+    return plan_replay(count_tuples(tk.read_log(file_path)), **kwargs)
@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+SQLite storage of fault injection results.
+
+Optional backend next to the csv log: every injection is a row of the
+`injections` table, indexed on (width, offset, ext_offset) and on event, so
+the replay set of ClockFIrepeat.py or questions across many campaigns are
+answered with an indexed query instead of a full scan of the csv files.
+Rows are buffered and inserted in batched transactions.
+"""
+
+import sqlite3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS injections (
+    id          INTEGER PRIMARY KEY,
+    campaign    TEXT NOT NULL,
+    i_fi        INTEGER NOT NULL,
+    event       TEXT NOT NULL,
+    width       REAL NOT NULL,
+    offset      REAL NOT NULL,
+    ext_offset  REAL NOT NULL,
+    data        TEXT
+);
+CREATE INDEX IF NOT EXISTS injections_params ON injections (width, offset, ext_offset);
+CREATE INDEX IF NOT EXISTS injections_event ON injections (event);
+CREATE INDEX IF NOT EXISTS injections_campaign ON injections (campaign);
+"""
+
+
+class ResultsDB:
+    """Results of fault injections stored in a SQLite database.
+
+    Example::
+
+        db = ResultsDB("results.db", "arty_loop")
+        db.add(1, "success", 12.0, -3.0, 40.0, "...")
+        db.close()
+
+        db = ResultsDB("results.db")
+        db.select("success", min_rate=0.5)
+    """
+
+    def __init__(self, file_path, campaign=None, batch_size=1000):
+        self.file_path = file_path
+        self.campaign = campaign
+        self.batch_size = batch_size
+        self._rows = []
+
+        self.conn = sqlite3.connect(file_path)
+        # the database is a cache of the csv logs: trade durability for insert speed
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def add(self, i_FI, event, width, offset, ext_offset, data=None):
+        '''
+        Buffers one injection, the buffer is written every `batch_size` rows.
+        '''
+        self._rows.append((self.campaign, i_FI, event, width, offset, ext_offset, data))
+        if len(self._rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        '''
+        Writes the buffered injections in a single transaction.
+        '''
+        if not self._rows:
+            return
+        with self.conn:
+            self.conn.executemany("INSERT INTO injections (campaign, i_fi, event, width, offset, ext_offset, data) VALUES (?, ?, ?, ?, ?, ?, ?)", self._rows)
+        self._rows = []
+
+    def close(self):
+        self.flush()
+        self.conn.close()
+
+    def import_log(self, file_path):
+        '''
+        Adds the rows of a csv log, returns the number of rows.
+        '''
+        import src.cw_toolkit as tk
+
+        n = 0
+        for row in tk.read_log(file_path):
+            self.add(*row)
+            n += 1
+        self.flush()
+        return n
+
+    def select(self, event="success", min_rate=0.0, min_count=1, campaign=None):
+        '''
+        Returns the glitch parameters where `event` happened.
+
+        Parameters:
+        event (str): Event to look for.
+        min_rate (float): Minimum rate of the event among the injections with these parameters.
+        min_count (int): Minimum number of times the event happened.
+        campaign (str): Restrict to one campaign, all campaigns if None.
+
+        Returns:
+        list: (width, offset, ext_offset, count, total) tuples, highest rate first.
+        '''
+        self.flush()
+        where = "WHERE event != 'stall'"
+        params = [event]
+        if campaign is not None:
+            where += " AND campaign = ?"
+            params.append(campaign)
+        query = f"""
+            SELECT width, offset, ext_offset, SUM(event = ?) AS count, COUNT(*) AS total
+            FROM injections {where}
+            GROUP BY width, offset, ext_offset
+            HAVING count >= ? AND count >= ? * total
+            ORDER BY CAST(count AS REAL) / total DESC, count DESC
+        """
+        params += [max(min_count, 1), min_rate]
+        return self.conn.execute(query, params).fetchall()
+
+    def campaigns(self):
+        '''
+        Returns the campaigns stored with their number of injections.
+        '''
+        self.flush()
+        return self.conn.execute("SELECT campaign, COUNT(*) FROM injections GROUP BY campaign ORDER BY campaign").fetchall()
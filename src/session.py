@@ -0,0 +1,517 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+Hardware session shared by the fault injection scripts.
+
+A Session opens the ChipWhisperer scope/target once, loads the bitstream and
+then runs as many injections as needed over the same connection. ClockFI.py,
+the campaign runner and the daemon all drive their sweeps through it.
+"""
+
+import contextlib
+import json
+import subprocess
+import time
+
+import src.cw_toolkit as tk
+from src.watchdog import Stall
+
+# recovery steps after a stall, from the cheapest to the most expensive
+RECOVERY_STEPS = ["flush", "reset", "reconnect", "reload"]
+
+
+class Session:
+    """Connection to the ChipWhisperer and to the FPGA target.
+
+    Example::
+
+        session = Session("arty", "50203120...", "210319...", None, "top.bit")
+        session.open()
+        for glitch_settings in gc.glitch_values():
+            event, data_read = session.inject(gc, glitch_settings, 's', '', 0)
+        session.close()
+    """
+
+    def __init__(self, name_board, sn_chipwhisperer, ftdi_FPGA, freq_load_bit, bitstream_file):
+        self.name_board = name_board
+        self.sn_chipwhisperer = sn_chipwhisperer
+        self.ftdi_FPGA = ftdi_FPGA
+        self.freq_load_bit = freq_load_bit
+        self.bitstream_file = bitstream_file
+
+        self.scope = None
+        self.target = None
+
+        self.reload_count = 0
+        self.reload_time = 0.0
+
+        self.golden = None # hash of the expected output, see golden_run()
+        self.goldens = {} # hashes of the expected outputs by function index of a multi-function sweep
+        self._applied = None # glitch settings last written to the scope
+        self._trigger_src = "ext_single" # trigger mode set by tk.setup_clock_glitch, see inject_burst()
+
+        self.last_parameters = None # (width, offset, ext_offset) of the last injection, read back from the scope
+        self.captured = False # the last injection triggered the scope, its ADC trace is available
+        self.last_trace = None # ADC trace of the last injection, when the classifier read it
+        self.classifier = None # src.classifier.TraceClassifier labelling the traces in inject()
+        self.golden_traces = {} # traces of golden_run(collect_traces=True), by key
+        self.watchdog = None # src.watchdog.Watchdog enforcing the deadlines of inject()
+        self.stall_count = 0
+        self.trigger_reset_count = 0 # resets found before an injection, the trigger still high
+        self.trigger_reset = False # the last injection started with such a reset, its first outcome
+        self.timings = {} # event: [count, seconds] of inject(), see write_timings()
+        self.stall_time = 0.0
+        self._stalls_in_row = 0
+
+    def open(self):
+        '''
+        Connects the scope and the target, configures the clock glitch and
+        loads the bitstream.
+        '''
+        import chipwhisperer as cw
+
+        print("\n Scope preparation ... 🎠\n")
+
+        # declaration scope and target
+        self.scope = cw.scope(sn=self.sn_chipwhisperer)
+        self.target = cw.target(self.scope)
+
+        # Checking the ChipWhisperer
+        tk.setup_generic(self.scope, self.target)
+        tk.setup_clock_glitch(self.scope, self.target)
+        self._applied = None
+        self._trigger_src = "ext_single"
+
+        tk.reboot_flush(self.scope, self.target)
+        self.reload_bitstream()
+
+    def close(self):
+        '''
+        Disconnects the setup.
+        '''
+        tk.disconnected_setup(self.scope, self.target)
+        self.scope = None
+        self.target = None
+
+    def reload_bitstream(self):
+        '''
+        Reloads the bitstream, keeping count of the number and duration of reloads.
+        '''
+        start = time.perf_counter()
+        timeout = self.watchdog.deadlines.get("reload") if self.watchdog is not None else None
+        try:
+            with self._phase("reload"):
+                tk.reboot_bitstream(self.name_board, self.ftdi_FPGA, self.freq_load_bit, self.bitstream_file, timeout)
+        except subprocess.TimeoutExpired:
+            raise Stall("reload", timeout)
+        self.reload_time += time.perf_counter() - start
+        self.reload_count += 1
+
+    def golden_run(self, callfunc, argumentfunc, size_data, runs=3, key=None, collect_traces=False):
+        '''
+        Records the hash of the output of the target function without glitch.
+
+        The function is called `runs` times with the glitch disconnected from
+        the clock, all the outputs must have the same hash. Afterwards inject()
+        classifies a valid response whose hash differs as "corrupted".
+
+        With `key` (the function index of a multi-function sweep), the hash is
+        stored in goldens[key] and used by inject() with the same key.
+
+        With `collect_traces`, the scope is armed for each run and the ADC
+        traces are kept in golden_traces[key], e.g. for the template of a
+        src.classifier.TraceClassifier.
+
+        Returns the hash.
+        '''
+        scope = self.scope
+        target = self.target
+
+        print("\nGolden run ... 🏅")
+
+        self._set_trigger_src("ext_single")
+        scope.io.hs2 = "clkgen" # clean clock
+        digests = set()
+        traces = []
+        try:
+            for _ in range(runs):
+                tk.reboot_flush(scope, target)
+                if collect_traces:
+                    scope.arm()
+                tk.target_function(target, callfunc, argumentfunc)
+                if collect_traces:
+                    if scope.capture():
+                        raise RuntimeError("Golden run: no trigger of the scope")
+                    traces.append(scope.get_last_trace())
+                val = target.simpleserial_read_witherrors('r', 1, glitch_timeout=10, ack=False)
+                data_read = target.read(size_data)
+                if val['valid'] is False:
+                    raise RuntimeError("Golden run: invalid response of the target {}".format(val))
+                digests.add(tk.output_digest(val['payload'], data_read))
+        finally:
+            scope.io.hs2 = "glitch"
+
+        if len(digests) != 1:
+            raise RuntimeError("Golden run: the output of the target is not stable ({} different hashes in {} runs)".format(len(digests), runs))
+
+        digest = digests.pop()
+        if collect_traces:
+            self.golden_traces[key] = traces
+        if key is None:
+            self.golden = digest
+        else:
+            self.goldens[key] = digest
+        print("Golden output hash : ", digest)
+        return digest
+
+    def apply_glitch_settings(self, glitch_settings):
+        '''
+        Writes (width, offset, ext_offset) to the scope, skipping the values
+        that did not change since the previous injection: each write is a USB
+        transaction, and width/offset reconfigure the glitch phase shift.
+        '''
+        scope = self.scope
+        applied = self._applied or (None, None, None)
+
+        if glitch_settings[1] != applied[1]:
+            scope.glitch.offset = glitch_settings[1]
+        if glitch_settings[0] != applied[0]:
+            scope.glitch.width = glitch_settings[0]
+        if glitch_settings[2] != applied[2]:
+            scope.glitch.ext_offset = glitch_settings[2]
+
+        self._applied = tuple(glitch_settings[:3])
+
+    def probe_effective(self, parameter, values):
+        '''
+        Writes each value of a glitch parameter ("width", "offset"...) to the
+        scope and reads back the value it realises.
+
+        Returns {requested: effective}, for GlitchController.set_effective().
+        '''
+        glitch = self.scope.glitch
+        mapping = {}
+        for v in values:
+            setattr(glitch, parameter, v)
+            mapping[v] = getattr(glitch, parameter)
+        self._applied = None # the scope no longer holds the last injection settings
+        return mapping
+
+    def glitch_parameters(self):
+        '''
+        Returns the glitch parameters currently applied by the scope.
+        '''
+        return (self.scope.glitch.width, self.scope.glitch.offset, self.scope.glitch.ext_offset)
+
+    def _phase(self, name):
+        if self.watchdog is None:
+            return contextlib.nullcontext()
+        return self.watchdog.phase(name)
+
+    def reconnect(self):
+        '''
+        Reconnects the scope and the target without reloading the bitstream.
+        '''
+        import chipwhisperer as cw
+
+        repeat = None
+        try:
+            repeat = self.scope.glitch.repeat
+            tk.disconnected_setup(self.scope, self.target)
+        except Exception as e:
+            print("Disconnection failed : ", e)
+
+        self.scope = cw.scope(sn=self.sn_chipwhisperer)
+        self.target = cw.target(self.scope)
+        tk.setup_generic(self.scope, self.target)
+        tk.setup_clock_glitch(self.scope, self.target)
+        if repeat is not None:
+            self.scope.glitch.repeat = repeat
+        self._applied = None
+        self._trigger_src = "ext_single"
+
+    def recover(self):
+        '''
+        Recovers from a stall, escalating through RECOVERY_STEPS: consecutive
+        stalls start from a more expensive step, and a step that fails or
+        stalls itself falls through to the next one.
+
+        Returns the step that succeeded.
+        '''
+        level = min(self._stalls_in_row, len(RECOVERY_STEPS) - 1)
+        self._stalls_in_row += 1
+        for step in RECOVERY_STEPS[level:]:
+            print(f"Recovery : {step} ... 🚑")
+            try:
+                with self._phase("recover"):
+                    if step == "flush":
+                        self.target.flush()
+                    elif step == "reset":
+                        tk.reboot_flush(self.scope, self.target)
+                    elif step == "reconnect":
+                        self.reconnect()
+                    else:
+                        self.reload_bitstream()
+                        tk.reboot_flush(self.scope, self.target)
+                return step
+            except Exception as e:
+                print(f"Recovery {step} failed : ", e)
+        raise RuntimeError("Could not recover from the stall, all recovery steps failed")
+
+    def inject(self, gc, glitch_settings, callfunc, argumentfunc, size_data, key=None):
+        '''
+        Injects one clock glitch and classifies the behaviour of the target.
+
+        The outcome is added to `gc` with the glitch parameters read back from
+        the scope, followed by `key` if given (the function index of a
+        multi-function sweep, whose golden hash is goldens[key]), once the
+        last read of the target is done.
+
+        Returns (event, data_read), event being "success", "reset" or "normal".
+        After golden_run(), a valid response whose hash differs from the golden
+        one is "corrupted", and data_read is emptied for the responses matching
+        it: there is no need to store the expected output again.
+
+        With a watchdog, a phase exceeding its deadline is recovered with
+        recover() and the event is "stall" (not added to `gc`), its duration
+        is added to stall_time. A call blocked in the USB or serial driver is
+        only stopped once it returns, see src.watchdog.
+
+        With a classifier, the trace is labelled right after the capture and,
+        in shortcut mode, a point labelled "normal" or "reset" is returned
+        without reading the target; its data_read is then empty.
+
+        If the trigger is still high before the injection, the target crashed
+        after the previous one: it is reset, and a "reset" is added to `gc`
+        and counted in trigger_reset_count. inject_burst() returns it as an
+        outcome of its own, inject() only returns the one of the injection.
+
+        The glitch parameters to log are then in last_parameters.
+        '''
+        return self._attempt(lambda results: self._inject(results, gc, glitch_settings, callfunc, argumentfunc, size_data, key),
+                             glitch_settings)[-1]
+
+    def inject_burst(self, gc, glitch_settings, callfunc, argumentfunc, size_data, burst, key=None):
+        '''
+        Injects the same clock glitch into `burst` calls of the target in a
+        row, with a single reset and arm: the glitch triggers on every call
+        (trigger_src "ext_continuous") and each response is classified and
+        added to `gc` like in inject().
+
+        The burst ends early on the first reset (or stall). Only the first
+        call is captured by the scope, a classifier is not supported.
+
+        Returns the list of (event, data_read), one per call made, after the
+        reset of a trigger still high if any (trigger_reset is then True).
+        '''
+        if burst == 1:
+            # one call, labelled by the classifier if any
+            run = lambda results: self._inject(results, gc, glitch_settings, callfunc, argumentfunc, size_data, key)
+        else:
+            run = lambda results: self._inject_burst(results, gc, glitch_settings, callfunc, argumentfunc, size_data, burst, key)
+        return self._attempt(run, glitch_settings)
+
+    def _attempt(self, run, glitch_settings):
+        # runs `run(results)` under the watchdog and times its outcomes
+        self.last_parameters = tuple(glitch_settings[:3])
+        self.captured = False
+        self.last_trace = None
+        self.trigger_reset = False
+        results = []
+        start = time.perf_counter()
+        if self.watchdog is None:
+            run(results)
+        else:
+            try:
+                run(results)
+                self._stalls_in_row = 0
+            except Stall as stall:
+                print(f"Stall : {stall} ⛔")
+                self.recover()
+                self.stall_count += 1
+                self.stall_time += time.perf_counter() - start
+                results.append(("stall", ""))
+
+        # the calls of a burst share its duration
+        elapsed = (time.perf_counter() - start) / len(results)
+        for event, _ in results:
+            timing = self.timings.get(event)
+            if timing is None:
+                timing = self.timings[event] = [0, 0.0]
+            timing[0] += 1
+            timing[1] += elapsed
+        return results
+
+    def write_timings(self, file_path):
+        '''
+        Saves the number and duration of the injections by event (JSON), the
+        per-outcome costs of the strategy simulator (ClockFIsimulate.py).
+        '''
+        timings = {event: {"count": n, "seconds": round(t, 6), "mean": round(t / n, 6)}
+                   for event, (n, t) in sorted(self.timings.items())}
+        with open(file_path, 'w') as file:
+            json.dump(timings, file, indent=2)
+
+    def _prepare(self, results, gc, glitch_settings, key=None):
+        # applies the settings and resets the target, returns (parameters, golden)
+        scope = self.scope
+        target = self.target
+
+        self.apply_glitch_settings(glitch_settings)
+        parameters = self.last_parameters = self.glitch_parameters()
+        golden = self.golden
+        if key is not None:
+            parameters += (key,)
+            golden = self.goldens.get(key)
+
+        print("\nWidth | Offset | Ext_Offset [",glitch_settings[0]," | ", glitch_settings[1], " | ", glitch_settings[2],"]\n")
+
+        if scope.adc.state:
+
+            print(scope.adc.state)
+
+            print("reboot ... 💥")
+            # can detect crash here (fast) before timing out (slow)
+            print("Trigger still high!")
+            #Device is slow to boot?
+            tk.reboot_flush(scope, target)
+
+            # reload the bitstream
+            self.reload_bitstream()
+            gc.add("reset", parameters)
+            self.trigger_reset_count += 1
+            self.trigger_reset = True
+            results.append(("reset", ""))
+
+        tk.reboot_flush(scope, target) # initialisation
+        return parameters, golden
+
+    def _capture(self, callfunc, argumentfunc):
+        # arms the scope and calls the target, a trigger timeout is a reset
+        scope = self.scope
+        target = self.target
+
+        with self._phase("capture"):
+            scope.arm()
+
+            tk.target_function(target, callfunc, argumentfunc)
+
+            ret = scope.capture()
+            self.captured = not ret
+
+        if ret:
+            print('Timeout - no trigger')
+
+            print("reboot ... 💥")
+
+            # reload the bitstream
+            self.reload_bitstream()
+
+            #Device is slow to boot?
+            tk.reboot_flush(scope, target)
+
+        return not ret
+
+    def _read_response(self, golden, size_data):
+        # classifies the response of the target to one call, the caller adds
+        # the event to gc once all the reads are done (a stalled read is not counted)
+        scope = self.scope
+        target = self.target
+
+        with self._phase("read"):
+            val = target.simpleserial_read_witherrors('r', 1, glitch_timeout=10, ack=False)#For loop check
+        print(val)
+
+        if val['valid'] is False:
+            print("reboot ... 💥")
+
+            event = "reset"
+
+        elif val['payload'] == bytearray([0xc]): #for loop check
+            print(val)
+            print(scope.glitch.width, scope.glitch.offset, scope.glitch.ext_offset)
+            print("Successful injection ! 🐙 \n")
+
+            event = "success"
+
+        else:
+            with self._phase("read"):
+                data_read = target.read(size_data)
+
+            if golden is None:
+                event = "normal"
+            elif tk.output_digest(val['payload'], data_read) == golden:
+                event = "normal"
+                data_read = ""
+            else:
+                event = "corrupted"
+                print("Corrupted output ! 🧟 \n")
+
+            return event, data_read
+
+        with self._phase("read"):
+            data_read = target.read(size_data)
+
+        return event, data_read
+
+    def _set_trigger_src(self, trigger_src):
+        # written only when it changes, inject_burst() leaves it in ext_continuous
+        if self._trigger_src != trigger_src:
+            self.scope.glitch.trigger_src = trigger_src
+            self._trigger_src = trigger_src
+
+    def _inject(self, results, gc, glitch_settings, callfunc, argumentfunc, size_data, key=None):
+        self._set_trigger_src("ext_single")
+        parameters, golden = self._prepare(results, gc, glitch_settings, key)
+
+        label = None
+        if not self._capture(callfunc, argumentfunc):
+            event = "reset"
+            with self._phase("read"):
+                data_read = self.target.read(size_data)
+            gc.add(event, parameters)
+            results.append((event, data_read))
+            return
+
+        if self.classifier is not None:
+            # pre-classification of the trace, may skip the serial reads
+            self.last_trace = self.scope.get_last_trace()
+            label, check = self.classifier.predict(self.last_trace, key)
+            if not check:
+                gc.add(label, parameters)
+                results.append((label, ""))
+                return
+
+        event, data_read = self._read_response(golden, size_data)
+        gc.add(event, parameters)
+
+        if label is not None:
+            self.classifier.check(label, event)
+
+        results.append((event, data_read))
+
+    def _inject_burst(self, results, gc, glitch_settings, callfunc, argumentfunc, size_data, burst, key=None):
+        # glitch on every trigger of the target, not only the first one after arm()
+        self._set_trigger_src("ext_continuous")
+
+        parameters, golden = self._prepare(results, gc, glitch_settings, key)
+
+        # the first call is captured (ADC trace, trigger timeout)
+        if not self._capture(callfunc, argumentfunc):
+            with self._phase("read"):
+                data_read = self.target.read(size_data)
+            gc.add("reset", parameters)
+            results.append(("reset", data_read))
+            return
+
+        for k in range(burst):
+            if k > 0:
+                with self._phase("capture"):
+                    tk.target_function(self.target, callfunc, argumentfunc)
+            event, data_read = self._read_response(golden, size_data)
+            gc.add(event, parameters)
+            results.append((event, data_read))
+            if event == "reset":
+                # the target is down, the next burst starts with a reset
+                return
@@ -0,0 +1,234 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+Live results published in shared memory for out-of-process dashboards.
+
+The acquisition process owns a multiprocessing.shared_memory block holding
+one int64 counter per (grid cell, group) plus a total per group, laid out
+after a header::
+
+    int64 magic, int64 sequence, int64 metadata length, metadata (JSON)
+    ... padding up to HEADER_SIZE ...
+    int64 totals[groups]
+    int64 counts[cells][groups]    cells in the order of glitch_values()
+
+The writer never locks: it makes the sequence odd, increments two counters
+and makes it even again (a seqlock). A reader maps the same block with no
+copy. snapshot() copies the totals and a few cells only, and retries if the
+sequence moved or was odd meanwhile; top_cells() ranks all the cells with
+numpy straight on the mapped block. A dashboard never slows the injection
+loop down, whatever the size of the grid.
+"""
+
+import json
+import struct
+import time
+from multiprocessing import shared_memory
+
+MAGIC = 0x434C4B4649524553 # "CLKFIRES"
+HEADER_SIZE = 4096
+
+
+# names of the blocks created by this process, see _attach()
+_created = set()
+
+
+def _attach(name):
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13: the resource tracker would destroy the block when
+        # the reader exits, unregister it. Not in the writer's own process:
+        # its unlink() unregisters the block, a second time would fail.
+        from multiprocessing import resource_tracker
+        shm = shared_memory.SharedMemory(name=name)
+        if shm.name not in _created:
+            resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+
+class SharedResults:
+    """Writer side, attached to a GlitchController with gc.publish(name)."""
+
+    def __init__(self, name, groups, parameters, minimum, step, sizes):
+        self.groups = list(groups)
+        self.parameters = list(parameters)
+        self.minimum = list(minimum)
+        self.step = list(step)
+        self.sizes = list(sizes)
+
+        cells = 1
+        for n in self.sizes:
+            cells *= n
+        self.cells = cells
+
+        metadata = json.dumps({"groups": self.groups, "parameters": self.parameters,
+                               "min": self.minimum, "step": self.step, "sizes": self.sizes}).encode()
+        if 24 + len(metadata) > HEADER_SIZE:
+            raise ValueError("Too many groups or parameters for the shared memory header")
+
+        n_groups = len(self.groups)
+        size = HEADER_SIZE + 8 * n_groups * (cells + 1)
+        self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        self.name = self.shm.name
+        _created.add(self.name)
+
+        buf = self.shm.buf
+        struct.pack_into("<qqq", buf, 0, MAGIC, 0, len(metadata))
+        buf[24:24 + len(metadata)] = metadata
+        self._seq = buf[8:16].cast("q")
+        self._values = buf[HEADER_SIZE:].cast("q")
+
+        # strides of the cell index, last parameter varying fastest like glitch_values()
+        self._strides = []
+        stride = n_groups
+        for n in reversed(self.sizes):
+            self._strides.insert(0, stride)
+            stride *= n
+
+    def add(self, group_index, parameters, n=1):
+        '''
+        Counts n results. Parameters outside the grid only count in the totals.
+        '''
+        index = n_groups = len(self.groups)
+        for d, value in enumerate(parameters):
+            k = int(round((value - self.minimum[d]) / self.step[d]))
+            if k < 0 or k >= self.sizes[d]:
+                index = None
+                break
+            index += k * self._strides[d]
+
+        values = self._values
+        self._seq[0] += 1
+        values[group_index] += n
+        if index is not None:
+            values[index + group_index] += n
+        self._seq[0] += 1
+
+    def clear(self):
+        self._seq[0] += 1
+        self.shm.buf[HEADER_SIZE:] = bytes(len(self.shm.buf) - HEADER_SIZE)
+        self._seq[0] += 1
+
+    def close(self):
+        '''
+        Releases and destroys the shared memory block.
+        '''
+        self._seq.release()
+        self._values.release()
+        self.shm.close()
+        self.shm.unlink()
+        _created.discard(self.name)
+
+
+class SharedResultsView:
+    """Reader side: maps the block published by another process.
+
+    Example::
+
+        view = SharedResultsView("clockfi")
+        best = view.top_cells("success", 10)
+        totals, counts = view.snapshot(best)
+        view.parameters_of(best[0]), counts[0]   # [success, corrupted, reset, normal]
+    """
+
+    def __init__(self, name):
+        self.shm = _attach(name)
+        buf = self.shm.buf
+        magic, _, length = struct.unpack_from("<qqq", buf, 0)
+        if magic != MAGIC:
+            raise ValueError(f"Shared memory {name} does not hold glitch results")
+        metadata = json.loads(bytes(buf[24:24 + length]))
+        self.groups = metadata["groups"]
+        self.parameters = metadata["parameters"]
+        self.minimum = metadata["min"]
+        self.step = metadata["step"]
+        self.sizes = metadata["sizes"]
+
+        self._seq = buf[8:16].cast("q")
+        # zero-copy view of the totals and counts
+        self.values = buf[HEADER_SIZE:].cast("q")
+        self._array = None
+
+    @property
+    def sequence(self):
+        return self._seq[0]
+
+    def index(self, parameters):
+        '''
+        Returns the cell number of a set of parameters, None outside the grid.
+        '''
+        index = 0
+        for d, value in enumerate(parameters):
+            k = int(round((value - self.minimum[d]) / self.step[d]))
+            if k < 0 or k >= self.sizes[d]:
+                return None
+            index = index * self.sizes[d] + k
+        return index
+
+    def parameters_of(self, index):
+        '''
+        Returns the parameters of a cell number.
+        '''
+        values = []
+        for d in reversed(range(len(self.sizes))):
+            index, k = divmod(index, self.sizes[d])
+            values.insert(0, self.minimum[d] + k * self.step[d])
+        return tuple(values)
+
+    def snapshot(self, cells=(), retries=100):
+        '''
+        Returns a consistent copy (totals, counts) of the group totals and of
+        the counts of the given cell numbers, one per-group list per cell.
+
+        Only these counters are copied, so the read is short; while the writer
+        is in the middle of an update the reader backs off before retrying.
+        '''
+        n_groups = len(self.groups)
+        values = self.values
+        delay = 1e-5
+        for _ in range(retries):
+            before = self._seq[0]
+            if not before % 2:
+                totals = values[:n_groups].tolist()
+                counts = [values[n_groups * (c + 1):n_groups * (c + 2)].tolist() for c in cells]
+                if self._seq[0] == before:
+                    return totals, counts
+            time.sleep(delay)
+            delay = min(2 * delay, 0.01)
+        raise RuntimeError("Shared results kept changing during the snapshot")
+
+    def top_cells(self, group, n):
+        '''
+        Returns the numbers of the n cells with the highest rate of a group
+        (name or index), the highest count first on equal rates.
+
+        The live counters are ranked in place with numpy, without the seqlock:
+        they only grow, so the ranking is at most a few injections old. Read
+        the counts of the cells with snapshot().
+        '''
+        import numpy as np # type: ignore
+        if isinstance(group, str):
+            group = self.groups.index(group)
+        if self._array is None:
+            self._array = np.frombuffer(self.values, dtype=np.int64).reshape(-1, len(self.groups))[1:]
+        counts = self._array
+        cells = np.flatnonzero(counts[:, group])
+        if n <= 0 or not len(cells):
+            return []
+        hits = counts[cells, group]
+        rates = hits / counts[cells].sum(axis=1)
+        if len(cells) > n:
+            # partial selection, the ties of the n-th rate are kept for the sort
+            kth = np.partition(rates, len(rates) - n)[len(rates) - n]
+            keep = rates >= kth
+            cells, hits, rates = cells[keep], hits[keep], rates[keep]
+        order = np.lexsort((-hits, -rates))[:n]
+        return cells[order].tolist()
+
+    def close(self):
+        self._array = None # releases its export of the buffer
+        self._seq.release()
+        self.values.release()
+        self.shm.close()
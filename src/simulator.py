@@ -0,0 +1,212 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+Offline simulator of search strategies, replaying a recorded campaign.
+
+An exhaustive campaign log is the oracle: each visit of a cell draws an
+outcome from the outcomes recorded for that cell, and costs the mean time
+of that outcome taken from the timings.json written by ClockFI.py (a reset
+with its bitstream reload costs much more than a normal response). Each
+strategy walks the grid of the log with the point generators of
+GlitchController until it has found `goal` distinct success cells or spent
+its `budget` of injections.
+
+Logged values are read back from the scope and unevenly spaced, so the
+strategies draw positions in the sorted distinct values of each parameter
+of the log, never values that were not tested. A point of this grid
+missing from the log (a partial campaign) has no outcome to draw: it is
+counted apart as unknown, neither as an injection nor in the time.
+
+Runs of every (strategy, seed) pair are independent and spread over a
+multiprocessing pool, the oracle being sent once to each worker.
+"""
+
+import multiprocessing
+import random
+
+import src.glitch as glitch
+import src.merge as merge
+from src.planner import read_timings
+from src.regions import lattice_axes
+
+STRATEGIES = ["grid", "random", "halton", "lhs", "sobol"]
+DEFAULT_STRATEGIES = ["grid", "random", "halton", "lhs"] # sobol needs scipy
+DEFAULT_COST = 1.0 # cost of an outcome missing from the timings, in seconds
+
+
+def _key(parameters):
+    # grid points are built by adding steps, round away the float error
+    return tuple(round(v, 9) for v in parameters)
+
+
+def load_oracle(files, processes=None):
+    """
+    Builds the oracle of one or more log files.
+
+    Returns:
+    dict: {"groups": groups, "cells": {parameters: cumulated outcome
+          probabilities in group order} and "axes": sorted distinct values
+          of each parameter}.
+    """
+    results = merge.merge_logs(files, processes=processes)
+    cells = {}
+    for parameters, entry in results._result_dict.items():
+        if entry['total'] == 0:
+            continue
+        cumulated, acc = [], 0
+        for g in results.groups:
+            acc += entry[g]
+            cumulated.append(acc / entry['total'])
+        cells[_key(parameters)] = cumulated
+    if not cells:
+        raise ValueError("The logs hold no injection")
+    return {
+        "groups": list(results.groups),
+        "cells": cells,
+        "axes": lattice_axes(cells),
+    }
+
+
+def read_costs(file_path=None, overrides=None):
+    """
+    Returns the cost of each outcome in seconds.
+
+    Parameters:
+    file_path (str): timings.json written by Session.write_timings, or None.
+    overrides (dict): {event: seconds} replacing the recorded means.
+    """
+    return read_timings(file_path, overrides)[0]
+
+
+def strategy_points(strategy, axes, budget, seed):
+    """
+    Yields the parameter sets visited by a strategy, at most `budget`.
+
+    Points are positions in `axes`, the tested values of each parameter:
+    grid repeats the lexicographic sweep of glitch_values() until the budget
+    is spent, random draws positions uniformly, halton/lhs/sobol use
+    GlitchController.sample_values() over the positions.
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError("Invalid strategy {} (strategies are {})".format(strategy, STRATEGIES))
+
+    gc = glitch.GlitchController(groups=merge.GROUPS, parameters=merge.PARAMETERS[:len(axes)])
+    for name, values in zip(gc.parameters, axes):
+        gc.set_range(name, 0, len(values) - 1)
+    gc.set_global_step(1)
+
+    def values_of(point):
+        return tuple(values[int(round(k))] for values, k in zip(axes, point))
+
+    if strategy == "grid":
+        n = 0
+        while n < budget:
+            for point in gc.glitch_values():
+                yield values_of(point)
+                n += 1
+                if n >= budget:
+                    return
+    elif strategy == "random":
+        rng = random.Random(seed)
+        for _ in range(budget):
+            yield tuple(rng.choice(values) for values in axes)
+    else:
+        for point in gc.sample_values(budget, strategy, seed):
+            yield values_of(point)
+
+
+def simulate(oracle, costs, strategy, seed, goal, budget):
+    """
+    Runs one strategy against the oracle.
+
+    Returns:
+    dict: strategy, seed, injections, seconds, successes (distinct success
+          cells), reached (goal reached), unknown (visits of cells missing
+          from the oracle, not counted in injections and seconds).
+    """
+    groups = oracle["groups"]
+    cells = oracle["cells"]
+    success = groups.index("success")
+    # keyed by a string, the draws do not depend on the hash seed of the process
+    rng = random.Random(f"{strategy}:{seed}")
+
+    found = set()
+    injections = unknown = 0
+    seconds = 0.0
+    for parameters in strategy_points(strategy, oracle["axes"], budget, seed):
+        cumulated = cells.get(parameters)
+        if cumulated is None:
+            unknown += 1
+            continue
+        injections += 1
+        u = rng.random()
+        outcome = next((i for i, c in enumerate(cumulated) if u < c), len(groups) - 1)
+        seconds += costs.get(groups[outcome], DEFAULT_COST)
+        if outcome == success:
+            found.add(parameters)
+            if len(found) >= goal:
+                break
+
+    return {"strategy": strategy, "seed": seed, "injections": injections, "seconds": seconds,
+            "successes": len(found), "reached": len(found) >= goal, "unknown": unknown}
+
+
+_oracle = None
+_costs = None
+
+
+def _init_worker(oracle, costs):
+    global _oracle, _costs
+    _oracle, _costs = oracle, costs
+
+
+def _simulate_task(task):
+    strategy, seed, goal, budget = task
+    return simulate(_oracle, _costs, strategy, seed, goal, budget)
+
+
+def simulate_strategies(oracle, costs, strategies, seeds, goal, budget, processes=None):
+    """
+    Runs every (strategy, seed) pair, in parallel.
+
+    Returns:
+    list: Results of simulate, in the order of the tasks.
+    """
+    tasks = [(strategy, seed, goal, budget) for strategy in strategies for seed in seeds]
+    if processes == 1 or len(tasks) == 1:
+        _init_worker(oracle, costs)
+        return [_simulate_task(task) for task in tasks]
+    with multiprocessing.Pool(processes, initializer=_init_worker, initargs=(oracle, costs)) as pool:
+        return pool.map(_simulate_task, tasks)
+
+
+def summarize(runs):
+    """
+    Aggregates the runs by strategy.
+
+    Returns:
+    list: (strategy, runs, reached, median injections, mean injections,
+          median seconds, mean seconds, mean unknown visits), fastest median
+          time first.
+    """
+    by_strategy = {}
+    for run in runs:
+        by_strategy.setdefault(run["strategy"], []).append(run)
+
+    def median(values):
+        values = sorted(values)
+        n = len(values)
+        return values[n // 2] if n % 2 else (values[n // 2 - 1] + values[n // 2]) / 2
+
+    summary = []
+    for strategy, group in by_strategy.items():
+        injections = [r["injections"] for r in group]
+        seconds = [r["seconds"] for r in group]
+        summary.append((strategy, len(group), sum(r["reached"] for r in group),
+                        median(injections), sum(injections) / len(group),
+                        median(seconds), sum(seconds) / len(group),
+                        sum(r["unknown"] for r in group) / len(group)))
+    # strategies reaching the goal most often first, then the fastest
+    summary.sort(key=lambda s: (-s[2], s[5]))
+    return summary
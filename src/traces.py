@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+Storage of the ADC traces captured during a campaign.
+
+The scope captures a power trace on every injection. A TraceStore keeps
+the selected ones in a single preallocated .npy file opened as a memory map
+(np.load(path, mmap_mode='r') reads it back without loading it in RAM),
+and writes an index csv linking each trace to its log row::
+
+    <name>.npy         traces, shape (capacity, samples // decimate)
+    <name>_index.csv   trace,i_FI,event,width,offset,ext_offset
+
+Traces can be decimated on the fly (mean of `decimate` consecutive
+samples) and stored as float16, float32 or int16. int16 traces hold
+round(trace * INT16_SCALE): the ChipWhisperer returns values in
+[-0.5, 0.5), divide by INT16_SCALE to get them back.
+
+Rows of the .npy after the last index entry are unused (the file is sparse
+on most file systems, preallocating it costs no disk space).
+"""
+
+import csv
+import os
+
+MODES = ["all", "success", "every"]
+DTYPES = ["float16", "float32", "int16"]
+INT16_SCALE = 32768
+
+
+class TraceStore:
+    """Preallocated memory-mapped store of ADC traces.
+
+    Example::
+
+        traces = TraceStore("exp/traces", capacity=20000, samples=scope.adc.samples, mode="success")
+        event, data_read = session.inject(gc, glitch_settings, 's', '', 0)
+        traces.record(session, iteration_FI, event)
+        traces.close()
+
+    An existing store with the same shape is reopened and appended to, so a
+    resumed campaign keeps adding to it.
+    """
+
+    def __init__(self, path, capacity, samples, mode="all", every=1, decimate=1, dtype="float16"):
+        import numpy as np # type: ignore
+
+        if mode not in MODES:
+            raise ValueError("Invalid mode {} (modes are {})".format(mode, MODES))
+        if dtype not in DTYPES:
+            raise ValueError("Invalid dtype {} (dtypes are {})".format(dtype, DTYPES))
+
+        self.np = np
+        self.mode = mode
+        self.every = max(every, 1)
+        self.decimate = max(decimate, 1)
+        self.dtype = dtype
+        self.samples = samples // self.decimate
+
+        root = path[:-4] if path.endswith(".npy") else path
+        self.array_file = root + ".npy"
+        self.index_file = root + "_index.csv"
+
+        self.count = 0
+        if os.path.exists(self.array_file) and os.path.exists(self.index_file):
+            self.traces = np.lib.format.open_memmap(self.array_file, mode='r+')
+            if self.traces.shape[1] != self.samples or self.traces.dtype != np.dtype(dtype):
+                raise ValueError(f"{self.array_file} holds traces of another shape or type")
+            with open(self.index_file, newline='') as file:
+                self.count = sum(1 for _ in file) - 1
+        else:
+            self.traces = np.lib.format.open_memmap(self.array_file, mode='w+', dtype=dtype, shape=(capacity, self.samples))
+            with open(self.index_file, 'w', newline='') as file:
+                csv.writer(file).writerow(["trace", "i_FI", "event", "width", "offset", "ext_offset"])
+
+        self._index = open(self.index_file, 'a', newline='')
+        self._writer = csv.writer(self._index)
+        self._full_warned = False
+
+    @property
+    def capacity(self):
+        return self.traces.shape[0]
+
+    def wants(self, iteration_FI, event):
+        '''
+        Returns True if the trace of this injection is selected by the mode.
+        '''
+        if self.mode == "success":
+            return event == "success"
+        if self.mode == "every":
+            return iteration_FI % self.every == 0
+        return True
+
+    def convert(self, trace):
+        '''
+        Decimates a trace and converts it to the stored type.
+        '''
+        np = self.np
+        trace = np.asarray(trace, dtype=np.float32)[:self.samples * self.decimate]
+        if self.decimate > 1:
+            trace = trace.reshape(-1, self.decimate).mean(axis=1)
+        if self.dtype == "int16":
+            return np.clip(np.round(trace * INT16_SCALE), -32768, 32767).astype(np.int16)
+        return trace.astype(self.dtype)
+
+    def add(self, trace, iteration_FI, event, parameters):
+        '''
+        Stores one trace, returns its row or None if the store is full.
+        '''
+        if self.count >= self.capacity:
+            if not self._full_warned:
+                print(f"Trace store {self.array_file} full ({self.capacity} traces), next traces are dropped")
+                self._full_warned = True
+            return None
+        row = self.count
+        self.traces[row] = self.convert(trace)
+        self._writer.writerow([row, iteration_FI, event] + list(parameters))
+        self.count += 1
+        return row
+
+    def record(self, session, iteration_FI, event):
+        '''
+        Stores the trace of the last injection of a session if it is selected
+        and the scope triggered.
+        '''
+        if not session.captured or not self.wants(iteration_FI, event):
+            return None
+        trace = session.last_trace if session.last_trace is not None else session.scope.get_last_trace()
+        return self.add(trace, iteration_FI, event, session.last_parameters)
+
+    def close(self):
+        self.traces.flush()
+        self._index.close()
+        del self.traces
@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+Deadlines of the phases of an injection.
+
+Several phases of the injection loop can drag on: openFPGALoader in
+reboot_bitstream, the serial reads of the target, the USB reconnection of
+the scope. A Watchdog arms a SIGALRM timer for each phase, the handler
+raises Stall in the main thread when the deadline expires, and
+Session.inject() then escalates its recovery (flush, nRST, scope reconnect,
+bitstream reload) before moving on to the next point.
+
+Python runs a signal handler between bytecodes only: a call blocked in C
+code (a libusb or serial read without timeout) is not interrupted, Stall
+is raised once the call returns. The deadlines bound the phases made of
+calls that return, e.g. reads with their own timeout retried until the
+target answers, and the openFPGALoader subprocess, which gets the reload
+deadline as its timeout. A read hung forever in the driver still hangs
+the campaign.
+
+Phases and their default deadline in seconds::
+
+    reload    bitstream reload with openFPGALoader
+    capture   arm, call of the target function and capture of the trigger
+    read      response and data read from the target
+    recover   one recovery step
+"""
+
+import contextlib
+import signal
+import threading
+import time
+
+DEFAULT_DEADLINES = {"reload": 120.0, "capture": 10.0, "read": 10.0, "recover": 180.0}
+
+
+class Stall(Exception):
+    """A phase of the injection exceeded its deadline."""
+
+    def __init__(self, phase, deadline):
+        super().__init__(f"{phase} stalled for more than {deadline:g} s")
+        self.phase = phase
+        self.deadline = deadline
+
+
+def parse_deadlines(specs):
+    """
+    Parses "<phase>=<seconds>" deadlines.
+
+    Parameters:
+    specs (list): Deadlines, e.g. ["reload=60", "read=2"].
+
+    Returns:
+    dict: {phase: seconds}.
+    """
+    deadlines = {}
+    for spec in specs or []:
+        phase, _, seconds = spec.partition("=")
+        if phase not in DEFAULT_DEADLINES:
+            raise ValueError(f"Invalid phase {phase!r} (phases are {list(DEFAULT_DEADLINES)})")
+        deadlines[phase] = float(seconds)
+    return deadlines
+
+
+class Watchdog:
+    """Per-phase deadlines, see Session.watchdog.
+
+    Example::
+
+        session.watchdog = Watchdog({"read": 2.0})
+        with session.watchdog.phase("read"):
+            target.read(size_data)
+
+    Deadlines rely on SIGALRM: they are only enforced in the main thread of
+    a POSIX system, elsewhere phase() only keeps the deadline for the calls
+    having their own timeout (e.g. subprocess). Even there, a blocking C
+    call is not interrupted, the Stall comes when it returns.
+    """
+
+    def __init__(self, deadlines=None):
+        self.deadlines = dict(DEFAULT_DEADLINES, **(deadlines or {}))
+
+    def enabled(self):
+        return hasattr(signal, "setitimer") and threading.current_thread() is threading.main_thread()
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        '''
+        Raises Stall if the block lasts more than the deadline of the phase,
+        as soon as the running Python code gets control back. Phases can be
+        nested, the outer deadline keeps running.
+        '''
+        deadline = self.deadlines.get(name)
+        if not deadline or not self.enabled():
+            yield
+            return
+
+        def expire(signum, frame):
+            raise Stall(name, deadline)
+
+        start = time.monotonic()
+        previous = signal.signal(signal.SIGALRM, expire)
+        outer, _ = signal.setitimer(signal.ITIMER_REAL, deadline)
+        try:
+            yield
+        finally:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous)
+            if outer > 0:
+                # re-arm the deadline of the enclosing phase, fire now if it passed
+                signal.setitimer(signal.ITIMER_REAL, max(outer - (time.monotonic() - start), 1e-3))
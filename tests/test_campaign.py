@@ -0,0 +1,67 @@
+import pytest
+
+import src.campaign as campaign
+
+CAMPAIGN = """
+[DEFAULT]
+repeat = 3
+
+[setup]
+name_board = arty
+sn_chipwhisperer = 5020
+ftdi_FPGA = 2103
+bitstream_file = top.bit
+freq_load_bit = 6000000
+deadlines = reload=60 read=2
+
+[sweep:first]
+min_width = -10
+max_width = 10
+step = 0.5
+
+[sweep:second]
+repeat = 10
+sampling = halton
+payload_dict = yes
+"""
+
+
+def write(tmp_path, text):
+    path = tmp_path / "campaign.ini"
+    path.write_text(text)
+    return str(path)
+
+
+def test_read_campaign(tmp_path):
+    setup, sweeps = campaign.read_campaign(write(tmp_path, CAMPAIGN))
+
+    assert setup["name_board"] == "arty"
+    assert setup["freq_load_bit"] == 6000000
+    assert setup["watchdog"] is False
+    assert setup["deadlines"] == ["reload=60", "read=2"]
+
+    assert [name for name, _ in sweeps] == ["first", "second"]
+    first, second = sweeps[0][1], sweeps[1][1]
+    assert (first["min_width"], first["max_width"], first["step"]) == (-10, 10, 0.5)
+    assert first["repeat"] == 3
+    assert first["max_ext_offset"] == 200
+    assert second["repeat"] == 10
+    assert second["step"] == 1.0
+    assert second["sampling"] == "halton"
+    assert second["payload_dict"] is True
+
+
+def test_missing_sweeps(tmp_path):
+    text = CAMPAIGN[:CAMPAIGN.index("[sweep:first]")]
+    with pytest.raises(ValueError, match="no \\[sweep"):
+        campaign.read_campaign(write(tmp_path, text))
+
+
+def test_missing_setup_value(tmp_path):
+    with pytest.raises(ValueError, match="bitstream_file"):
+        campaign.read_campaign(write(tmp_path, CAMPAIGN.replace("bitstream_file = top.bit", "")))
+
+
+def test_invalid_sampling(tmp_path):
+    with pytest.raises(ValueError, match="sweep:second.*halton2"):
+        campaign.read_campaign(write(tmp_path, CAMPAIGN.replace("sampling = halton", "sampling = halton2")))
@@ -0,0 +1,82 @@
+import pytest
+
+import src.glitch as glitch
+from src.checkpoint import Checkpointer, restore
+
+GROUPS = ["success", "corrupted", "reset", "normal"]
+IDENTITY = {"min_width": -2, "max_width": 2, "step": 1.0, "functions": ["s", "t:12"], "quantum": None}
+
+
+def controller():
+    gc = glitch.GlitchController(groups=GROUPS, parameters=["width", "offset", "ext_offset"])
+    gc.set_range("width", -2, 2)
+    gc.set_range("offset", 0, 2)
+    gc.set_range("ext_offset", 0, 1)
+    gc.set_global_step(1)
+    return gc
+
+
+def outcome(i):
+    return GROUPS[i * 7 % 5 % 4]
+
+
+def run(gc, checkpoint, start=0, stop=None, counters=None):
+    # sweep with a checkpoint every 8 injections, stopped (crash) after `stop`
+    counters = dict(counters or {g: 0 for g in GROUPS})
+    for i, settings in enumerate(gc.glitch_values(clear=start == 0), 1):
+        if i <= start:
+            continue
+        gc.add(outcome(i), [v + 0.25 for v in settings]) # parameters read back from the scope
+        counters[outcome(i)] += 1
+        if i % 8 == 0:
+            checkpoint.update(gc, i, counters, force=True)
+        if i == stop:
+            return counters
+    checkpoint.update(gc, i, counters, force=True)
+    return counters
+
+
+def test_resume_after_crash(tmp_path):
+    reference = controller()
+    run(reference, Checkpointer(str(tmp_path / "reference.ckpt")))
+
+    path = str(tmp_path / "campaign.ckpt")
+    gc = controller()
+    run(gc, Checkpointer(path, identity=IDENTITY), stop=21) # last checkpoint after 16, 5 rows after it
+
+    checkpoint = Checkpointer(path, identity=IDENTITY)
+    state = checkpoint.load()
+    assert state["iteration_FI"] == 16
+    assert state["identity"] == IDENTITY
+    resumed = controller()
+    counters = restore(resumed, state)
+    assert sum(counters.values()) == 16 == sum(resumed.group_counts)
+    counters = run(resumed, checkpoint, start=state["iteration_FI"], counters=counters)
+
+    assert resumed.group_counts == reference.group_counts
+    assert resumed.results._result_dict == reference.results._result_dict
+    assert sum(counters.values()) == 30
+
+
+def test_goldens_round_trip(tmp_path):
+    class FakeSession:
+        golden = "00112233aabbccdd"
+        goldens = {0: "0011223344556677", 1: "8899aabbccddeeff"}
+
+    path = str(tmp_path / "campaign.ckpt")
+    Checkpointer(path).update(controller(), 3, {g: 0 for g in GROUPS}, FakeSession(), force=True)
+    session = FakeSession()
+    session.golden, session.goldens = None, {}
+    restore(controller(), Checkpointer(path).load(), session)
+    assert (session.golden, session.goldens) == (FakeSession.golden, FakeSession.goldens)
+
+
+def test_refuses_other_campaign_and_pickles(tmp_path):
+    path = tmp_path / "campaign.ckpt"
+    Checkpointer(str(path), identity=IDENTITY).update(controller(), 1, {}, force=True)
+    with pytest.raises(ValueError, match="step"):
+        Checkpointer(str(path), identity=dict(IDENTITY, step=0.5)).load()
+    path.write_bytes(b"\x80\x04\x95 pickled")
+    with pytest.raises(ValueError, match="not a checkpoint"):
+        Checkpointer(str(path)).load()
+    assert Checkpointer(str(tmp_path / "missing.ckpt")).load() is None
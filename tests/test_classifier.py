@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+from src.classifier import TraceClassifier
+
+
+def traces(n, glitch=False, seed=0):
+    # synthetic power traces: a fixed program pattern plus noise, a glitch
+    # replaces the end of the pattern (the target runs other instructions)
+    rng = np.random.default_rng(seed)
+    t = np.linspace(0, 8 * np.pi, 200)
+    pattern = np.sin(t) + 0.5 * np.sin(3 * t)
+    out = pattern + rng.normal(0, 0.05, (n, len(t)))
+    if glitch:
+        out[:, 120:] = rng.normal(0, 1.0, (n, 80))
+    return out
+
+
+def test_golden_and_glitched_are_separated(capsys):
+    classifier = TraceClassifier("shadow", margin=3.0)
+    classifier.add_template(None, traces(10))
+    assert [classifier.label(trace) for trace in traces(20, seed=1)] == ["normal"] * 20
+    assert [classifier.label(trace) for trace in traces(20, glitch=True, seed=2)] == ["candidate"] * 20
+
+    classifier.reset_distance = 0.9
+    assert classifier.label(-traces(1, seed=3)[0]) == "reset" # anti-correlated
+    assert classifier.label(traces(1, glitch=True, seed=4)[0]) == "candidate"
+
+
+def test_threshold_edges(capsys):
+    classifier = TraceClassifier("shadow", reset_distance=1.5)
+    classifier.add_template("f", traces(5))
+    trace = traces(1, glitch=True, seed=1)[0]
+    d = classifier.distance(trace, "f")
+    template, _ = classifier.templates["f"]
+
+    classifier.templates["f"] = (template, d)
+    assert classifier.label(trace, "f") == "normal" # the normal distance is inclusive
+    classifier.templates["f"] = (template, np.nextafter(d, 0))
+    assert classifier.label(trace, "f") == "candidate"
+    classifier.reset_distance = d
+    assert classifier.label(trace, "f") == "reset" # and so is the reset distance
+    classifier.reset_distance = np.nextafter(d, 2)
+    assert classifier.label(trace, "f") == "candidate"
+
+
+def test_threshold_from_margin_and_min_distance(capsys):
+    golden = traces(5)
+    classifier = TraceClassifier(margin=2.0)
+    classifier.add_template(None, golden)
+    largest = max(classifier.distance(trace) for trace in golden)
+    assert classifier.templates[None][1] == pytest.approx(2.0 * largest)
+
+    classifier = TraceClassifier(min_distance=0.01)
+    classifier.add_template(None, np.tile(golden[0], (3, 1))) # identical golden traces
+    assert classifier.templates[None][1] == 0.01
+
+
+def test_shortcut_audits_and_agreement(capsys):
+    classifier = TraceClassifier("shortcut", audit_every=3)
+    classifier.add_template(None, traces(10))
+    normal, glitched = traces(1, seed=1)[0], traces(1, glitch=True, seed=2)[0]
+    assert [classifier.predict(normal) for _ in range(4)] == \
+        [("normal", False), ("normal", False), ("normal", True), ("normal", False)]
+    assert classifier.predict(glitched) == ("candidate", True)
+    assert classifier.shortcuts == 3
+
+    assert classifier.agreement() is None
+    classifier.check("normal", "normal")
+    classifier.check("normal", "success")
+    classifier.check("candidate", "success")
+    assert classifier.agreement() == 0.5
+    events, rows = classifier.report()
+    assert events == ["normal", "success"]
+    assert rows == [["normal", 1, 1, 2], ["reset", 0, 0, 0], ["candidate", 0, 1, 1]]
@@ -0,0 +1,63 @@
+import math
+
+import numpy as np
+import pytest
+
+import src.compare as compare
+import src.glitch as glitch
+from src.merge import GROUPS, PARAMETERS
+
+
+def fisher_reference(k_a, n_a, k_b, n_b):
+    events, total = k_a + k_b, n_a + n_b
+
+    def pmf(x):
+        return math.comb(n_a, x) * math.comb(n_b, events - x) / math.comb(total, events)
+
+    observed = pmf(k_a)
+    support = range(max(0, events - n_b), min(events, n_a) + 1)
+    return min(1.0, sum(pmf(x) for x in support if pmf(x) <= observed * (1 + 1e-7)))
+
+
+@pytest.mark.parametrize("k_a, n_a, k_b, n_b", [
+    (0, 1, 1, 1), (1, 3, 3, 3), (0, 10, 7, 10), (2, 5, 2, 5), (5, 40, 0, 3), (30, 1000, 60, 1100),
+])
+def test_fisher_exact_test(k_a, n_a, k_b, n_b):
+    rate_a, rate_b, p = compare.fisher_exact_test(k_a, n_a, k_b, n_b)
+    assert float(p) == pytest.approx(fisher_reference(k_a, n_a, k_b, n_b), rel=1e-9)
+    assert float(rate_a) == k_a / n_a
+    assert float(rate_b) == k_b / n_b
+
+
+def test_fisher_exact_test_vectorized_in_chunks():
+    rng = np.random.default_rng(0)
+    n_a = rng.integers(0, 12, 300)
+    n_b = rng.integers(0, 12, 300)
+    k_a = rng.integers(0, n_a + 1)
+    k_b = rng.integers(0, n_b + 1)
+    _, _, p = compare.fisher_exact_test(k_a, n_a, k_b, n_b, max_elements=64)
+    expected = [fisher_reference(*map(int, v)) if v[1] and v[3] else 1.0 for v in zip(k_a, n_a, k_b, n_b)]
+    assert p == pytest.approx(expected, rel=1e-9)
+
+
+def test_benjamini_hochberg():
+    q = compare.benjamini_hochberg([0.01, 0.04, 0.03, 0.5])
+    assert q == pytest.approx([0.04, 0.04 * 4 / 3, 0.04 * 4 / 3, 0.5])
+
+
+def results_of(cells):
+    results = glitch.GlitchResults(groups=GROUPS, parameters=PARAMETERS)
+    for parameters, counts in cells.items():
+        results.add_counts(parameters, counts)
+    return results
+
+
+def test_compare():
+    a = results_of({(0, 0, 0): [0, 0, 0, 40], (1, 0, 0): [5, 0, 0, 35], (2, 0, 0): [1, 0, 0, 0]})
+    b = results_of({(0, 0, 0): [30, 0, 0, 10], (1, 0, 0): [5, 0, 0, 35], (3, 0, 0): [1, 0, 0, 0]})
+    report = compare.compare(a, b, groups=["success"])
+    assert (report["tested"], report["only_a"], report["only_b"]) == (2, 1, 1)
+    cells = report["cells"]["success"]
+    assert [c[0] for c in cells] == [(0, 0, 0)]
+    assert cells[0][5] == pytest.approx(0.75)
+    assert report["overall"]["success"][2] == pytest.approx(0.375)
@@ -0,0 +1,126 @@
+import pytest
+
+import src.glitch as glitch
+
+GROUPS = ["success", "corrupted", "reset", "normal"]
+PARAMETERS = ["width", "offset", "ext_offset"]
+
+
+def controller(width=(0, 4), offset=(0, 2), ext_offset=(0, 1)):
+    gc = glitch.GlitchController(groups=GROUPS, parameters=PARAMETERS)
+    gc.set_range("width", *width)
+    gc.set_range("offset", *offset)
+    gc.set_range("ext_offset", *ext_offset)
+    gc.set_global_step(1)
+    return gc
+
+
+def test_unique_values_with_model():
+    gc = controller()
+    gc.set_effective("width", lambda v: v // 2)
+    assert gc.axis_values("width") == [0, 1, 2, 3, 4]
+    assert gc.axis_values("width", unique=True) == [0, 2, 4]
+    assert gc.num_glitch_values() == 30
+    assert gc.num_glitch_values(unique=True) == 18
+    points = [tuple(p) for p in gc.unique_values()]
+    assert len(points) == 18
+    assert points[:2] == [(0, 0, 0), (0, 0, 1)]
+
+
+def test_unique_values_with_probed_mapping():
+    gc = controller()
+    gc.set_effective("offset", {0: -0.39, 1: 0.78, 2: 0.78})
+    assert gc.axis_values("offset", unique=True) == [0, 1]
+
+
+def test_unmapped_value_raises():
+    gc = controller()
+    gc.set_effective("offset", {0: -0.39, 1: 0.78})
+    with pytest.raises(KeyError):
+        gc.axis_values("offset", unique=True)
+
+
+def results_of(cells):
+    results = glitch.GlitchResults(groups=GROUPS, parameters=PARAMETERS)
+    for parameters, counts in cells.items():
+        results.add_counts(parameters, counts)
+    return results
+
+
+def counts_of(results):
+    return {p: [entry[k] for k in GROUPS] for p, entry in results._result_dict.items()}
+
+
+def test_results_merge():
+    a = results_of({(0, 0, 0): [1, 0, 2, 0], (1, 0, 0): [0, 0, 0, 3]})
+    b = results_of({(1, 0, 0): [1, 1, 0, 0], (2.5, 0, 0): [0, 0, 1, 0]})
+    total = a + b
+    assert counts_of(total) == {(0, 0, 0): [1, 0, 2, 0], (1, 0, 0): [1, 1, 0, 3], (2.5, 0, 0): [0, 0, 1, 0]}
+    assert total._result_dict[(1, 0, 0)]["total"] == 5
+    assert counts_of(a) == {(0, 0, 0): [1, 0, 2, 0], (1, 0, 0): [0, 0, 0, 3]} # + leaves a unchanged
+    assert counts_of(b + a) == counts_of(total)
+    a += b
+    assert counts_of(a) == counts_of(total)
+
+
+def test_results_merge_mismatch():
+    a = results_of({})
+    with pytest.raises(ValueError):
+        a.merge(glitch.GlitchResults(groups=GROUPS, parameters=["width", "offset"]))
+    with pytest.raises(ValueError):
+        a.merge(glitch.GlitchResults(groups=GROUPS[:3], parameters=PARAMETERS))
+
+
+def test_results_to_bytes_round_trip():
+    import pickle
+    results = results_of({(-1.953, 0.5, 10): [1, 0, 2, 0], (1.172, -3.5, 11): [0, 7, 0, 1 << 40]})
+    for loaded in (glitch.GlitchResults.from_bytes(results.to_bytes()), pickle.loads(pickle.dumps(results))):
+        assert (loaded.groups, loaded.parameters) == (GROUPS, PARAMETERS)
+        assert counts_of(loaded) == counts_of(results)
+    assert counts_of(glitch.GlitchResults.from_bytes(results_of({}).to_bytes())) == {}
+
+
+def test_controller_merge():
+    gc = controller()
+    gc.add("reset", (0, 0, 0))
+    part = gc.results.partial()
+    part.add("success", (0, 0, 0))
+    part.add("success", (1, 0, 0))
+    gc.merge(part)
+    assert gc.group_counts == [2, 0, 1, 0]
+    assert counts_of(gc.results) == {(0, 0, 0): [1, 0, 1, 0], (1, 0, 0): [1, 0, 0, 0]}
+
+
+@pytest.mark.parametrize("method", ["halton", "lhs"])
+def test_sample_values_on_grid(method):
+    gc = controller(width=(-2, 2), offset=(0, 3), ext_offset=(5, 9))
+    gc.set_step("width", 0.5)
+    points = [tuple(p) for p in gc.sample_values(40, method=method, seed=3)]
+    assert len(points) == 40
+    for point in points:
+        for i, v in enumerate(point):
+            assert gc.parameter_min[i] <= v <= gc.parameter_max[i]
+            assert ((v - gc.parameter_min[i]) / gc.steps[i][0]).is_integer()
+    assert len(set(points)) > 20
+
+
+@pytest.mark.parametrize("method", ["halton", "lhs"])
+def test_sample_values_seed_and_resume(method):
+    gc = controller()
+    points = [tuple(p) for p in gc.sample_values(20, method=method, seed=1)]
+    assert [tuple(p) for p in gc.sample_values(20, method=method, seed=1)] == points
+    assert [tuple(p) for p in gc.sample_values(20, method=method, seed=2)] != points
+    assert [tuple(p) for p in gc.sample_values(20, method=method, seed=1, start=12)] == points[12:]
+
+
+def test_lhs_covers_each_row():
+    gc = controller(width=(0, 9), offset=(0, 9), ext_offset=(0, 9))
+    points = [tuple(p) for p in gc.sample_values(10, method="lhs", seed=5)]
+    for i in range(3):
+        assert sorted(p[i] for p in points) == list(range(10))
+
+
+def test_sample_values_invalid_method():
+    gc = controller()
+    with pytest.raises(ValueError):
+        next(gc.sample_values(10, method="grid"))
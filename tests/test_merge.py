@@ -0,0 +1,46 @@
+import src.merge as merge
+
+LOGS = [
+    "0,success,1.0,2.0,10,aa\n1,reset,1.0,2.0,10,\n2,stall,1.0,2.0,10,\n3,normal,-1.5,2.0,11,\n",
+    "i_FI,event,width,offset,ext_offset,data\n0,success,1.0,2.0,10,a,b\n1,reset,-1.5,2.0,11,x\n2,normal,3.0,0.5,12\n",
+]
+
+EXPECTED = {
+    (1.0, 2.0, 10.0): {"success": 2, "reset": 1},
+    (-1.5, 2.0, 11.0): {"reset": 1, "normal": 1},
+    (3.0, 0.5, 12.0): {"normal": 1},
+}
+
+
+def write_logs(tmp_path):
+    files = []
+    for i, text in enumerate(LOGS):
+        path = tmp_path / f"log_{i}.csv"
+        path.write_text(text)
+        files.append(str(path))
+    return files
+
+
+def counts_of(results):
+    return {p: {k: entry[k] for k in results.groups if entry[k]} for p, entry in results._result_dict.items()}
+
+
+def test_merge_logs(tmp_path):
+    files = write_logs(tmp_path)
+    assert counts_of(merge.merge_logs(files, processes=1)) == EXPECTED
+    assert counts_of(merge.merge_logs(files, processes=2)) == EXPECTED
+
+
+def test_merge_logs_filters(tmp_path):
+    files = write_logs(tmp_path)
+    results = merge.merge_logs(files, events=["success"], ranges={"width": (0, 2)}, processes=1)
+    assert counts_of(results) == {(1.0, 2.0, 10.0): {"success": 2}}
+
+
+def test_counts_round_trip(tmp_path):
+    results = merge.merge_logs(write_logs(tmp_path), processes=1)
+    path = str(tmp_path / "counts.csv")
+    merge.write_counts(results, path)
+    loaded = merge.read_counts(path)
+    assert (loaded.groups, loaded.parameters) == (merge.GROUPS, merge.PARAMETERS)
+    assert counts_of(loaded) == EXPECTED
@@ -0,0 +1,73 @@
+import src.glitch as glitch
+from src.metrics import MetricsExporter
+
+GROUPS = ["success", "corrupted", "reset", "normal"]
+
+
+def controller():
+    return glitch.GlitchController(groups=GROUPS, parameters=["width", "offset", "ext_offset"])
+
+
+def samples_of(path):
+    samples = {}
+    for line in open(path).read().splitlines():
+        if not line.startswith("#"):
+            name, value = line.rsplit(" ", 1)
+            samples[name] = float(value)
+    return samples
+
+
+def test_burst_counts_every_call(tmp_path):
+    path = str(tmp_path / "clockfi.prom")
+    gc = controller()
+    metrics = MetricsExporter(path, interval=1e9)
+    for _ in range(3):
+        gc.add("normal", (0, 0, 0))
+    metrics.update(gc, 1, injections=3) # one burst of 3 calls
+    gc.add("reset", (0, 0, 0))
+    metrics.update(gc, 2)
+    metrics.update(gc, 2, force=True)
+    samples = samples_of(path)
+    assert samples["clockfi_injections_total"] == 4
+    assert sum(samples[f'clockfi_outcomes_total{{group="{g}"}}'] for g in GROUPS) == 4
+
+
+def parse(path):
+    '''Parses the exposition format: {(name, ((label, value), ...)): value}, checking the # EOF terminator.'''
+    lines = open(path).read().split("\n")
+    assert lines[-2:] == ["# EOF", ""]
+    samples = {}
+    for line in lines[:-2]:
+        assert "# EOF" not in line
+        if line.startswith("#"):
+            continue
+        name, rest = line.split("{", 1) if "{" in line else (line.split(" ")[0], "} " + line.split(" ")[1])
+        labels = []
+        while not rest.startswith("}"):
+            key, rest = rest.split('="', 1)
+            value, i = "", 0
+            while rest[i] != '"':
+                if rest[i] == "\\":
+                    i += 1
+                    value += {"\\": "\\", '"': '"', "n": "\n"}[rest[i]]
+                else:
+                    value += rest[i]
+                i += 1
+            labels.append((key, value))
+            rest = rest[i + 1:].lstrip(",")
+        samples[(name, tuple(labels))] = float(rest[1:])
+    return samples
+
+
+def test_label_values_are_escaped(tmp_path):
+    path = str(tmp_path / "clockfi.prom")
+    campaign = 'arty "A"\\run\n2'
+    groups = ['ok "1"', "back\\slash", "two\nlines", "normal"]
+    gc = glitch.GlitchController(groups=groups, parameters=["width", "offset", "ext_offset"])
+    gc.add("two\nlines", (0, 0, 0))
+    metrics = MetricsExporter(path, interval=1e9, campaign=campaign)
+    metrics.update(gc, 1)
+    samples = parse(path)
+    assert samples[("clockfi_injections_total", (("campaign", campaign),))] == 1
+    for g in groups:
+        assert samples[("clockfi_outcomes_total", (("campaign", campaign), ("group", g)))] == (g == "two\nlines")
@@ -0,0 +1,40 @@
+import pytest
+
+import src.cw_toolkit as tk
+
+
+def test_encode_decode(tmp_path):
+    log = str(tmp_path / "log.csv")
+    payloads = tk.PayloadDictionary(log)
+    assert payloads.encode("ok\x00") == 0
+    assert payloads.encode("garbage, with comma") == 1
+    assert payloads.encode("ok") == 0 # same printable payload
+    assert payloads.decode(0) == "ok"
+    assert payloads.decode("1") == "garbage, with comma"
+
+    # reloaded to resume the log: same IDs, new payloads continue the numbering
+    resumed = tk.PayloadDictionary(log)
+    assert resumed.decode(1) == "garbage, with comma"
+    assert resumed.encode("ok") == 0
+    assert resumed.encode("") == 2
+    assert [row[0] for row in tk.read_payloads(tk.dictionary_file(log))] == [0, 1, 2]
+
+
+def test_unknown_payload(tmp_path):
+    payloads = tk.PayloadDictionary(str(tmp_path / "log.csv"))
+    with pytest.raises(KeyError):
+        payloads.decode(0)
+    payloads.encode("ok")
+    with pytest.raises(KeyError):
+        payloads.decode(1)
+
+
+def test_log_file_with_payloads(tmp_path):
+    log = str(tmp_path / "log.csv")
+    payloads = tk.PayloadDictionary(log)
+    tk.log_file(log, 1, "normal", 1.0, 2.0, 3, "ok", payloads)
+    tk.log_file(log, 2, "success", 1.0, 2.0, 3, "loop", payloads)
+    tk.log_file(log, 3, "normal", 1.0, 2.0, 3, "ok", payloads)
+    rows = list(tk.read_log(log))
+    assert [row[5] for row in rows] == ["0", "1", "0"]
+    assert [payloads.decode(row[5]) for row in rows] == ["ok", "loop", "ok"]
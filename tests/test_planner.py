@@ -0,0 +1,73 @@
+import json
+
+import pytest
+
+import src.glitch as glitch
+import src.planner as planner
+
+GROUPS = ["success", "corrupted", "reset", "normal"]
+
+
+def controller(width=(0, 9), offset=(0, 9), ext_offset=(0, 99)):
+    gc = glitch.GlitchController(groups=GROUPS, parameters=["width", "offset", "ext_offset"])
+    gc.set_range("width", *width)
+    gc.set_range("offset", *offset)
+    gc.set_range("ext_offset", *ext_offset)
+    gc.set_global_step(1)
+    return gc
+
+
+def test_cost_with_mix(tmp_path):
+    path = tmp_path / "timings.json"
+    path.write_text(json.dumps({"normal": {"count": 90, "seconds": 9.0, "mean": 0.1},
+                                "reset": {"count": 10, "seconds": 30.0, "mean": 3.0}}))
+    costs, mix = planner.read_timings(str(path), {"reset": 2.0})
+    assert costs == {"normal": 0.1, "reset": 2.0}
+    assert mix == {"normal": 0.9, "reset": 0.1}
+    assert planner.seconds_per_injection(costs, mix) == pytest.approx(0.29)
+
+
+def test_cost_without_mix():
+    assert planner.seconds_per_injection({"normal": 0.1, "reset": 3.0}) == 0.1
+    assert planner.seconds_per_injection({"normal": 0.1, "reset": 3.0}, {"success": 1.0}) == 0.1
+    assert planner.seconds_per_injection({"reset": 3.0}) is None
+    assert planner.seconds_per_injection({}) is None
+
+
+def test_suggest_fits_the_budget():
+    gc = controller()
+    suggestions = planner.suggest(gc, 0.5, 2000)
+    assert [options for options, _, _ in suggestions] == ["--step 2", "--max-ext-offset 39", "--sampling halton --budget 4000"]
+    for _, n, seconds in suggestions:
+        assert n <= 4000
+        assert seconds == n * 0.5
+
+
+def test_suggest_with_dedup_and_burst():
+    gc = controller()
+    gc.set_effective("width", lambda v: v // 2)
+    gc.set_effective("offset", lambda v: v // 2)
+    # 5 x 5 x 100 points, bursts of 2
+    options, n, seconds = planner.suggest(gc, 0.5, 2500, unique=True, burst=2)[1]
+    assert (options, n) == ("--max-ext-offset 99", 5000)
+    options, n, _ = planner.suggest(gc, 0.5, 1000, unique=True, burst=2)[1]
+    assert (options, n) == ("--max-ext-offset 39", 2000)
+    # sampling ignores --dedup: the budget is in points of the whole grid
+    assert planner.suggest(gc, 0.5, 1000, unique=True, burst=2)[2][:2] == ("--sampling halton --budget 1000", 2000)
+
+
+def test_suggest_keeps_a_step_per_range():
+    gc = controller(width=(0, 1), offset=(0, 9), ext_offset=(0, 99))
+    # 2 x 10 x 100 points, 30 fit: the step would have to exceed the width range
+    # and the ext_offset range would be a single value
+    assert [options for options, _, _ in planner.suggest(gc, 1.0, 30)] == ["--sampling halton --budget 30"]
+    assert planner.suggest(gc, 1.0, 40)[0][:2] == ("--max-ext-offset 1", 40)
+    assert planner.suggest(gc, 1.0, 0.5) == []
+
+
+def test_eta_tracker():
+    eta = planner.EtaTracker(total=100, done=10, per_injection=2.0)
+    assert eta.update(10) == 180.0
+    assert planner.EtaTracker(total=100).update(0) is None
+    assert planner.format_duration(90061) == "1 d 01:01:01"
+    assert planner.format_duration(None) == "-"
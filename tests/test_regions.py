@@ -0,0 +1,35 @@
+import src.regions as regions
+
+# widths read back from a CW-Lite: quantized and unevenly spaced
+WIDTHS = [-1.953, -1.172, 0, 1.172, 1.953]
+
+
+def test_uneven_axis_is_one_region():
+    cells = {(w, o, 10): (1, 2) for w in WIDTHS for o in (3.5, 4.297)}
+    found = regions.find_regions(cells)
+    assert len(found) == 1
+    assert found[0]["size"] == 10
+    assert found[0]["count"] == 10
+
+
+def test_gap_splits_regions():
+    cells = {(w, 0, 10): (1, 1) for w in WIDTHS}
+    cells[(0, 0, 10)] = (0, 3)
+    found = regions.find_regions(cells)
+    assert [r["size"] for r in found] == [2, 2]
+    assert {r["min"][0] for r in found} == {-1.953, 1.172}
+
+
+def test_min_rate_and_representative():
+    cells = {(w, 0, 10): (n, 10) for w, n in zip(WIDTHS, [1, 5, 9, 5, 1])}
+    found = regions.find_regions(cells, min_rate=0.2)
+    assert len(found) == 1
+    region = found[0]
+    assert region["cells"] == [(-1.172, 0, 10), (0, 0, 10), (1.172, 0, 10)]
+    assert region["representative"] == (0, 0, 10)
+    assert region["peak_rate"] == 0.9
+
+
+def test_lattice_axes():
+    cells = {(1, 5): (0, 1), (0, 5): (0, 1), (1, 2): (0, 1)}
+    assert regions.lattice_axes(cells) == [[0, 1], [2, 5]]
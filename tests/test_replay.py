@@ -0,0 +1,56 @@
+import pytest
+
+import src.replay as replay
+
+ROWS = [
+    (1, "success", 1.0, 2.0, 10.0, ""),
+    (2, "normal", 1.0, 2.0, 10.0, ""),
+    (3, "success", 0.0, 2.0, 11.0, ""),
+    (4, "stall", 0.0, 2.0, 11.0, ""), # no outcome, not counted
+    (5, "success", 0.0, 2.0, 10.0, ""),
+    (6, "success", 0.0, 2.0, 10.0, ""),
+    (7, "reset", 3.0, 1.0, 10.0, ""),
+]
+
+
+def test_count_tuples():
+    counts = replay.count_tuples(ROWS)
+    assert counts == {(1.0, 2.0, 10.0): [1, 2], (0.0, 2.0, 11.0): [1, 1], (0.0, 2.0, 10.0): [2, 2], (3.0, 1.0, 10.0): [0, 1]}
+    assert list(counts)[0] == (1.0, 2.0, 10.0)
+
+
+def test_plan_orders():
+    counts = replay.count_tuples(ROWS)
+    by_settings = replay.plan_replay(counts)
+    assert [p for p, _, _ in by_settings] == [(0.0, 2.0, 10.0), (0.0, 2.0, 11.0), (1.0, 2.0, 10.0)]
+    by_weight = replay.plan_replay(counts, order="weight")
+    assert by_weight[0] == ((0.0, 2.0, 10.0), 2, 1.0)
+    # same weight: higher rate first
+    assert [p for p, _, _ in by_weight[1:]] == [(0.0, 2.0, 11.0), (1.0, 2.0, 10.0)]
+    by_log = replay.plan_replay(counts, order="log")
+    assert [p for p, _, _ in by_log] == [(1.0, 2.0, 10.0), (0.0, 2.0, 11.0), (0.0, 2.0, 10.0)]
+
+
+def test_plan_filters():
+    counts = replay.count_tuples(ROWS)
+    assert [p for p, _, _ in replay.plan_replay(counts, min_count=2)] == [(0.0, 2.0, 10.0)]
+    assert len(replay.plan_replay(counts, min_rate=0.9)) == 2
+    assert len(replay.plan_replay(counts, max_tuples=1)) == 1
+
+
+def test_invalid_order():
+    with pytest.raises(ValueError):
+        replay.plan_replay({}, order="random")
+
+
+def test_plan_trials():
+    plan = [((0, 0, 0), 10, 1.0), ((1, 0, 0), 5, 0.5), ((2, 0, 0), 1, 0.1)]
+    assert replay.plan_trials(plan, 4) == [4, 4, 4]
+    assert replay.plan_trials(plan, 4, weighted=True) == [4, 2, 1]
+    assert replay.plan_trials([], 4, weighted=True) == []
+
+
+def test_plan_regions():
+    counts = {(w, 0.0, 10.0): [n, 4] for w, n in zip([-2.0, -1.0, 0.0, 1.0, 2.0], [1, 3, 0, 2, 2])}
+    plan = replay.plan_regions(counts)
+    assert [(p, weight) for p, weight, _ in plan] == [((-1.0, 0.0, 10.0), 4), ((1.0, 0.0, 10.0), 4)]
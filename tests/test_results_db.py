@@ -0,0 +1,55 @@
+import sqlite3
+
+import src.cw_toolkit as tk
+from src.results_db import ResultsDB
+
+
+def test_wal_and_batched_inserts(tmp_path):
+    path = str(tmp_path / "results.db")
+    db = ResultsDB(path, "arty", batch_size=3)
+    assert db.conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    db.add(1, "success", 1.0, 2.0, 3.0, "a")
+    db.add(2, "normal", 1.0, 2.0, 3.0, "b")
+    other = sqlite3.connect(path) # a reader does not see the buffered rows
+    assert other.execute("SELECT COUNT(*) FROM injections").fetchone()[0] == 0
+    db.add(3, "reset", 1.0, 2.0, 3.0)
+    assert other.execute("SELECT COUNT(*) FROM injections").fetchone()[0] == 3
+    assert other.execute("SELECT i_fi, event, data FROM injections ORDER BY id").fetchall() == \
+        [(1, "success", "a"), (2, "normal", "b"), (3, "reset", None)]
+    other.close()
+    db.close()
+
+
+def test_select(tmp_path):
+    db = ResultsDB(str(tmp_path / "results.db"), "arty")
+    for i, event in enumerate(["success", "success", "normal", "stall"]): # 2/3 successes, stalls not counted
+        db.add(i, event, 1.0, 2.0, 3.0)
+    for i, event in enumerate(["success", "normal", "normal", "normal"]): # 1/4
+        db.add(i, event, 5.0, 6.0, 7.0)
+    db.add(0, "normal", 8.0, 8.0, 8.0)
+    assert db.select("success") == [(1.0, 2.0, 3.0, 2, 3), (5.0, 6.0, 7.0, 1, 4)]
+    assert db.select("success", min_rate=0.5) == [(1.0, 2.0, 3.0, 2, 3)]
+    assert db.select("success", min_count=2) == [(1.0, 2.0, 3.0, 2, 3)]
+    assert db.select("success", min_rate=0.25) == db.select("success") # the bound is inclusive
+    assert db.select("reset") == []
+    db.close()
+
+
+def test_reopen_and_campaigns(tmp_path):
+    path = str(tmp_path / "results.db")
+    log = str(tmp_path / "log.csv")
+    tk.log_file(log, 1, "success", 1.0, 2.0, 3, "ok")
+    tk.log_file(log, 2, "normal", 1.0, 2.0, 3, "ok")
+    db = ResultsDB(path, "arty")
+    assert db.import_log(log) == 2
+    db.close()
+
+    db = ResultsDB(path, "nexys") # reopened: the schema is kept, rows are added
+    db.add(1, "success", 4.0, 5.0, 6.0)
+    db.close()
+
+    db = ResultsDB(path)
+    assert db.campaigns() == [("arty", 2), ("nexys", 1)]
+    assert db.select("success", campaign="arty") == [(1.0, 2.0, 3.0, 1, 2)]
+    assert db.select("success", campaign="nexys") == [(4.0, 5.0, 6.0, 1, 1)]
+    db.close()
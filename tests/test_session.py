@@ -0,0 +1,121 @@
+from types import SimpleNamespace
+
+import src.glitch as glitch
+from src.session import Session
+from src.watchdog import Stall, Watchdog
+
+GROUPS = ["success", "corrupted", "reset", "normal"]
+
+
+class FakeScope:
+
+    def __init__(self, triggered=True):
+        self.glitch = SimpleNamespace(width=0, offset=0, ext_offset=0, repeat=1, trigger_src="ext_single")
+        self.adc = SimpleNamespace(state=False)
+        self.io = SimpleNamespace(nrst="high", hs2="glitch")
+        self.triggered = triggered
+
+    def arm(self):
+        pass
+
+    def capture(self):
+        return not self.triggered # True on timeout
+
+
+class FakeTarget:
+
+    def __init__(self, payloads, stall_read=False):
+        self.payloads = list(payloads)
+        self.stall_read = stall_read
+        self.calls = 0
+
+    def flush(self):
+        pass
+
+    def simpleserial_write(self, callfunc, argumentfunc):
+        self.calls += 1
+
+    def simpleserial_read_witherrors(self, cmd, size, glitch_timeout=10, ack=False):
+        payload = self.payloads.pop(0)
+        if payload is None:
+            return {'valid': False, 'payload': None}
+        return {'valid': True, 'payload': bytearray(payload)}
+
+    def read(self, size):
+        if self.stall_read:
+            raise Stall("read", 10)
+        return ""
+
+
+def session_of(scope, target):
+    session = Session("arty", "sn", "ftdi", None, "top.bit")
+    session.scope, session.target = scope, target
+    session.reload_bitstream = lambda: None
+    return session
+
+
+def controller():
+    return glitch.GlitchController(groups=GROUPS, parameters=["width", "offset", "ext_offset"])
+
+
+def test_inject_success():
+    gc = controller()
+    session = session_of(FakeScope(), FakeTarget([[0xc]]))
+    assert session.inject(gc, (1, 2, 3), 's', '', 0) == ("success", "")
+    assert gc.group_counts == [1, 0, 0, 0]
+    assert session.last_parameters == (1, 2, 3)
+    assert session.timings["success"][0] == 1
+
+
+def test_stalled_read_is_not_counted():
+    gc = controller()
+    session = session_of(FakeScope(), FakeTarget([[0xc]], stall_read=True))
+    session.watchdog = Watchdog()
+    assert session.inject(gc, (1, 2, 3), 's', '', 0) == ("stall", "")
+    assert gc.group_counts == [0, 0, 0, 0]
+    assert gc.results._result_dict == {}
+    assert session.stall_count == 1
+
+
+def test_stalled_read_after_trigger_timeout_is_not_counted():
+    gc = controller()
+    session = session_of(FakeScope(triggered=False), FakeTarget([], stall_read=True))
+    session.watchdog = Watchdog()
+    assert session.inject(gc, (1, 2, 3), 's', '', 0) == ("stall", "")
+    assert gc.group_counts == [0, 0, 0, 0]
+
+
+def test_burst_ends_on_reset():
+    gc = controller()
+    target = FakeTarget([[0], [0xc], None, [0]])
+    session = session_of(FakeScope(), target)
+    outcomes = session.inject_burst(gc, (1, 2, 3), 's', '', 0, 4)
+    assert [event for event, _ in outcomes] == ["normal", "success", "reset"]
+    assert target.calls == 3
+    assert gc.group_counts == [1, 0, 1, 1]
+    assert sum(n for n, _ in session.timings.values()) == 3
+
+
+def test_single_injection_after_burst_restores_trigger():
+    gc = controller()
+    scope = FakeScope()
+    session = session_of(scope, FakeTarget([[0], [0], [0]]))
+    session.inject_burst(gc, (1, 2, 3), 's', '', 0, 2)
+    assert scope.glitch.trigger_src == "ext_continuous"
+    session.inject_burst(gc, (1, 2, 3), 's', '', 0, 1)
+    assert scope.glitch.trigger_src == "ext_single"
+
+
+def test_trigger_still_high_is_an_outcome():
+    gc = controller()
+    scope = FakeScope()
+    scope.adc.state = True # the target crashed after the previous injection
+    session = session_of(scope, FakeTarget([[0xc], [0]]))
+    assert session.inject_burst(gc, (1, 2, 3), 's', '', 0, 1) == [("reset", ""), ("success", "")]
+    assert session.trigger_reset and session.trigger_reset_count == 1
+    assert gc.group_counts == [1, 0, 1, 0]
+    assert session.timings["reset"][0] == 1
+
+    scope.adc.state = False
+    assert session.inject(gc, (1, 2, 3), 's', '', 0) == ("normal", "")
+    assert not session.trigger_reset and session.trigger_reset_count == 1
@@ -0,0 +1,74 @@
+import os
+
+import pytest
+
+import src.glitch as glitch
+from src.shared_results import SharedResultsView
+
+GROUPS = ["success", "corrupted", "reset", "normal"]
+
+
+def controller():
+    gc = glitch.GlitchController(groups=GROUPS, parameters=["width", "offset"])
+    gc.set_range("width", 0, 2)
+    gc.set_range("offset", 0, 1)
+    gc.set_global_step(1)
+    return gc
+
+
+def test_publish_counts_existing_results():
+    gc = controller()
+    gc.add("success", (1, 1))
+    gc.add("reset", (1, 1))
+    gc.add("normal", (5, 5)) # outside the grid, only in the totals
+
+    gc.publish(f"clockfi_test_{os.getpid()}")
+    try:
+        gc.add("success", (2, 0))
+        view = SharedResultsView(gc.shared.name)
+        try:
+            totals, counts = view.snapshot([view.index((1, 1)), view.index((2, 0))])
+            assert totals == [2, 0, 1, 1]
+            assert counts == [[1, 0, 1, 0], [1, 0, 0, 0]]
+            assert view.parameters_of(view.index((2, 0))) == (2, 0)
+        finally:
+            view.close()
+    finally:
+        gc.unpublish()
+
+
+def test_top_cells():
+    gc = controller()
+    for group, parameters in [("success", (0, 0)), ("normal", (0, 0)), ("success", (1, 0)),
+                              ("success", (2, 1)), ("success", (2, 1)), ("reset", (1, 1))]:
+        gc.add(group, parameters)
+
+    gc.publish(f"clockfi_test_{os.getpid()}")
+    try:
+        view = SharedResultsView(gc.shared.name)
+        try:
+            best = view.top_cells("success", 2)
+            assert [view.parameters_of(c) for c in best] == [(2, 1), (1, 0)]
+            assert [view.parameters_of(c) for c in view.top_cells(0, 10)] == [(2, 1), (1, 0), (0, 0)]
+            assert view.top_cells("corrupted", 10) == []
+        finally:
+            view.close()
+    finally:
+        gc.unpublish()
+
+
+def test_snapshot_waits_for_the_writer():
+    gc = controller()
+    gc.publish(f"clockfi_test_{os.getpid()}")
+    try:
+        view = SharedResultsView(gc.shared.name)
+        try:
+            gc.shared._seq[0] += 1 # writer in the middle of an update
+            with pytest.raises(RuntimeError):
+                view.snapshot(retries=3)
+            gc.shared._seq[0] += 1
+            assert view.snapshot()[0] == [0, 0, 0, 0]
+        finally:
+            view.close()
+    finally:
+        gc.unpublish()
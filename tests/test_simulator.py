@@ -0,0 +1,62 @@
+import pytest
+
+import src.simulator as simulator
+
+WIDTHS = [-1.953, -1.172, 0.0, 1.172, 1.953]
+OFFSETS = [-3.125, 0.0, 2.734]
+
+
+def write_log(path, cells, runs=4):
+    rows = []
+    for width, offset, success in cells:
+        for i in range(runs):
+            event = "success" if i < success else "normal"
+            rows.append(f"{len(rows) + 1},{event},{width},{offset},10,")
+    path.write_text("\n".join(rows) + "\n")
+    return str(path)
+
+
+@pytest.fixture
+def oracle(tmp_path):
+    cells = [(w, o, 4 if (w, o) == (0.0, 2.734) else 0) for w in WIDTHS for o in OFFSETS]
+    return simulator.load_oracle([write_log(tmp_path / "full.csv", cells)], processes=1)
+
+
+def test_load_oracle(oracle):
+    assert oracle["axes"] == [WIDTHS, OFFSETS, [10.0]]
+    assert oracle["cells"][(0.0, 2.734, 10.0)][0] == 1.0
+    assert oracle["cells"][(1.172, 0.0, 10.0)] == [0.0, 0.0, 0.0, 1.0]
+
+
+@pytest.mark.parametrize("strategy", ["grid", "random", "halton", "lhs"])
+def test_strategy_points_are_tested_values(oracle, strategy):
+    points = list(simulator.strategy_points(strategy, oracle["axes"], 40, seed=1))
+    assert len(points) == 40
+    assert set(points) <= set(oracle["cells"])
+
+
+def test_simulate_grid(oracle):
+    run = simulator.simulate(oracle, {"normal": 0.5, "success": 2.0}, "grid", 0, goal=1, budget=100)
+    assert run["reached"]
+    # lexicographic order: (0.0, 2.734) is the 9th point
+    assert run["injections"] == 9
+    assert run["seconds"] == 8 * 0.5 + 2.0
+    assert run["unknown"] == 0
+
+
+def test_unknown_cells_are_reported(tmp_path):
+    cells = [(w, o, 0) for w in WIDTHS for o in OFFSETS if (w, o) != (0.0, 0.0)]
+    oracle = simulator.load_oracle([write_log(tmp_path / "partial.csv", cells)], processes=1)
+    run = simulator.simulate(oracle, {}, "grid", 0, goal=1, budget=15)
+    assert run["unknown"] == 1
+    assert run["injections"] == 14
+    assert run["seconds"] == 14 * simulator.DEFAULT_COST
+
+
+def test_summarize():
+    runs = [{"strategy": "grid", "seed": s, "injections": n, "seconds": n, "successes": 1, "reached": True, "unknown": 0}
+            for s, n in enumerate([3, 5, 10])]
+    runs.append({"strategy": "random", "seed": 0, "injections": 50, "seconds": 50, "successes": 0, "reached": False, "unknown": 2})
+    summary = simulator.summarize(runs)
+    assert summary[0] == ("grid", 3, 3, 5, 6.0, 5, 6.0, 0.0)
+    assert summary[1][0] == "random" and summary[1][-1] == 2.0
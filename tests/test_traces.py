@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+from src.traces import INT16_SCALE, TraceStore
+
+
+def trace(i, samples=8):
+    return [(i + k) / 100 for k in range(samples)]
+
+
+def test_append_and_reopen(tmp_path):
+    path = str(tmp_path / "traces")
+    store = TraceStore(path, capacity=10, samples=8)
+    assert store.add(trace(0), 1, "normal", (1.0, 2.0, 3.0)) == 0
+    assert store.add(trace(1), 2, "success", (1.0, 2.0, 3.0)) == 1
+    store.close()
+
+    store = TraceStore(path + ".npy", capacity=10, samples=8) # resumed campaign
+    assert store.count == 2
+    assert store.add(trace(2), 3, "reset", (4.0, 5.0, 6.0)) == 2
+    store.close()
+
+    traces = np.load(path + ".npy", mmap_mode='r')
+    assert traces.shape == (10, 8) and traces.dtype == np.float16
+    for i in range(3):
+        np.testing.assert_allclose(traces[i], trace(i), atol=1e-3)
+    index = open(path + "_index.csv").read().splitlines()
+    assert index == ["trace,i_FI,event,width,offset,ext_offset",
+                     "0,1,normal,1.0,2.0,3.0", "1,2,success,1.0,2.0,3.0", "2,3,reset,4.0,5.0,6.0"]
+
+
+def test_full_store_drops_traces(tmp_path, capsys):
+    store = TraceStore(str(tmp_path / "traces"), capacity=2, samples=8)
+    rows = [store.add(trace(i), i, "normal", (0, 0, 0)) for i in range(4)]
+    store.close()
+    assert rows == [0, 1, None, None]
+    assert len(capsys.readouterr().out.splitlines()) == 1 # warned once
+
+
+def test_decimate_and_int16(tmp_path):
+    store = TraceStore(str(tmp_path / "traces"), capacity=1, samples=9, decimate=2, dtype="int16")
+    assert store.samples == 4 # the odd last sample is dropped
+    store.add([0.1, 0.3, -0.2, -0.4, 0.0, 0.5, 0.25, 0.25, 0.4], 1, "normal", (0, 0, 0))
+    stored = np.array(store.traces[0])
+    store.close()
+    assert stored.dtype == np.int16
+    np.testing.assert_allclose(stored / INT16_SCALE, [0.2, -0.3, 0.25, 0.25], atol=1 / INT16_SCALE)
+
+
+def test_reopen_checks_shape_and_dtype(tmp_path):
+    path = str(tmp_path / "traces")
+    TraceStore(path, capacity=4, samples=8).close()
+    with pytest.raises(ValueError):
+        TraceStore(path, capacity=4, samples=16)
+    with pytest.raises(ValueError):
+        TraceStore(path, capacity=4, samples=8, dtype="float32")
+    with pytest.raises(ValueError):
+        TraceStore(str(tmp_path / "other"), capacity=4, samples=8, dtype="float64")
+    with pytest.raises(ValueError):
+        TraceStore(str(tmp_path / "other"), capacity=4, samples=8, mode="failure")
+
+
+def test_modes(tmp_path):
+    store = TraceStore(str(tmp_path / "a"), capacity=1, samples=8, mode="success")
+    assert store.wants(1, "success") and not store.wants(2, "normal")
+    store.close()
+    store = TraceStore(str(tmp_path / "b"), capacity=1, samples=8, mode="every", every=3)
+    assert [i for i in range(1, 10) if store.wants(i, "normal")] == [3, 6, 9]
+    store.close()